@@ -6,10 +6,10 @@ Se activa bajo demanda.
 
 import os
 
-import httpx
-
 from agents.base import BaseAgent
-from utils.api_clients import get_heygen_headers
+from utils.api_clients import get_heygen_headers, get_http_client
+from utils.cancellation import time_left
+from utils.retry import call_with_retry
 
 
 class AvatarVideoProducerAgent(BaseAgent):
@@ -88,13 +88,17 @@ class AvatarVideoProducerAgent(BaseAgent):
         }
 
         try:
-            response = httpx.post(
-                "https://api.heygen.com/v2/video/generate",
-                headers=headers,
-                json=payload,
-                timeout=60,
+            response = call_with_retry(
+                "heygen", "video_generate",
+                lambda: get_http_client().post(
+                    "https://api.heygen.com/v2/video/generate",
+                    headers=headers,
+                    json=payload,
+                    timeout=time_left(60),
+                ).raise_for_status(),
+                idempotent=False,
+                logger=self.logger,
             )
-            response.raise_for_status()
             result = response.json()
             video_id = result.get("data", {}).get("video_id", "unknown")
             return f"HeyGen video queued. Video ID: {video_id}. Status: processing."
@@ -107,12 +111,15 @@ class AvatarVideoProducerAgent(BaseAgent):
         headers = get_heygen_headers()
 
         try:
-            response = httpx.get(
-                f"https://api.heygen.com/v1/video_status.get?video_id={args['video_id']}",
-                headers=headers,
-                timeout=30,
+            response = call_with_retry(
+                "heygen", "video_status",
+                lambda: get_http_client().get(
+                    f"https://api.heygen.com/v1/video_status.get?video_id={args['video_id']}",
+                    headers=headers,
+                    timeout=time_left(30),
+                ).raise_for_status(),
+                logger=self.logger,
             )
-            response.raise_for_status()
             result = response.json()
             status = result.get("data", {}).get("status", "unknown")
             video_url = result.get("data", {}).get("video_url", "")
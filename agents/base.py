@@ -5,26 +5,65 @@ Usa la API de Anthropic directamente con tool_use para agentic loops.
 
 import json
 import os
+import sys
+import time
+import traceback
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+from contextlib import ExitStack
 from pathlib import Path
 from typing import Any
 
-import anthropic
-import httpx
-from dotenv import load_dotenv
-
 from utils.helpers import (
     ensure_output_dirs,
+    extract_items,
     get_brand_config,
     get_config,
+    get_data_dir,
     get_platform_config,
     get_project_root,
+    get_slot_id,
+    load_env,
     load_json,
+    merge_slot_items,
     save_json,
     timestamp_filename,
 )
+from utils.accounting import TOOL_ERROR_PREFIXES, RunAccount
+from utils.api_clients import get_anthropic_client, get_http_client
+from utils.cancellation import RunCancelled, RunTimeout, check_cancelled, deadline, interruptible_sleep, time_left
+from utils.limiter import acquire as acquire_limit, estimate_tokens
 from utils.logger import setup_logger
+from utils.memo import file_digest, fingerprint, lookup_memo, memo_settings, store_memo, touch_outputs
+from utils.model_routing import build_router
+from utils.output_store import (
+    delete_output,
+    latest_output,
+    latest_output_file,
+    mark_latest,
+    store_enabled,
+    store_output,
+)
+from utils.pipeline_state import get_state, update_state
+from utils.retry import call_with_retry
+from utils.metrics import (
+    ACTIVE_RUNS,
+    AGENT_RUN_SECONDS,
+    AGENT_TURNS,
+    MODEL_TURNS,
+    QUEUE_DEPTH,
+    TOOL_CALL_SECONDS,
+    record_cache,
+    record_llm_tokens,
+    track_provider,
+)
+from utils.run_context import ensure_run_id, submit
+from utils.run_journal import record_event
+from utils.tracing import span
 
-load_dotenv(get_project_root() / ".env", override=True)
+load_env()
+
+# Timeout por request de Anthropic (el default del SDK), acotado por el deadline del run
+LLM_TIMEOUT_SECONDS = 600.0
 
 
 class BaseAgent:
@@ -33,8 +72,30 @@ class BaseAgent:
     name: str = "base"
     description: str = ""
     # Default model — agents can override. Use Haiku for simple tasks, Sonnet for creative.
+    # agents.<name>.model en config.yaml lo pisa (ver generation_model y utils.model_routing).
     model: str = "claude-haiku-4-20250514"
     max_turns: int = 25
+    max_tokens: int = 8096
+
+    # Map-reduce (execution_mode: "sharded" en config.yaml). Los agentes que
+    # procesan trabajo por slot declaran de qué agente leen las piezas, dónde
+    # están dentro de su output y bajo qué clave devuelven sus resultados.
+    shard_source: str | None = None
+    shard_item_paths: tuple[str, ...] = ()
+    shard_result_key: str = ""
+    output_suffix: str = ""
+    # Batch mode (execution_mode: "batch"): una request por pieza vía Message Batches,
+    # en los agentes que definen _build_batch_prompt(item) -> str (supports_batch)
+    # Tools cuyo input es el entregable: con routing (utils.model_routing) esos turnos
+    # corren en el modelo de generación y el resto en el modelo rápido
+    generation_tools: tuple[str, ...] = ("save_agent_output", "submit_shard_result")
+    # Regeneración por slot (regenerate_slots) en agentes sin map-reduce: de qué
+    # agente y de qué listas de su output salen las piezas a rehacer
+    regeneration_source: str | None = None
+    regeneration_item_paths: tuple[str, ...] = ()
+    # Memoización por hash de inputs (utils.memo): False en agentes con efectos
+    # externos o que leen datos en vivo; agents.<name>.memoize lo pisa
+    memoize: bool = True
 
     def __init__(self):
         self.logger = setup_logger(self.name)
@@ -43,7 +104,60 @@ class BaseAgent:
         self.platforms = get_platform_config()
         self.project_root = get_project_root()
         self.output_dirs = ensure_output_dirs()
-        self.client = anthropic.Anthropic()
+        self.client = get_anthropic_client()
+        self.run_id: str | None = None
+        self.account: RunAccount | None = None
+        self.saved_outputs: list[Path] = []  # outputs del run actual (van al journal, utils.run_journal)
+
+    @property
+    def agent_config(self) -> dict:
+        """Sección de config.yaml para este agente (agents.<name>)."""
+        return (self.config.get("agents") or {}).get(self.name) or {}
+
+    @property
+    def generation_model(self) -> str:
+        """Modelo de generación: agents.<name>.model en config.yaml, o el atributo `model` de la clase."""
+        return self.agent_config.get("model") or self.model
+
+    @property
+    def streaming(self) -> bool:
+        """Agentic loop con messages.stream: agents.<name>.streaming, o streaming.enabled por defecto."""
+        value = self.agent_config.get("streaming")
+        if value is None:
+            value = (self.config.get("streaming") or {}).get("enabled", False)
+        return bool(value)
+
+    @property
+    def timeout_seconds(self) -> float | None:
+        """
+        Deadline del run: agents.<name>.timeout_seconds, o agents.orchestrator.timeout_seconds.
+        En batch mode solo el propio del agente (el batch ya se acota con batch.max_wait_seconds).
+        """
+        value = self.agent_config.get("timeout_seconds")
+        if value is None and self.execution_mode != "batch":
+            value = ((self.config.get("agents") or {}).get("orchestrator") or {}).get("timeout_seconds")
+        return float(value) if value else None
+
+    @property
+    def supports_batch(self) -> bool:
+        """Batch mode disponible: el agente define el prompt de cada pieza (_build_batch_prompt)."""
+        return callable(getattr(self, "_build_batch_prompt", None))
+
+    @property
+    def execution_mode(self) -> str:
+        """Modo de ejecución configurado: agentic (default), sharded o batch."""
+        mode = self.agent_config.get("execution_mode", "agentic")
+        if (mode == "sharded" and not self.shard_source) or (mode == "batch" and not self.supports_batch):
+            self.logger.warning(f"execution_mode={mode} not supported by {self.name}, using agentic")
+            return "agentic"
+        return mode
+
+    @property
+    def memoizable(self) -> bool:
+        """Reutilizar runs con los mismos inputs: memoization.enabled y agents.<name>.memoize (o el atributo)."""
+        if not memo_settings(self.config)["enabled"]:
+            return False
+        return bool(self.agent_config.get("memoize", self.memoize))
 
     def load_prompt(self) -> str:
         prompt_path = self.project_root / "prompts" / f"{self.name}.md"
@@ -126,14 +240,8 @@ class BaseAgent:
 
             elif tool_name == "read_agent_output":
                 agent_name = tool_input["agent_name"]
-                outputs_dir = self.project_root / "data" / "outputs"
-                files = sorted(
-                    outputs_dir.glob(f"{agent_name}_*.json"),
-                    key=lambda f: f.stat().st_mtime,
-                    reverse=True,
-                )
-                if files:
-                    data = load_json(files[0])
+                data = self.load_latest_output(agent_name)
+                if data is not None:
                     return json.dumps(data, ensure_ascii=False, default=str)
                 return f"No output found for agent: {agent_name}"
 
@@ -145,8 +253,10 @@ class BaseAgent:
                 except (json.JSONDecodeError, TypeError):
                     parsed = {"raw_output": output_data}
                 filename = timestamp_filename(self.name, suffix)
-                output_path = self.project_root / "data" / "outputs" / filename
+                output_path = get_data_dir() / "outputs" / filename
                 save_json(parsed, output_path)
+                self._record_output(output_path, parsed)
+                self.saved_outputs.append(output_path)
                 self._output_saved = True  # Mark that output was saved
                 self.logger.info(f"Output saved: {output_path}")
                 return f"Output saved to: {output_path}"
@@ -173,13 +283,16 @@ class BaseAgent:
         if not api_key or "xxxxx" in api_key:
             return f"[Perplexity not configured] Query: {query}"
         try:
-            response = httpx.post(
-                "https://api.perplexity.ai/chat/completions",
-                headers={"Authorization": f"Bearer {api_key}", "Content-Type": "application/json"},
-                json={"model": "sonar", "messages": [{"role": "user", "content": query}]},
-                timeout=30,
+            response = call_with_retry(
+                "perplexity", "chat_completions",
+                lambda: get_http_client().post(
+                    f"{os.getenv('PERPLEXITY_BASE_URL', 'https://api.perplexity.ai')}/chat/completions",
+                    headers={"Authorization": f"Bearer {api_key}", "Content-Type": "application/json"},
+                    json={"model": "sonar", "messages": [{"role": "user", "content": query}]},
+                    timeout=time_left(30),
+                ).raise_for_status(),
+                logger=self.logger,
             )
-            response.raise_for_status()
             return response.json()["choices"][0]["message"]["content"]
         except Exception as e:
             self.logger.error(f"Perplexity error: {e}")
@@ -189,8 +302,8 @@ class BaseAgent:
         """List available templates, brand assets, and fonts."""
         result = {"templates": [], "logos": [], "fonts": [], "has_templates": False}
 
-        templates_dir = self.project_root / "data" / "inputs" / "templates"
-        brand_dir = self.project_root / "data" / "brand_assets"
+        templates_dir = get_data_dir() / "inputs" / "templates"
+        brand_dir = get_data_dir() / "brand_assets"
         fonts_dir = brand_dir / "fonts"
 
         # Templates
@@ -228,7 +341,7 @@ class BaseAgent:
 
     def get_campaign_brief(self) -> dict | None:
         """Lee el brief de campaña activo desde data/inputs/campaign_brief.json."""
-        brief_path = self.project_root / "data" / "inputs" / "campaign_brief.json"
+        brief_path = get_data_dir() / "inputs" / "campaign_brief.json"
         if brief_path.exists():
             try:
                 return load_json(brief_path)
@@ -260,61 +373,139 @@ usa el brief como guía principal.
 
     # ── Agentic Loop ───────────────────────────────────────
 
-    def run(self, custom_prompt: str | None = None) -> str:
+    def run(self, custom_prompt: str | None = None, force: bool = False,
+            regenerate: dict[str, str] | None = None) -> str:
+        """
+        Ejecuta el agente y registra tokens, latencias y costo por turno en el run activo.
+        Si termina bien, deja su completion (con los outputs guardados) en el journal del run.
+        Si un run anterior tuvo exactamente los mismos inputs (utils.memo) reutiliza sus
+        outputs sin llamar al modelo; force=True ejecuta igual. Con `regenerate`
+        (slot_id → feedback) rehace solo esos slots (regenerate_slots).
+        """
+        self.run_id = ensure_run_id()
+        self.saved_outputs = []
+        mode = self.execution_mode
+        memo_key = self._memo_key(custom_prompt, mode) if self.memoizable and regenerate is None else None
+        if memo_key and not force:
+            memoized = self._reuse_memoized(memo_key, mode)
+            if memoized is not None:
+                return memoized
+        self.account = RunAccount(self.name, self.run_id, mode=mode)
+        active = ACTIVE_RUNS.labels(agent=self.name)
+        active.inc()
+        started = time.perf_counter()
+        with span(f"agent {self.name}", agent=self.name, mode=mode) as agent_span:
+            try:
+                with deadline(self.timeout_seconds):
+                    try:
+                        if regenerate is None:
+                            result = self._execute(custom_prompt)
+                        else:
+                            result = self.regenerate_slots(regenerate)
+                    except Exception:
+                        check_cancelled()  # un timeout de red cortado por el deadline sale como RunTimeout
+                        raise
+            except RunCancelled as e:
+                status = "timeout" if isinstance(e, RunTimeout) else "cancelled"
+                AGENT_RUN_SECONDS.labels(agent=self.name, mode=mode, status=status).observe(time.perf_counter() - started)
+                self.account.finish(status=status, error=str(e))
+                self.logger.warning(f"Run {self.run_id} {status}: {e}")
+                raise
+            except Exception as e:
+                AGENT_RUN_SECONDS.labels(agent=self.name, mode=mode, status="error").observe(time.perf_counter() - started)
+                self.account.finish(status="error", error=f"{e}\n{traceback.format_exc()}")
+                raise
+            finally:
+                active.dec()
+            AGENT_RUN_SECONDS.labels(agent=self.name, mode=mode, status="completed").observe(time.perf_counter() - started)
+            totals = self.account.finish()["totals"]
+            outputs = [str(p) for p in self.saved_outputs]
+            record_event(self.run_id, "agent_completed", agent=self.name, outputs=outputs)
+            if regenerate is not None and self.memoizable:
+                # La huella (con los upstream ya regenerados) pasa a apuntar al output combinado:
+                # un run posterior con los mismos inputs reutiliza las piezas aprobadas, no las viejas
+                memo_key = self._memo_key(custom_prompt, mode)
+            if memo_key:
+                store_memo(self.name, memo_key, outputs, result, self.run_id,
+                           max_entries=memo_settings(self.config)["max_entries"])
+            agent_span.set_attributes({k: totals[k] for k in ("turns", "input_tokens", "output_tokens", "cost_usd")})
+        self.logger.bind(duration_ms=round((time.perf_counter() - started) * 1000, 1)).info(
+            f"Run {self.run_id}: {totals['turns']} turns, {totals['input_tokens']} in / "
+            f"{totals['output_tokens']} out tokens, ${totals['cost_usd']:.4f}"
+        )
+        return result
+
+    # ── Memoización ────────────────────────────────────────
+
+    def _upstream_agents(self) -> list[str]:
+        """Agentes cuyos outputs puede leer este: los anteriores en el orden de PHASES (todos si no está en PHASES)."""
+        from agents.orchestrator.agent import PHASES  # diferido: orchestrator importa este módulo
+
+        order = [name for phase in sorted(PHASES) for name in PHASES[phase]["agents"]]
+        return order[:order.index(self.name)] if self.name in order else order
+
+    def _memo_key(self, custom_prompt: str | None, mode: str) -> str:
+        """Huella de todo lo que lee el run (utils.memo)."""
+        brief = self.get_campaign_brief() or {}
+        config_dir = self.project_root / "config"
+        return fingerprint({
+            "agent": self.name,
+            "system_prompt": self.load_prompt(),
+            "user_prompt": custom_prompt or self._build_prompt(),
+            "brief": {key: brief.get(key) for key in ("brief", "platforms", "language", "status")},
+            "brand": file_digest(config_dir / "brand.yaml"),
+            "platforms": file_digest(config_dir / "platforms.yaml"),
+            "agent_config": self.agent_config,
+            "models": self.config.get("models"),
+            "model": self.generation_model,
+            "mode": mode,
+            "upstream": {name: file_digest(self.latest_output_path(name)) for name in self._upstream_agents()},
+        })
+
+    def _reuse_memoized(self, memo_key: str, mode: str) -> str | None:
+        """Si hay un run anterior con la misma huella, reutiliza sus outputs y retorna su resultado."""
+        entry = lookup_memo(self.name, memo_key, max_age_hours=memo_settings(self.config)["max_age_hours"])
+        record_cache("agent_memo", hit=entry is not None)
+        if entry is None:
+            return None
+        touch_outputs(entry["outputs"])
+        if store_enabled(self.config):
+            try:
+                mark_latest(entry["outputs"])
+            except Exception as e:
+                self.logger.warning(f"Output store: could not mark reused outputs: {e}")
+        self.saved_outputs = [Path(p) for p in entry["outputs"]]
+        self.account = RunAccount(self.name, self.run_id, mode=mode)
+        self.account.finish(status="memoized")
+        AGENT_RUN_SECONDS.labels(agent=self.name, mode=mode, status="memoized").observe(0.0)
+        record_event(self.run_id, "agent_completed", agent=self.name, outputs=entry["outputs"], memoized=True)
+        self.logger.info(
+            f"Run {self.run_id}: inputs unchanged since run {entry['run_id']}, "
+            f"reusing {len(entry['outputs'])} output(s)"
+        )
+        return entry["result"]
+
+    def _execute(self, custom_prompt: str | None = None) -> str:
+        """Ejecuta el agente en el modo configurado (agentic loop, map-reduce o batch)."""
+        if custom_prompt is None:
+            mode = self.execution_mode
+            if mode == "sharded":
+                return self.run_sharded()
+            if mode == "batch":
+                return self.run_batch()
+        return self._run_agentic(custom_prompt)
+
+    def _run_agentic(self, custom_prompt: str | None = None) -> str:
         """Ejecuta el agente con un agentic loop (tool_use loop)."""
         system_prompt = self.load_prompt()
         user_prompt = custom_prompt or self._build_prompt()
         # Inyectar contexto de campaña si existe
         user_prompt = self._inject_campaign_context(user_prompt)
         tools = self.get_tools()
-        messages = [{"role": "user", "content": user_prompt}]
 
         self.logger.info(f"Starting agentic loop (max {self.max_turns} turns)")
-        final_text = ""
         self._output_saved = False  # Track whether save_agent_output was called
-
-        for turn in range(self.max_turns):
-            self.logger.info(f"Turn {turn + 1}/{self.max_turns}")
-
-            response = self.client.messages.create(
-                model=self.model,
-                max_tokens=8096,
-                system=system_prompt,
-                tools=tools,
-                messages=messages,
-            )
-
-            # Extraer text y tool_use blocks
-            tool_calls = []
-            text_parts = []
-            for block in response.content:
-                if block.type == "text":
-                    text_parts.append(block.text)
-                    self.logger.info(f"Agent says: {block.text[:200]}")
-                elif block.type == "tool_use":
-                    tool_calls.append(block)
-                    self.logger.info(f"Tool: {block.name}({str(block.input)[:100]})")
-
-            # Si no hay tool calls → agente terminó
-            if not tool_calls:
-                final_text = "\n".join(text_parts)
-                self.logger.info("Agent completed (no more tool calls)")
-                break
-
-            # Agregar respuesta del assistant
-            messages.append({"role": "assistant", "content": response.content})
-
-            # Ejecutar tools y agregar resultados
-            tool_results = []
-            for tc in tool_calls:
-                result = self.handle_tool_call(tc.name, tc.input)
-                tool_results.append({
-                    "type": "tool_result",
-                    "tool_use_id": tc.id,
-                    "content": result[:50000],  # Truncar si es muy largo
-                })
-
-            messages.append({"role": "user", "content": tool_results})
+        final_text = self._agentic_loop(system_prompt, user_prompt, tools, self.handle_tool_call)
 
         # Auto-save fallback: if the LLM never called save_agent_output,
         # try to extract and save JSON from its final text response.
@@ -329,38 +520,652 @@ usa el brief como guía principal.
         self.logger.info("Agentic loop finished")
         return final_text
 
-    def _auto_save_output(self, text: str) -> None:
-        """Attempt to extract JSON from the agent's final text and save it."""
-        import re
+    def _agentic_loop(self, system_prompt: str, user_prompt: str, tools: list[dict], tool_handler,
+                      shard: int | None = None) -> str:
+        """
+        Loop tool_use: llama al modelo, ejecuta tools con tool_handler y retorna el texto final.
+        En modo streaming las tools corren en un thread aparte, en orden, a medida que llegan.
+        """
+        if not self.streaming:
+            return self._run_turns(system_prompt, user_prompt, tools, tool_handler, shard, dispatch=None)
+        with ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"{self.name}-tools") as dispatch:
+            return self._run_turns(system_prompt, user_prompt, tools, tool_handler, shard, dispatch)
+
+    def _run_turns(self, system_prompt: str, user_prompt: str, tools: list[dict], tool_handler,
+                   shard: int | None, dispatch: ThreadPoolExecutor | None) -> str:
+        messages = [{"role": "user", "content": user_prompt}]
+        final_text = ""
+        router = build_router(self.config, self.name, self.generation_model, self.generation_tools)
+
+        for turn in range(self.max_turns):
+            check_cancelled()
+            turn_log = self.logger.bind(turn=turn + 1, shard=shard)
+            turn_log.info(f"Turn {turn + 1}/{self.max_turns}")
+
+            model = router.next_model()
+            with span(f"turn {turn + 1}", turn=turn + 1, model=model, shard=shard) as turn_span:
+                dispatched: dict[str, Future] = {}
+                response, llm_elapsed = self._call_model(model, system_prompt, tools, messages, tool_handler,
+                                                         dispatch, dispatched, turn_log, router.stop_tools(model))
+                tool_names = [block.name for block in response.content if block.type == "tool_use"]
+
+                # El modelo rápido intentó generar el entregable: descartar y repetir con el de generación
+                # (ninguna tool del turno descartado corrió: _stream_turn no despacha si puede escalarse)
+                if router.should_escalate(model, tool_names):
+                    self._account_turn(response, model, llm_elapsed, shard, "escalated", turn_log)
+                    turn_log.info(f"Escalating turn {turn + 1} from {model} to {router.generation_model}")
+                    model = router.generation_model
+                    turn_span.set_attributes({"model": model, "escalated": True})
+                    response, llm_elapsed = self._call_model(model, system_prompt, tools, messages, tool_handler,
+                                                             dispatch, dispatched, turn_log)
+                    tool_names = [block.name for block in response.content if block.type == "tool_use"]
+                router.record(tool_names)
+                if dispatch is not None:
+                    turn_span.set_attribute("early_tools", len(dispatched))
+
+                turn_record = self._account_turn(response, model, llm_elapsed, shard, router.route(model), turn_log)
+                if turn_record is not None:
+                    turn_span.set_attributes({
+                        "input_tokens": turn_record["input_tokens"],
+                        "output_tokens": turn_record["output_tokens"],
+                        "stop_reason": turn_record["stop_reason"],
+                    })
+
+                # Extraer text y tool_use blocks (en streaming ya se loguearon al llegar)
+                tool_calls = []
+                text_parts = []
+                for block in response.content:
+                    if block.type == "text":
+                        text_parts.append(block.text)
+                        if dispatch is None:
+                            turn_log.info(f"Agent says: {block.text[:200]}")
+                    elif block.type == "tool_use":
+                        tool_calls.append(block)
+                        if dispatch is None:
+                            turn_log.info(f"Tool: {block.name}({str(block.input)[:100]})")
+
+                # Si no hay tool calls → agente terminó
+                if not tool_calls:
+                    final_text = "\n".join(text_parts)
+                    turn_log.info("Agent completed (no more tool calls)")
+                    break
+
+                # Agregar respuesta del assistant
+                messages.append({"role": "assistant", "content": self._assistant_content(response)})
+
+                # Ejecutar tools (o esperar las ya despachadas) y agregar resultados
+                tool_results = []
+                for tc in tool_calls:
+                    future = dispatched.get(tc.id)
+                    result, elapsed = future.result() if future else self._run_tool(tool_handler, tc)
+                    TOOL_CALL_SECONDS.labels(agent=self.name, tool=tc.name).observe(elapsed)
+                    turn_log.bind(tool=tc.name, duration_ms=round(elapsed * 1000, 1)).debug(
+                        f"Tool {tc.name} done in {elapsed * 1000:.0f} ms ({len(result)} chars)"
+                    )
+                    if turn_record is not None:
+                        self.account.record_tool(turn_record, tc.name, elapsed, result)
+                    tool_results.append({
+                        "type": "tool_result",
+                        "tool_use_id": tc.id,
+                        "content": result[:50000],  # Truncar si es muy largo
+                    })
+
+                messages.append({"role": "user", "content": tool_results})
+
+        return final_text
+
+    def _call_model(self, model: str, system_prompt: str, tools: list[dict], messages: list[dict], tool_handler,
+                    dispatch: ThreadPoolExecutor | None, dispatched: dict[str, Future], turn_log,
+                    stop_tools: frozenset[str] = frozenset()) -> tuple[Any, float]:
+        """
+        Una llamada al modelo (messages.create, o messages.stream si hay `dispatch`);
+        retorna (respuesta, segundos). Cada intento reserva un slot y los tokens
+        estimados en el limiter de Anthropic (utils.limiter) y al terminar los ajusta
+        con el usage; entre reintentos (backoff) el slot queda libre.
+        """
+        estimated = estimate_tokens(system_prompt, tools, messages)
+        started = time.perf_counter()
+        if dispatch is not None:
+            response = self._stream_turn(model, system_prompt, tools, messages, tool_handler, dispatch,
+                                         dispatched, turn_log, stop_tools, estimated)
+        else:
+            def create() -> Any:
+                with acquire_limit("anthropic", estimated, self.max_tokens) as permit:
+                    message = self.client.messages.create(
+                        model=model,
+                        max_tokens=self.max_tokens,
+                        system=system_prompt,
+                        tools=tools,
+                        messages=messages,
+                        timeout=time_left(LLM_TIMEOUT_SECONDS),
+                    )
+                    if permit is not None:
+                        permit.settle(getattr(message, "usage", None))
+                    return message
+
+            response = call_with_retry("anthropic", "messages.create", create, logger=self.logger)
+        return response, time.perf_counter() - started
+
+    def _account_turn(self, response, model: str, elapsed: float, shard: int | None, route: str,
+                      turn_log) -> dict | None:
+        """Métricas, log y record de RunAccount de una llamada al modelo."""
+        AGENT_TURNS.labels(agent=self.name).inc()
+        MODEL_TURNS.labels(agent=self.name, model=model, route=route).inc()
+        turn_log.bind(duration_ms=round(elapsed * 1000, 1)).debug(
+            f"LLM response in {elapsed * 1000:.0f} ms ({model}, {route}, stop_reason={response.stop_reason})"
+        )
+        if not self.account:
+            return None
+        turn_record = self.account.record_turn(response, model, elapsed, shard=shard, escalated=route == "escalated")
+        record_llm_tokens(self.name, turn_record)
+        return turn_record
+
+    def _run_tool(self, tool_handler, tc) -> tuple[str, float]:
+        """Ejecuta un tool_use con su span; retorna (resultado, segundos)."""
+        check_cancelled()  # las tools ya despachadas de un run cancelado no arrancan
+        with span(f"tool {tc.name}", tool=tc.name) as tool_span:
+            started = time.perf_counter()
+            result = tool_handler(tc.name, tc.input)
+            elapsed = time.perf_counter() - started
+            tool_span.set_attribute("result_chars", len(result))
+            if result.startswith(TOOL_ERROR_PREFIXES):
+                tool_span.set_error(result[:200])
+        return result, elapsed
+
+    def _stream_turn(self, model: str, system_prompt: str, tools: list[dict], messages: list[dict], tool_handler,
+                     dispatch: ThreadPoolExecutor, dispatched: dict[str, Future], turn_log,
+                     stop_tools: frozenset[str] = frozenset(), estimated_tokens: int = 0) -> Any:
+        """
+        Un turno con messages.stream. Cada tool_use se despacha a `dispatch` en su
+        content_block_stop (input JSON completo) mientras el modelo sigue generando
+        los bloques siguientes; los futures quedan en `dispatched` por tool_use id.
+        El texto se reenvía como progreso (DEBUG, stream=text) cada
+        streaming.progress_chars caracteres, así llega a /api/debug/logs/stream.
+        Retorna el mensaje final (con usage), igual que messages.create. Si empieza
+        un tool_use de `stop_tools` corta el stream y retorna el mensaje parcial.
+        Con `stop_tools` (turno del modelo rápido, que puede escalarse) no se
+        despacha nada hasta que el mensaje termina sin una de ellas: un turno
+        escalado se descarta entero, y sus tools no deben correr (generate_image
+        cobra, el scheduler publica).
+        Un error de apertura se reintenta (utils.retry); uno a mitad del stream se propaga.
+        Cada intento de apertura toma su slot del limiter (estimated_tokens), que
+        se suelta al terminar el stream o si la apertura falla (no durante el backoff).
+        Entre eventos se revisa la cancelación del run (utils.cancellation).
+        """
+        progress_chars = max(int((self.config.get("streaming") or {}).get("progress_chars", 400)), 1)
+        progress_log = turn_log.bind(stream="text")
+        pending = ""
+
+        def open_stream() -> tuple[ExitStack, Any, Any]:
+            stack = ExitStack()
+            permit = stack.enter_context(acquire_limit("anthropic", estimated_tokens, self.max_tokens))
+            try:
+                stream = stack.enter_context(self.client.messages.stream(
+                    model=model,
+                    max_tokens=self.max_tokens,
+                    system=system_prompt,
+                    tools=tools,
+                    messages=messages,
+                    timeout=time_left(LLM_TIMEOUT_SECONDS),
+                ))
+            except BaseException:
+                stack.__exit__(*sys.exc_info())  # suelta el slot como fallido antes del backoff
+                raise
+            return stack, permit, stream
+
+        with track_provider("anthropic", "messages.stream"):
+            # Solo se reintenta la apertura: con eventos ya recibidos puede haber tools despachadas
+            stack, permit, stream = call_with_retry("anthropic", "messages.stream.open", open_stream,
+                                                    logger=self.logger)
+            with stack:
+                message = None
+                for event in stream:
+                    check_cancelled()  # un stop corta el stream (el with lo cierra) sin esperar al resto
+                    if (event.type == "content_block_start" and event.content_block.type == "tool_use"
+                            and event.content_block.name in stop_tools):
+                        message = stream.current_message_snapshot
+                        break
+                    if event.type == "text":
+                        pending += event.text
+                        if len(pending) >= progress_chars:
+                            progress_log.debug(pending)
+                            pending = ""
+                    elif event.type == "content_block_stop":
+                        block = event.content_block
+                        if block.type == "text":
+                            if pending:
+                                progress_log.debug(pending)
+                                pending = ""
+                            turn_log.info(f"Agent says: {block.text[:200]}")
+                        elif block.type == "tool_use":
+                            turn_log.info(f"Tool: {block.name}({str(block.input)[:100]})")
+                            if not stop_tools:
+                                dispatched[block.id] = submit(dispatch, self._run_tool, tool_handler, block)
+                escalating = message is not None
+                if not escalating:
+                    message = stream.get_final_message()
+                if permit is not None:
+                    # Un stream cortado por una stop tool no es muestra de latencia
+                    permit.settle(getattr(message, "usage", None), observe_latency=not escalating)
+        if stop_tools and not escalating:  # el turno no se escala: ahora sí, todas las tools en paralelo
+            for block in message.content:
+                if block.type == "tool_use":
+                    dispatched[block.id] = submit(dispatch, self._run_tool, tool_handler, block)
+        return message
+
+    @staticmethod
+    def _assistant_content(response) -> list:
+        """Bloques del assistant para el próximo request (sin los campos locales de los mensajes parseados)."""
+        return [
+            {k: v for k, v in block.model_dump().items() if v is not None and k != "parsed_output"}
+            if hasattr(block, "parsed_output") else block
+            for block in response.content
+        ]
+
+    # ── Map-reduce (sharded mode) ──────────────────────────
+
+    def run_sharded(self, items: list[dict] | None = None, extra_instructions: str = "") -> str:
+        """
+        Divide las piezas del agente upstream en shards, ejecuta un agentic loop
+        corto por shard en paralelo (con límite de concurrencia) y combina los
+        resultados en el output normal del agente.
+        """
+        if items is None:
+            items = self._load_shard_items()
+        if not items:
+            self.logger.warning(f"No items found in {self.shard_source} output, falling back to agentic loop")
+            return self._run_agentic()
+
+        merged = self._finalize_merged_output(self._run_shards(items, extra_instructions))
+        output_path = self.save_output(merged, suffix=self._get_default_suffix())
+
+        sharding = merged["sharding"]
+        summary = (
+            f"Sharded run completed: {sharding['shards'] - len(sharding['failed'])}/{sharding['shards']} shards, "
+            f"{len(merged.get(self.shard_result_key, []))} results saved to {output_path}"
+        )
+        self.logger.info(summary)
+        return summary
+
+    def _run_shards(self, items: list[dict], extra_instructions: str = "") -> dict:
+        """Ejecuta los shards de `items` y retorna sus resultados combinados (sin finalizar ni guardar)."""
+        sharding = self.agent_config.get("sharding") or {}
+        shard_size = max(int(sharding.get("shard_size", 4)), 1)
+        concurrency = max(int(sharding.get("max_concurrency", 4)), 1)
+        group_by = sharding.get("group_by", "slot")
+
+        shards = self._split_shards(items, shard_size, group_by)
+        self.logger.info(
+            f"Sharded run: {len(items)} items -> {len(shards)} shards "
+            f"(size={shard_size}, group_by={group_by}, concurrency={concurrency})"
+        )
+
+        system_prompt = self.load_prompt()
+        results: list[dict | None] = [None] * len(shards)
+        failed: list[dict] = []
+        QUEUE_DEPTH.inc(len(shards))  # cada shard descuenta al empezar (_run_shard)
+        with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix=f"{self.name}-shard") as pool:
+            futures = {
+                submit(pool, self._run_shard, system_prompt, shard, i, len(shards), extra_instructions): i
+                for i, shard in enumerate(shards)
+            }
+            for future in as_completed(futures):
+                i = futures[future]
+                try:
+                    results[i] = future.result()
+                except Exception as e:
+                    self.logger.error(f"Shard {i + 1}/{len(shards)} failed: {e}")
+                    failed.append({"shard": i + 1, "slot_ids": [get_slot_id(it) for it in shards[i]], "error": str(e)})
+
+        merged = self._merge_shard_results([r for r in results if r])
+        merged["sharding"] = {"shards": len(shards), "shard_size": shard_size, "group_by": group_by, "failed": failed}
+        return merged
+
+    def _load_shard_items(self) -> list[dict]:
+        """Lee las piezas por slot del output más reciente de shard_source."""
+        data = self.load_latest_output(self.shard_source)
+        return extract_items(data, self.shard_item_paths)
+
+    def _split_shards(self, items: list[dict], shard_size: int, group_by: str) -> list[list[dict]]:
+        """Agrupa las piezas (por slot, o por un campo como platform/date) y las parte en shards."""
+        if group_by == "slot":
+            groups = [items]
+        else:
+            grouped: dict[str, list[dict]] = {}
+            for item in items:
+                grouped.setdefault(str(item.get(group_by, "")), []).append(item)
+            groups = list(grouped.values())
+        return [group[i:i + shard_size] for group in groups for i in range(0, len(group), shard_size)]
+
+    def _shard_tools(self) -> list[dict]:
+        """Tools de un shard: las del agente sin save_agent_output, más submit_shard_result."""
+        tools = [t for t in self.get_tools() if t["name"] != "save_agent_output"]
+        tools.append({
+            "name": "submit_shard_result",
+            "description": "Submit the JSON result for the pieces assigned to this shard.",
+            "input_schema": {
+                "type": "object",
+                "properties": {
+                    "result_data": {
+                        "type": "string",
+                        "description": f'JSON string with a "{self.shard_result_key}" list, one entry per assigned piece',
+                    },
+                },
+                "required": ["result_data"],
+            },
+        })
+        return tools
+
+    def _build_shard_prompt(self, items: list[dict], index: int, total: int, extra_instructions: str = "") -> str:
+        """Prompt de un shard: la tarea normal del agente restringida a las piezas asignadas."""
+        prompt = self._build_prompt() + f"""
+
+## MODO SHARD ({index + 1}/{total})
+Estás procesando solo una parte del trabajo en paralelo con otros shards.
+- Procesa ÚNICAMENTE las {len(items)} piezas listadas abajo (ya vienen de `{self.shard_source}`, no necesitas leerlas con `read_agent_output`).
+- NO uses `save_agent_output`. Entrega el resultado con `submit_shard_result` como un JSON
+  con la clave "{self.shard_result_key}" (una entrada por pieza, conservando su slot_id).
+"""
+        if extra_instructions:
+            prompt += f"\n{extra_instructions}\n"
+        prompt += "\n### Piezas asignadas:\n```json\n" + json.dumps(items, ensure_ascii=False, default=str) + "\n```"
+        return self._inject_campaign_context(prompt)
+
+    def _run_shard(self, system_prompt: str, items: list[dict], index: int, total: int,
+                   extra_instructions: str = "") -> dict:
+        """Ejecuta un agentic loop para un shard y retorna su resultado parseado."""
+        QUEUE_DEPTH.dec()
+        submitted: list[dict] = []
+
+        def handle(tool_name: str, tool_input: dict) -> str:
+            if tool_name == "submit_shard_result":
+                data = self._extract_json(tool_input.get("result_data", ""))
+                if not isinstance(data, dict):
+                    return "Error: result_data must be a JSON object"
+                submitted.append(data)
+                return f"Shard result received ({len(data.get(self.shard_result_key, []))} entries)."
+            return self.handle_tool_call(tool_name, tool_input)
+
+        self.logger.info(f"Shard {index + 1}/{total}: {[get_slot_id(it) for it in items]}")
+        prompt = self._build_shard_prompt(items, index, total, extra_instructions)
+        with span(f"shard {index + 1}/{total}", shard=index + 1, items=len(items)):
+            final_text = self._agentic_loop(system_prompt, prompt, self._shard_tools(), handle, shard=index + 1)
+
+        if submitted:
+            return submitted[-1]
+        # Fallback: el modelo respondió con el JSON en texto en lugar de usar el tool
+        data = self._extract_json(final_text)
+        if isinstance(data, dict):
+            return data
+        if isinstance(data, list):
+            return {self.shard_result_key: data}
+        raise ValueError(f"shard {index + 1} returned no parseable result")
+
+    def _merge_shard_results(self, results: list[dict]) -> dict:
+        """Combina los resultados de los shards: concatena listas, une dicts, conserva el primer escalar."""
+        merged: dict = {}
+        for result in results:
+            for key, value in result.items():
+                if isinstance(value, list):
+                    merged.setdefault(key, []).extend(value)
+                elif isinstance(value, dict):
+                    merged.setdefault(key, {}).update(value)
+                else:
+                    merged.setdefault(key, value)
+        merged.setdefault(self.shard_result_key, [])
+        return merged
+
+    def _finalize_merged_output(self, merged: dict) -> dict:
+        """Override para recalcular totales/agregados del output combinado (sharded o batch)."""
+        return merged
+
+    # ── Regeneración por slot ─────────────────────────────
+
+    def regenerate_slots(self, feedback: dict[str, str]) -> str:
+        """
+        Rehace solo las piezas de los slots rechazados (slot_id → feedback del
+        revisor) y las combina en el último output del agente, que se guarda como
+        un output nuevo. Los agentes con shard_source usan sus shards; el resto,
+        un agentic loop restringido a esas piezas. Los slots que fallan conservan
+        su versión anterior.
+        """
+        previous = self.load_latest_output(self.name)
+        if not isinstance(previous, dict):
+            raise ValueError(f"No previous {self.name} output to merge the regenerated slots into")
+        items = self._regeneration_items(set(feedback))
+        if not items:
+            self.logger.info(f"Regeneration: no {self.name} pieces for slots {sorted(feedback)}")
+            return f"No {self.name} pieces to regenerate"
+
+        slot_ids = sorted({get_slot_id(item) for item in items})
+        self.logger.info(f"Regenerating {len(items)} pieces for slots {slot_ids}")
+        instructions = self._regeneration_instructions(feedback, slot_ids)
+        with span("regenerate", agent=self.name, slots=len(slot_ids)):
+            if self.shard_source:
+                partial = self._run_shards(items, instructions)
+            else:
+                partial = self._regenerate_agentic(items, instructions)
+
+        replaced = {
+            get_slot_id(item) for value in partial.values() if isinstance(value, list)
+            for item in value if isinstance(item, dict)
+        } & set(slot_ids)
+        merged = self._finalize_merged_output(merge_slot_items(previous, partial, replaced))
+        merged["regeneration"] = {
+            "run_id": self.run_id,
+            "slot_ids": sorted(replaced),
+            "failed": [slot_id for slot_id in slot_ids if slot_id not in replaced],
+        }
+        output_path = self.save_output(merged, suffix=self._get_default_suffix())
+
+        summary = f"Regenerated {len(replaced)}/{len(slot_ids)} slots, merged into {output_path}"
+        self.logger.info(summary)
+        return summary
+
+    def _regeneration_items(self, slot_ids: set[str]) -> list[dict]:
+        """Piezas upstream de los slots a regenerar (shard_source, o regeneration_source)."""
+        if self.shard_source:
+            items = self._load_shard_items()
+        else:
+            items = extract_items(self.load_latest_output(self.regeneration_source), self.regeneration_item_paths)
+        return [item for item in items if get_slot_id(item) in slot_ids]
+
+    def _regeneration_instructions(self, feedback: dict[str, str], slot_ids: list[str]) -> str:
+        lines = "\n".join(f"- {slot_id}: {feedback.get(slot_id) or 'sin comentarios'}" for slot_id in slot_ids)
+        return f"""## REGENERACIÓN
+Estas piezas fueron RECHAZADAS en la revisión humana. Rehazlas desde cero aplicando
+el feedback del revisor (conserva el slot_id de cada pieza):
+{lines}"""
+
+    def _regenerate_agentic(self, items: list[dict], instructions: str) -> dict:
+        """Agentic loop sobre las piezas dadas; retorna el output parcial que guardó el modelo."""
+        before = len(self.saved_outputs)
+        prompt = self._build_prompt() + f"""
+
+{instructions}
+
+Procesa ÚNICAMENTE estas {len(items)} piezas (ya vienen de `{self.regeneration_source}`, no necesitas
+leerlas con `read_agent_output`) y guarda con `save_agent_output` un output con SOLO ellas.
+
+### Piezas a regenerar:
+```json
+{json.dumps(items, ensure_ascii=False, default=str)}
+```"""
+        self._run_agentic(prompt)
+        if len(self.saved_outputs) == before:
+            return {}
+        partial_path = self.saved_outputs.pop()
+        partial = load_json(partial_path)
+        # El output parcial no queda como "el último" del agente: lo reemplaza el combinado
+        partial_path.unlink(missing_ok=True)
+        if store_enabled(self.config):
+            try:
+                delete_output(partial_path)
+            except Exception as e:
+                self.logger.warning(f"Output store: could not drop {partial_path.name}: {e}")
+        return partial if isinstance(partial, dict) else {}
+
+    # ── Message Batches (batch mode) ───────────────────────
+
+    def run_batch(self, items: list[dict] | None = None) -> str:
+        """
+        Envía una request por pieza como un único message batch (prompt de
+        _build_batch_prompt, que debe pedir solo un objeto JSON), espera a que
+        termine y arma el output estándar del agente con las respuestas.
+        Sin tool_use: las brand guidelines van en el system prompt (cacheado).
+        """
+        if items is None:
+            items = self._load_shard_items()
+        if not items:
+            self.logger.warning(f"No items found in {self.shard_source} output, falling back to agentic loop")
+            return self._run_agentic()
+
+        batch_cfg = self.agent_config.get("batch") or {}
+        system = self._batch_system_prompt()
+        custom_ids = [f"piece-{i:04d}" for i in range(len(items))]
+        requests = [
+            {
+                "custom_id": custom_id,
+                "params": {
+                    "model": self.generation_model,
+                    "max_tokens": int(batch_cfg.get("max_tokens", 2048)),
+                    "system": system,
+                    "messages": [{"role": "user", "content": self._build_batch_prompt(item)}],
+                },
+            }
+            for custom_id, item in zip(custom_ids, items)
+        ]
+
+        with span("message batch", requests=len(requests)) as batch_span:
+            batch_id, texts, errors = self._run_message_batch(requests)
+            batch_span.set_attributes({"batch_id": batch_id, "errored": len(errors)})
+
+        entries: list[dict] = []
+        failed: list[dict] = []
+        for custom_id, item in zip(custom_ids, items):
+            data = self._extract_json(texts[custom_id]) if custom_id in texts else None
+            if isinstance(data, dict):
+                data.setdefault("slot_id", get_slot_id(item))
+                entries.append(data)
+            else:
+                failed.append({"slot_id": get_slot_id(item), "error": errors.get(custom_id, "unparseable response")})
+
+        succeeded = len(entries)
+        merged = {
+            self.shard_result_key: entries,
+            "batch": {"batch_id": batch_id, "requests": len(requests), "failed": failed},
+        }
+        merged = self._finalize_merged_output(merged)
+        output_path = self.save_output(merged, suffix=self._get_default_suffix())
+
+        summary = f"Batch run completed: {succeeded}/{len(requests)} pieces saved to {output_path}"
+        self.logger.info(summary)
+        return summary
 
-        # Try to find a JSON block in the text (```json ... ``` or raw {})
-        json_data = None
+    def _batch_system_prompt(self) -> list[dict]:
+        """System prompt compartido por todas las requests del batch, marcado para prompt caching."""
+        text = self.load_prompt() + "\n\n## Brand guidelines\n```json\n" + json.dumps(
+            self.brand, ensure_ascii=False, default=str
+        ) + "\n```"
+        return [{"type": "text", "text": text, "cache_control": {"type": "ephemeral"}}]
+
+    def _batches_api(self):
+        """Message Batches API de Anthropic, o el stand-in local si batch.endpoint == "local"."""
+        batch_cfg = self.agent_config.get("batch") or {}
+        if batch_cfg.get("endpoint", "anthropic") == "local":
+            from utils.local_batches import LocalBatches
+            return LocalBatches(self.client.messages)
+        return self.client.messages.batches
+
+    def _cancel_batch(self, api, batch_id: str) -> None:
+        """Cancela el batch sin pisar el error en curso (timeout o cancelación del run) si el cancel falla."""
+        try:
+            api.cancel(batch_id)
+        except Exception as e:
+            self.logger.warning(f"Could not cancel message batch {batch_id}: {e}")
+
+    def _run_message_batch(self, requests: list[dict]) -> tuple[str, dict[str, str], dict[str, str]]:
+        """Crea el batch, hace polling hasta que termina y retorna (batch_id, textos, errores) por custom_id."""
+        batch_cfg = self.agent_config.get("batch") or {}
+        poll_interval = float(batch_cfg.get("poll_interval_seconds", 30))
+        max_wait = float(batch_cfg.get("max_wait_seconds", 24 * 3600))
+
+        api = self._batches_api()
+        batch = call_with_retry("anthropic", "batches.create", lambda: api.create(requests=requests),
+                                idempotent=False, logger=self.logger)
+        self.logger.info(f"Message batch {batch.id} submitted with {len(requests)} requests")
+
+        started = time.monotonic()
+        QUEUE_DEPTH.inc(len(requests))
+        try:
+            while batch.processing_status != "ended":
+                if time.monotonic() - started > max_wait:
+                    self._cancel_batch(api, batch.id)
+                    raise TimeoutError(f"Message batch {batch.id} did not finish in {max_wait:.0f}s")
+                try:
+                    interruptible_sleep(poll_interval)
+                except RunCancelled:
+                    self._cancel_batch(api, batch.id)  # las requests que no empezaron no se cobran
+                    raise
+                batch = call_with_retry("anthropic", "batches.retrieve", lambda: api.retrieve(batch.id),
+                                        logger=self.logger)
+                counts = batch.request_counts
+                self.logger.info(
+                    f"Batch {batch.id}: {batch.processing_status} "
+                    f"(processing={counts.processing}, succeeded={counts.succeeded}, errored={counts.errored})"
+                )
+        finally:
+            QUEUE_DEPTH.dec(len(requests))
+
+        texts: dict[str, str] = {}
+        errors: dict[str, str] = {}
+        model = requests[0]["params"]["model"] if requests else self.generation_model
+        for entry in api.results(batch.id):
+            if entry.result.type == "succeeded":
+                AGENT_TURNS.labels(agent=self.name).inc()
+                if self.account:
+                    record_llm_tokens(self.name, self.account.record_turn(entry.result.message, model, None, batch=True))
+                texts[entry.custom_id] = "\n".join(
+                    block.text for block in entry.result.message.content if block.type == "text"
+                )
+            else:
+                error = getattr(entry.result, "error", None)
+                errors[entry.custom_id] = f"{entry.result.type}: {getattr(error, 'message', error) or ''}".strip()
+        return batch.id, texts, errors
+
+    def _extract_json(self, text: str) -> Any:
+        """Extrae JSON del texto de una respuesta (bloque ```json, texto completo o el mayor {...})."""
+        import re
 
         # 1. Look for ```json ... ``` blocks
         json_match = re.search(r"```json\s*\n?(.*?)\n?\s*```", text, re.DOTALL)
         if json_match:
             try:
-                json_data = json.loads(json_match.group(1))
+                return json.loads(json_match.group(1))
             except (json.JSONDecodeError, TypeError):
                 pass
 
         # 2. Try the entire text as JSON
-        if json_data is None:
+        try:
+            return json.loads(text)
+        except (json.JSONDecodeError, TypeError):
+            pass
+
+        # 3. Try to find the largest {...} block
+        brace_match = re.search(r"\{[\s\S]+\}", text)
+        if brace_match:
             try:
-                json_data = json.loads(text)
+                return json.loads(brace_match.group(0))
             except (json.JSONDecodeError, TypeError):
                 pass
 
-        # 3. Try to find the largest {...} block
-        if json_data is None:
-            brace_match = re.search(r"\{[\s\S]+\}", text)
-            if brace_match:
-                try:
-                    json_data = json.loads(brace_match.group(0))
-                except (json.JSONDecodeError, TypeError):
-                    pass
+        return None
 
-        # 4. Fallback: save raw text as wrapped JSON
+    def _auto_save_output(self, text: str) -> None:
+        """Attempt to extract JSON from the agent's final text and save it."""
+        json_data = self._extract_json(text)
+
+        # Fallback: save raw text as wrapped JSON
         if json_data is None:
             json_data = {"raw_output": text, "auto_saved": True}
             self.logger.warning("Could not parse JSON from output, saving raw text")
@@ -377,7 +1182,9 @@ usa el brief como guía principal.
             self.logger.error("Auto-save failed: %s", e)
 
     def _get_default_suffix(self) -> str:
-        """Return a reasonable default suffix based on agent name."""
+        """Return the agent's output suffix, or a reasonable default based on its name."""
+        if self.output_suffix:
+            return self.output_suffix
         suffix_map = {
             "trend_researcher": "trend_report",
             "viral_analyzer": "viral_analysis",
@@ -400,21 +1207,53 @@ usa el brief como guía principal.
 
     def save_output(self, data: Any, suffix: str = "output") -> Path:
         filename = timestamp_filename(self.name, suffix)
-        output_path = self.project_root / "data" / "outputs" / filename
-        save_json(data if isinstance(data, dict) else data.model_dump(), output_path)
+        output_path = get_data_dir() / "outputs" / filename
+        data = data if isinstance(data, dict) else data.model_dump()
+        save_json(data, output_path)
+        self._record_output(output_path, data)
+        self.saved_outputs.append(output_path)
         self.logger.info(f"Output saved: {output_path}")
         return output_path
 
-    def load_latest_output(self, agent_name: str) -> dict | None:
-        outputs_dir = self.project_root / "data" / "outputs"
+    def _record_output(self, output_path: Path, data: Any) -> None:
+        """Registra el output en el repositorio SQLite (utils.output_store), si está activo; el JSON ya quedó en disco."""
+        if not store_enabled(self.config):
+            return
+        try:
+            store_output(self.name, output_path, data, self.run_id)
+        except Exception as e:
+            self.logger.warning(f"Output store: could not record {output_path.name}: {e}")
+
+    def latest_output_path(self, agent_name: str) -> Path | None:
+        """Archivo del último output del agente: el del output store si está activo, si no el JSON más nuevo."""
+        if store_enabled(self.config):
+            try:
+                path = latest_output_file(agent_name)
+            except Exception as e:
+                self.logger.warning(f"Output store: could not look up the latest {agent_name} output: {e}")
+            else:
+                if path is not None:
+                    return path
+        outputs_dir = get_data_dir() / "outputs"
         files = sorted(outputs_dir.glob(f"{agent_name}_*.json"), key=lambda f: f.stat().st_mtime, reverse=True)
-        return load_json(files[0]) if files else None
+        return files[0] if files else None
+
+    def load_latest_output(self, agent_name: str) -> dict | None:
+        """Contenido del último output del agente (output store si está activo; JSON en disco de fallback)."""
+        if store_enabled(self.config):
+            try:
+                data = latest_output(agent_name)
+            except Exception as e:
+                self.logger.warning(f"Output store: could not load the latest {agent_name} output: {e}")
+            else:
+                if data is not None:
+                    return data
+        path = self.latest_output_path(agent_name)
+        return load_json(path) if path else None
 
     def get_pipeline_state(self) -> dict:
-        state_path = self.project_root / "data" / "outputs" / "pipeline_state.json"
-        return load_json(state_path) if state_path.exists() else {"phase": "idle", "agents_completed": [], "errors": []}
+        return get_state()
 
     def update_pipeline_state(self, updates: dict) -> None:
-        state = self.get_pipeline_state()
-        state.update(updates)
-        save_json(state, self.project_root / "data" / "outputs" / "pipeline_state.json")
+        """Fusiona `updates` en el estado del pipeline (en memoria; el snapshot lo escribe utils.pipeline_state)."""
+        update_state(updates)
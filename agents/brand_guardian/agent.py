@@ -3,13 +3,160 @@ Brand Guardian Agent - Valida que todo el contenido cumpla con el brand kit.
 Usa Anthropic API directamente con tool_use.
 """
 
+import json
+
 from agents.base import BaseAgent
+from utils.compliance_rules import prescreen_pieces
+from utils.helpers import extract_items, get_slot_id, save_json
+
+
+def score_to_status(score: float) -> str:
+    """Criterios de aprobación del prompt: >0.9, 0.7-0.89, 0.5-0.69, <0.5."""
+    if score > 0.9:
+        return "approved"
+    if score >= 0.7:
+        return "approved_with_notes"
+    if score >= 0.5:
+        return "needs_revision"
+    return "rejected"
 
 
 class BrandGuardianAgent(BaseAgent):
     name = "brand_guardian"
     description = "Valida compliance de todo el contenido con las brand guidelines"
     max_turns = 10  # Haiku: read content + check against brand guidelines
+    output_suffix = "compliance_report"
+
+    # Sharded/batch mode: cada shard (o request) revisa guiones junto con su SEO
+    shard_source = "copywriter"
+    shard_item_paths = ("scripts", "carousel_scripts", "podcast_scripts")
+    shard_result_key = "content_reviews"
+
+    def _execute(self, custom_prompt: str | None = None) -> str:
+        """Pre-screen por reglas y LLM solo para las piezas ambiguas."""
+        self._prescreen: list[dict] = []
+        if custom_prompt is not None or not (self.agent_config.get("prescreen") or {}).get("enabled", False):
+            return super()._execute(custom_prompt)
+
+        items = self._load_shard_items()
+        if not items:
+            return super()._execute(custom_prompt)
+
+        self._prescreen = prescreen_pieces(items, self.config, self.platforms)
+        ambiguous = [item for item, r in zip(items, self._prescreen) if r["verdict"] == "review"]
+        counts = {v: sum(1 for r in self._prescreen if r["verdict"] == v) for v in ("pass", "reject", "review")}
+        self.logger.info(
+            f"Prescreen: {counts['pass']} auto-approved, {counts['reject']} auto-rejected, "
+            f"{counts['review']} sent to LLM"
+        )
+
+        if not ambiguous:
+            report = self._finalize_merged_output({"content_reviews": []})
+            output_path = self.save_output(report, suffix=self._get_default_suffix())
+            return f"All {len(items)} pieces decided by prescreen rules. Report saved to {output_path}"
+
+        mode = self.execution_mode
+        if mode == "sharded":
+            return self.run_sharded(items=ambiguous)
+        if mode == "batch":
+            return self.run_batch(items=ambiguous)
+
+        # Agentic: el LLM revisa solo las piezas ambiguas; luego se agregan las decididas por reglas
+        slot_ids = [get_slot_id(item) for item in ambiguous]
+        prompt = self._build_prompt() + f"""
+
+## PRE-SCREEN
+Las reglas mecánicas (longitudes, hashtags, frases prohibidas) ya decidieron el resto de piezas.
+Evalúa y guarda en content_reviews ÚNICAMENTE estos slot_id: {", ".join(slot_ids)}"""
+        result = self._run_agentic(prompt)
+        output_path = self.latest_output_path(self.name) if self._output_saved else None
+        report = self.load_latest_output(self.name) if output_path else None
+        if isinstance(report, dict):
+            report = self._finalize_merged_output(report)
+            save_json(report, output_path)
+            self._record_output(output_path, report)  # el store guarda el reporte combinado, no el parcial
+        return result
+
+    def regenerate_slots(self, feedback: dict[str, str]) -> str:
+        """Revisa de nuevo solo los slots regenerados, sin sumar el prescreen del último run completo."""
+        self._prescreen = []
+        return super().regenerate_slots(feedback)
+
+    def _regeneration_instructions(self, feedback: dict[str, str], slot_ids: list[str]) -> str:
+        lines = "\n".join(f"- {slot_id}: {feedback.get(slot_id) or 'sin comentarios'}" for slot_id in slot_ids)
+        return f"""## RE-REVISIÓN
+Estas piezas se reescribieron después de un rechazo en la revisión humana. Evalúalas de
+nuevo y verifica que el feedback del revisor quedó resuelto:
+{lines}"""
+
+    def _prescreen_reviews(self, reviewed: set[str]) -> list[dict]:
+        """Revisiones para las piezas decididas por reglas (las que el LLM no revisó)."""
+        reviews = []
+        for result in self._prescreen:
+            if result["verdict"] == "review" or result["slot_id"] in reviewed:
+                continue
+            reviews.append({
+                "slot_id": result["slot_id"],
+                "status": "approved" if result["verdict"] == "pass" else "rejected",
+                "issues": result["violations"] + result["warnings"],
+                "suggestions": [],
+                "reviewed_by": "prescreen_rules",
+                "prescreen": result["metrics"],
+            })
+        return reviews
+
+    def _load_shard_items(self) -> list[dict]:
+        """Adjunta a cada guión la optimización SEO de su mismo slot."""
+        items = super()._load_shard_items()
+        seo = extract_items(self.load_latest_output("seo_hashtag_specialist"), ("optimizations",))
+        seo_by_slot = {get_slot_id(o): o for o in seo}
+        for item in items:
+            if get_slot_id(item) in seo_by_slot:
+                item["seo"] = seo_by_slot[get_slot_id(item)]
+        return items
+
+    def _finalize_merged_output(self, merged: dict) -> dict:
+        """Recalcula el score y la recomendación del batch a partir de las revisiones combinadas."""
+        reviews = merged.setdefault("content_reviews", [])
+        if getattr(self, "_prescreen", None):
+            reviews.extend(self._prescreen_reviews({get_slot_id(r) for r in reviews}))
+            merged["prescreen"] = {
+                v: sum(1 for r in self._prescreen if r["verdict"] == v) for v in ("pass", "reject", "review")
+            }
+        for review in reviews:
+            if isinstance(review.get("overall_score"), (int, float)):
+                review.setdefault("status", score_to_status(review["overall_score"]))
+        scores = [r["overall_score"] for r in reviews if isinstance(r.get("overall_score"), (int, float))]
+        merged["batch_score"] = round(sum(scores) / len(scores), 3) if scores else 0.0
+        if scores:
+            merged["batch_recommendation"] = score_to_status(merged["batch_score"])
+        else:  # todo decidido por reglas, sin scores del LLM
+            rejected = any(r.get("status") == "rejected" for r in reviews)
+            merged["batch_recommendation"] = "needs_revision" if rejected else "approved"
+        merged["critical_issues"] = [
+            {"slot_id": r.get("slot_id"), "issues": r.get("issues", [])}
+            for r in reviews if r.get("status") == "rejected"
+        ]
+        merged["summary"] = f"{len(reviews)} pieces reviewed."
+        return merged
+
+    def _build_batch_prompt(self, item: dict) -> str:
+        return f"""Evalúa esta pieza de contenido de A&J Phygital Group contra las brand guidelines.
+
+Puntúa de 0 a 1: voice_score (tono de voz), message_consistency_score (consistencia de mensajes),
+reputation_risk_score (1 = sin riesgo) y quality_score (calidad general). overall_score es el promedio.
+
+Criterios: >0.9 approved, 0.7-0.89 approved_with_notes, 0.5-0.69 needs_revision, <0.5 rejected.
+
+Responde SOLO con un objeto JSON:
+{{"slot_id": "{get_slot_id(item)}", "voice_score": 0.9, "message_consistency_score": 0.85,
+  "reputation_risk_score": 0.95, "quality_score": 0.88, "overall_score": 0.89,
+  "status": "approved_with_notes", "issues": [], "suggestions": []}}
+
+### Pieza:
+```json
+{json.dumps(item, ensure_ascii=False, default=str)}
+```"""
 
     def _build_prompt(self) -> str:
         return """Valida que TODO el contenido generado cumpla con las brand guidelines de A&J Phygital Group.
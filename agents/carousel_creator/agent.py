@@ -6,17 +6,21 @@ y Pillow para agregar texto perfecto con la fuente correcta.
 
 import os
 
-import httpx
-import replicate
-
 from agents.base import BaseAgent
-from utils.helpers import get_project_root
+from utils.api_clients import get_http_client, run_replicate
+from utils.cancellation import time_left
+from utils.helpers import get_data_dir
+from utils.limiter import limited
+from utils.retry import call_with_retry
 
 
 class CarouselCreatorAgent(BaseAgent):
     name = "carousel_creator"
     description = "Crea carruseles visuales para Instagram y LinkedIn"
     max_turns = 15
+    # Regeneración por slot: los carruseles salen de los guiones del copywriter
+    regeneration_source = "copywriter"
+    regeneration_item_paths = ("carousel_scripts", "scripts")
 
     def get_tools(self) -> list[dict]:
         """Agrega tools de generacion de slides y text overlay."""
@@ -125,25 +129,33 @@ class CarouselCreatorAgent(BaseAgent):
                 f"Configure REPLICATE_API_TOKEN in .env to enable."
             )
 
-        output_dir = get_project_root() / "data" / "outputs" / "carousels"
+        output_dir = get_data_dir() / "outputs" / "carousels"
         output_dir.mkdir(parents=True, exist_ok=True)
         output_path = output_dir / args["filename"]
 
         try:
-            output = replicate.run(
-                "black-forest-labs/flux-1.1-pro",
-                input={
-                    "prompt": args["prompt"],
-                    "width": args.get("width", 1080),
-                    "height": args.get("height", 1080),
-                    "output_format": "png",
-                    "prompt_upsampling": True,
-                },
+            output = call_with_retry(
+                "replicate", "flux-1.1-pro",
+                lambda: limited(  # concurrencia adaptativa (utils.limiter): un slot por intento
+                    "replicate", run_replicate,
+                    "black-forest-labs/flux-1.1-pro",
+                    {
+                        "prompt": args["prompt"],
+                        "width": args.get("width", 1080),
+                        "height": args.get("height", 1080),
+                        "output_format": "png",
+                        "prompt_upsampling": True,
+                    },
+                ),
+                idempotent=False,  # cada intento crea una predicción (y se cobra)
+                logger=self.logger,
             )
 
             img_url = str(output)
-            img_response = httpx.get(img_url, timeout=60)
-            img_response.raise_for_status()
+            img_response = call_with_retry(
+                "replicate", "download", lambda: get_http_client().get(img_url, timeout=time_left(60)).raise_for_status(),
+                logger=self.logger,
+            )
             output_path.write_bytes(img_response.content)
             self.logger.info(f"Slide saved: {output_path}")
             return f"Slide {args['slide_number']} saved to: {output_path}. Now use add_text_to_slide to add text."
@@ -157,7 +169,7 @@ class CarouselCreatorAgent(BaseAgent):
         try:
             from utils.image_text import add_text_overlay
 
-            carousels_dir = get_project_root() / "data" / "outputs" / "carousels"
+            carousels_dir = get_data_dir() / "outputs" / "carousels"
             image_path = carousels_dir / args["filename"]
 
             if not image_path.exists():
@@ -179,13 +191,13 @@ class CarouselCreatorAgent(BaseAgent):
         try:
             from PIL import Image
 
-            templates_dir = get_project_root() / "data" / "inputs" / "templates"
+            templates_dir = get_data_dir() / "inputs" / "templates"
             template_path = templates_dir / args["template_filename"]
 
             if not template_path.exists():
                 return f"Error: Template not found: {args['template_filename']}"
 
-            output_dir = get_project_root() / "data" / "outputs" / "carousels"
+            output_dir = get_data_dir() / "outputs" / "carousels"
             output_dir.mkdir(parents=True, exist_ok=True)
             output_path = output_dir / args["output_filename"]
 
@@ -202,6 +214,11 @@ class CarouselCreatorAgent(BaseAgent):
             self.logger.error(f"Template error: {e}")
             return f"Error using template: {str(e)}"
 
+    def _regeneration_items(self, slot_ids: set[str]) -> list[dict]:
+        """Solo los carruseles: guiones con slides o con content_type carousel."""
+        return [item for item in super()._regeneration_items(slot_ids)
+                if "slides" in item or "carousel" in (item.get("content_type"), item.get("format"))]
+
     def _build_prompt(self) -> str:
         return """Crea carruseles visuales para Instagram y LinkedIn de A&J Phygital Group.
 
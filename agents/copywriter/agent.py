@@ -11,6 +11,16 @@ class CopywriterAgent(BaseAgent):
     description = "Escribe guiones para podcast, reels, TikTok, YouTube, LinkedIn y descripciones"
     model = "claude-sonnet-4-20250514"  # Needs creative writing quality
     max_turns = 20
+    output_suffix = "content_scripts"
+
+    # Sharded mode: un shard por grupo de slots del ContentPlan
+    shard_source = "content_planner"
+    shard_item_paths = ("daily_plans.content_slots", "days.slots", "content_slots", "slots")
+    shard_result_key = "scripts"
+
+    def _finalize_merged_output(self, merged: dict) -> dict:
+        merged["total_scripts"] = len(merged.get("scripts", []))
+        return merged
 
     def _build_prompt(self) -> str:
         return """Escribe todos los guiones y textos para el plan de contenido de A&J Phygital Group.
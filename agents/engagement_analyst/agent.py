@@ -10,6 +10,7 @@ class EngagementAnalystAgent(BaseAgent):
     name = "engagement_analyst"
     description = "Analiza métricas de engagement y genera insights accionables"
     max_turns = 10  # Haiku: read metrics + generate report
+    memoize = False  # las métricas cambian aunque los inputs sean los mismos
 
     def _build_prompt(self) -> str:
         return """Analiza las métricas de engagement post-publicación para A&J Phygital Group.
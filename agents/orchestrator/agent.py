@@ -13,8 +13,12 @@ from rich.console import Console
 from rich.panel import Panel
 
 from agents.base import BaseAgent
-from utils.helpers import save_json
+from utils.cancellation import RunCancelled, RunTimeout
+from utils.helpers import get_data_dir, save_json
 from utils.logger import setup_logger
+from utils.pipeline_state import set_state
+from utils.run_context import ensure_run_id
+from utils.tracing import span
 
 console = Console()
 
@@ -64,19 +68,23 @@ class OrchestratorAgent(BaseAgent):
             console.print(f"[green]OK {agent_name} completed[/green]")
 
             return {"agent": agent_name, "status": "completed", "result_length": len(result) if result else 0}
-        except Exception as e:
+        except (Exception, RunTimeout) as e:  # un agente que vence su deadline falla como cualquier otro
             self.logger.error(f"Agent {agent_name} failed: {e}\n{traceback.format_exc()}")
             console.print(f"[red]FAIL {agent_name} failed: {e}[/red]")
             return {"agent": agent_name, "status": "error", "error": str(e)}
+        except RunCancelled as e:
+            console.print(f"[red]STOP {agent_name}: {e}[/red]")
+            return {"agent": agent_name, "status": "stopped", "error": str(e)}
 
     def run_pipeline(self, skip_checkpoints: bool = False, campaign_brief: str | None = None) -> dict:
         """Ejecuta el pipeline completo fase por fase."""
-        self.logger.info("Starting Content Engine Pipeline")
+        run_id = ensure_run_id()
+        self.logger.info(f"Starting Content Engine Pipeline (run {run_id})")
 
         # Si hay un brief de campaña, guardarlo para que los agentes lo lean
         if campaign_brief:
             from datetime import datetime, timezone
-            inputs_dir = self.project_root / "data" / "inputs"
+            inputs_dir = get_data_dir() / "inputs"
             inputs_dir.mkdir(parents=True, exist_ok=True)
             save_json({
                 "brief": campaign_brief,
@@ -91,47 +99,54 @@ class OrchestratorAgent(BaseAgent):
             style="bold blue",
         ))
 
-        pipeline_results = {"phases": {}, "errors": [], "status": "completed"}
-
-        for phase_num in sorted(PHASES.keys()):
-            phase_info = PHASES[phase_num]
-            console.print(f"\n[bold blue]=== FASE {phase_num}: {phase_info['name']} ===[/bold blue]")
-
-            phase_results = []
-            for agent_name in phase_info["agents"]:
-                result = self._run_single_agent(agent_name)
-                phase_results.append(result)
-                if result["status"] == "error":
-                    pipeline_results["errors"].append(result)
-
-            pipeline_results["phases"][phase_num] = {
-                "name": phase_info["name"],
-                "results": phase_results,
-            }
-
-            # Update pipeline state
-            self.update_pipeline_state({
-                "phase": phase_num,
-                "phase_name": phase_info["name"],
-                "agents_completed": [r["agent"] for r in phase_results if r["status"] == "completed"],
-            })
-
-            # Checkpoint
-            if phase_info.get("checkpoint") and not skip_checkpoints:
-                console.print("[yellow]CHECKPOINT: Requiere aprobacion humana.[/yellow]")
-                try:
-                    import typer
-                    proceed = typer.confirm("¿Aprobar y continuar?")
-                    if not proceed:
-                        console.print("[red]Pipeline detenido por el usuario.[/red]")
-                        pipeline_results["status"] = "stopped_by_user"
-                        break
-                except Exception:
-                    console.print("[yellow]Running non-interactively, skipping checkpoint.[/yellow]")
+        pipeline_results = {"run_id": run_id, "phases": {}, "errors": [], "status": "completed"}
+
+        with span("pipeline", skip_checkpoints=skip_checkpoints):
+            for phase_num in sorted(PHASES.keys()):
+                phase_info = PHASES[phase_num]
+                console.print(f"\n[bold blue]=== FASE {phase_num}: {phase_info['name']} ===[/bold blue]")
+
+                phase_results = []
+                with span(f"phase {phase_num}: {phase_info['name']}", phase=phase_num):
+                    for agent_name in phase_info["agents"]:
+                        result = self._run_single_agent(agent_name)
+                        phase_results.append(result)
+                        if result["status"] == "error":
+                            pipeline_results["errors"].append(result)
+                        elif result["status"] == "stopped":
+                            pipeline_results["status"] = "stopped_by_user"
+                            break
+
+                pipeline_results["phases"][phase_num] = {
+                    "name": phase_info["name"],
+                    "results": phase_results,
+                }
+
+                # Update pipeline state
+                self.update_pipeline_state({
+                    "run_id": run_id,
+                    "phase": phase_num,
+                    "phase_name": phase_info["name"],
+                    "agents_completed": [r["agent"] for r in phase_results if r["status"] == "completed"],
+                })
+                if pipeline_results["status"] == "stopped_by_user":
+                    break
+
+                # Checkpoint
+                if phase_info.get("checkpoint") and not skip_checkpoints:
+                    console.print("[yellow]CHECKPOINT: Requiere aprobacion humana.[/yellow]")
+                    try:
+                        import typer
+                        proceed = typer.confirm("¿Aprobar y continuar?")
+                        if not proceed:
+                            console.print("[red]Pipeline detenido por el usuario.[/red]")
+                            pipeline_results["status"] = "stopped_by_user"
+                            break
+                    except Exception:
+                        console.print("[yellow]Running non-interactively, skipping checkpoint.[/yellow]")
 
         # Save final pipeline state
-        state_path = self.project_root / "data" / "outputs" / "pipeline_state.json"
-        save_json(pipeline_results, state_path)
+        set_state(pipeline_results)
 
         if pipeline_results["status"] == "completed":
             console.print(Panel("[bold green]Pipeline completado![/bold green]", style="green"))
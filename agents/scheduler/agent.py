@@ -5,15 +5,19 @@ Usa Meta Graph API para Facebook/Instagram, y stubs para LinkedIn/TikTok/YouTube
 
 import os
 
-import httpx
-
 from agents.base import BaseAgent
+from utils.api_clients import get_http_client
+from utils.cancellation import time_left
+from utils.retry import call_with_retry
+
+META_GRAPH_URL = os.getenv("META_GRAPH_URL", "https://graph.facebook.com/v21.0")
 
 
 class SchedulerAgent(BaseAgent):
     name = "scheduler"
     description = "Programa publicaciones en todas las redes sociales"
     max_turns = 12  # Haiku: read plan + schedule posts
+    memoize = False  # publica: cada run tiene que llegar a las plataformas
 
     def get_tools(self) -> list[dict]:
         """Agrega tools de scheduling por plataforma."""
@@ -90,6 +94,8 @@ class SchedulerAgent(BaseAgent):
 
     def _schedule_meta(self, args: dict) -> str:
         """Publica o programa en Facebook/Instagram via Meta Graph API."""
+        import httpx
+
         token = os.getenv("META_ACCESS_TOKEN", "")
         page_id = os.getenv("META_PAGE_ID", "")
         ig_account_id = os.getenv("INSTAGRAM_BUSINESS_ACCOUNT_ID", "")
@@ -109,13 +115,17 @@ class SchedulerAgent(BaseAgent):
                 if not page_id:
                     return "Error: META_PAGE_ID not set in .env"
                 # Facebook Page post
-                response = httpx.post(
-                    f"https://graph.facebook.com/v21.0/{page_id}/feed",
-                    params={"access_token": token},
-                    json={"message": args["caption"]},
-                    timeout=30,
+                response = call_with_retry(
+                    "meta", "page_feed",
+                    lambda: get_http_client().post(
+                        f"{META_GRAPH_URL}/{page_id}/feed",
+                        params={"access_token": token},
+                        json={"message": args["caption"]},
+                        timeout=time_left(30),
+                    ).raise_for_status(),
+                    idempotent=False,
+                    logger=self.logger,
                 )
-                response.raise_for_status()
                 post_id = response.json().get("id", "unknown")
                 return f"Facebook post published. Post ID: {post_id}"
 
@@ -130,24 +140,31 @@ class SchedulerAgent(BaseAgent):
                         f"Time: {args['scheduled_time']}\n"
                         f"Note: Provide a public image_url for real publishing."
                     )
-                # Step 1: Create media container
-                container_resp = httpx.post(
-                    f"https://graph.facebook.com/v21.0/{ig_account_id}/media",
-                    params={"access_token": token},
-                    json={"image_url": image_url, "caption": args["caption"]},
-                    timeout=30,
+                # Step 1: Create media container (sin publicar no sale al feed: se puede reintentar)
+                container_resp = call_with_retry(
+                    "meta", "ig_media",
+                    lambda: get_http_client().post(
+                        f"{META_GRAPH_URL}/{ig_account_id}/media",
+                        params={"access_token": token},
+                        json={"image_url": image_url, "caption": args["caption"]},
+                        timeout=time_left(30),
+                    ).raise_for_status(),
+                    logger=self.logger,
                 )
-                container_resp.raise_for_status()
                 creation_id = container_resp.json().get("id")
 
                 # Step 2: Publish
-                publish_resp = httpx.post(
-                    f"https://graph.facebook.com/v21.0/{ig_account_id}/media_publish",
-                    params={"access_token": token},
-                    json={"creation_id": creation_id},
-                    timeout=30,
+                publish_resp = call_with_retry(
+                    "meta", "ig_media_publish",
+                    lambda: get_http_client().post(
+                        f"{META_GRAPH_URL}/{ig_account_id}/media_publish",
+                        params={"access_token": token},
+                        json={"creation_id": creation_id},
+                        timeout=time_left(30),
+                    ).raise_for_status(),
+                    idempotent=False,
+                    logger=self.logger,
                 )
-                publish_resp.raise_for_status()
                 post_id = publish_resp.json().get("id", "unknown")
                 return f"Instagram post published. Post ID: {post_id}"
 
@@ -173,26 +190,30 @@ class SchedulerAgent(BaseAgent):
         org_id = os.getenv("LINKEDIN_ORGANIZATION_ID", "")
         try:
             author = f"urn:li:organization:{org_id}" if org_id else "urn:li:person:me"
-            response = httpx.post(
-                "https://api.linkedin.com/v2/ugcPosts",
-                headers={
-                    "Authorization": f"Bearer {token}",
-                    "X-Restli-Protocol-Version": "2.0.0",
-                },
-                json={
-                    "author": author,
-                    "lifecycleState": "PUBLISHED",
-                    "specificContent": {
-                        "com.linkedin.ugc.ShareContent": {
-                            "shareCommentary": {"text": args["text"]},
-                            "shareMediaCategory": "NONE",
-                        }
+            response = call_with_retry(
+                "linkedin", "ugc_posts",
+                lambda: get_http_client().post(
+                    "https://api.linkedin.com/v2/ugcPosts",
+                    headers={
+                        "Authorization": f"Bearer {token}",
+                        "X-Restli-Protocol-Version": "2.0.0",
                     },
-                    "visibility": {"com.linkedin.ugc.MemberNetworkVisibility": "PUBLIC"},
-                },
-                timeout=30,
+                    json={
+                        "author": author,
+                        "lifecycleState": "PUBLISHED",
+                        "specificContent": {
+                            "com.linkedin.ugc.ShareContent": {
+                                "shareCommentary": {"text": args["text"]},
+                                "shareMediaCategory": "NONE",
+                            }
+                        },
+                        "visibility": {"com.linkedin.ugc.MemberNetworkVisibility": "PUBLIC"},
+                    },
+                    timeout=time_left(30),
+                ).raise_for_status(),
+                idempotent=False,
+                logger=self.logger,
             )
-            response.raise_for_status()
             return f"LinkedIn post published. Response: {response.json()}"
         except Exception as e:
             self.logger.error(f"LinkedIn error: {e}")
@@ -3,13 +3,50 @@ SEO & Hashtag Specialist Agent - Optimiza SEO, hashtags y keywords.
 Usa Anthropic API directamente con tool_use.
 """
 
+import json
+
 from agents.base import BaseAgent
+from utils.helpers import get_slot_id
 
 
 class SEOHashtagSpecialistAgent(BaseAgent):
     name = "seo_hashtag_specialist"
     description = "Optimiza SEO, hashtags y keywords para máximo alcance orgánico"
     max_turns = 12  # Haiku: read scripts + generate hashtags/keywords
+    output_suffix = "seo_optimizations"
+
+    # Sharded/batch mode: piezas tomadas de los guiones del Copywriter
+    shard_source = "copywriter"
+    shard_item_paths = ("scripts", "carousel_scripts", "podcast_scripts")
+    shard_result_key = "optimizations"
+
+    def _build_batch_prompt(self, item: dict) -> str:
+        hashtags_per_post = self.agent_config.get("hashtags_per_post", {})
+        return f"""Optimiza SEO y hashtags para esta pieza de contenido de A&J Phygital Group.
+
+- Hashtags en 3 niveles (primary, secondary, long_tail) más los branded: #AJPhygitalGroup, #AutomateGrowDominate
+- Máximo de hashtags por plataforma: {json.dumps(hashtags_per_post)}
+- Prioriza hashtags en el idioma de la pieza; NO uses hashtags baneados o shadowbanned
+- Optimiza título y descripción con keywords naturales y genera alt text
+
+Responde SOLO con un objeto JSON:
+{{"slot_id": "{get_slot_id(item)}", "platform": "{item.get('platform', '')}",
+  "hashtags": {{"primary": [], "secondary": [], "long_tail": [], "branded": []}},
+  "optimized_title": "...", "optimized_description": "...", "alt_text": "...", "keywords": []}}
+
+### Pieza:
+```json
+{json.dumps(item, ensure_ascii=False, default=str)}
+```"""
+
+    def _finalize_merged_output(self, merged: dict) -> dict:
+        keywords: list[str] = []
+        for optimization in merged.get("optimizations", []):
+            for keyword in optimization.get("keywords", []):
+                if keyword not in keywords:
+                    keywords.append(keyword)
+        merged.setdefault("keyword_opportunities", keywords[:20])
+        return merged
 
     def _build_prompt(self) -> str:
         return """Optimiza SEO, hashtags y keywords para todo el contenido de A&J Phygital Group.
@@ -13,6 +13,7 @@ class TrendResearcherAgent(BaseAgent):
     name = "trend_researcher"
     description = "Investiga tendencias en redes sociales y Google"
     max_turns = 12  # Haiku: search Perplexity + structure output
+    memoize = False  # tendencias en vivo (Perplexity): la huella no las cubre
 
     def _build_prompt(self) -> str:
         return """Investiga las tendencias actuales en redes sociales y Google para A&J Phygital Group.
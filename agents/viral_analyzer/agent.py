@@ -11,6 +11,7 @@ class ViralAnalyzerAgent(BaseAgent):
     description = "Analiza estructura, tono, música y guión de contenido viral"
     model = "claude-sonnet-4-20250514"  # Needs deep narrative analysis
     max_turns = 12
+    memoize = False  # contenido viral en vivo (Perplexity): la huella no lo cubre
 
     def _build_prompt(self) -> str:
         return """Analiza la estructura de contenido viral en el nicho de A&J Phygital Group.
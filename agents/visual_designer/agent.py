@@ -6,17 +6,21 @@ y Pillow para agregar texto perfecto con la fuente correcta.
 
 import os
 
-import httpx
-import replicate
-
 from agents.base import BaseAgent
-from utils.helpers import get_project_root
+from utils.api_clients import get_http_client, run_replicate
+from utils.cancellation import time_left
+from utils.helpers import get_data_dir
+from utils.limiter import limited
+from utils.retry import call_with_retry
 
 
 class VisualDesignerAgent(BaseAgent):
     name = "visual_designer"
     description = "Genera imagenes de hooks, thumbnails y posts con Replicate (Flux) + text overlay con Pillow"
     max_turns = 15
+    # Regeneración por slot: las imágenes salen de los guiones del copywriter
+    regeneration_source = "copywriter"
+    regeneration_item_paths = ("scripts", "podcast_scripts")
 
     def get_tools(self) -> list[dict]:
         """Agrega tools de generacion de imagenes y text overlay."""
@@ -124,25 +128,33 @@ class VisualDesignerAgent(BaseAgent):
                 f"Configure REPLICATE_API_TOKEN in .env to enable image generation."
             )
 
-        output_dir = get_project_root() / "data" / "outputs" / "images"
+        output_dir = get_data_dir() / "outputs" / "images"
         output_dir.mkdir(parents=True, exist_ok=True)
         output_path = output_dir / args["filename"]
 
         try:
-            output = replicate.run(
-                "black-forest-labs/flux-1.1-pro",
-                input={
-                    "prompt": args["prompt"],
-                    "width": args.get("width", 1080),
-                    "height": args.get("height", 1080),
-                    "output_format": "png",
-                    "prompt_upsampling": True,
-                },
+            output = call_with_retry(
+                "replicate", "flux-1.1-pro",
+                lambda: limited(  # concurrencia adaptativa (utils.limiter): un slot por intento
+                    "replicate", run_replicate,
+                    "black-forest-labs/flux-1.1-pro",
+                    {
+                        "prompt": args["prompt"],
+                        "width": args.get("width", 1080),
+                        "height": args.get("height", 1080),
+                        "output_format": "png",
+                        "prompt_upsampling": True,
+                    },
+                ),
+                idempotent=False,  # cada intento crea una predicción (y se cobra)
+                logger=self.logger,
             )
 
             img_url = str(output)
-            img_response = httpx.get(img_url, timeout=60)
-            img_response.raise_for_status()
+            img_response = call_with_retry(
+                "replicate", "download", lambda: get_http_client().get(img_url, timeout=time_left(60)).raise_for_status(),
+                logger=self.logger,
+            )
             output_path.write_bytes(img_response.content)
             self.logger.info(f"Image saved: {output_path}")
             return f"Image saved to: {output_path}. Now use add_text_to_image to add any text overlays."
@@ -156,7 +168,7 @@ class VisualDesignerAgent(BaseAgent):
         try:
             from utils.image_text import add_text_overlay
 
-            images_dir = get_project_root() / "data" / "outputs" / "images"
+            images_dir = get_data_dir() / "outputs" / "images"
             image_path = images_dir / args["filename"]
 
             if not image_path.exists():
@@ -178,13 +190,13 @@ class VisualDesignerAgent(BaseAgent):
         try:
             from PIL import Image
 
-            templates_dir = get_project_root() / "data" / "inputs" / "templates"
+            templates_dir = get_data_dir() / "inputs" / "templates"
             template_path = templates_dir / args["template_filename"]
 
             if not template_path.exists():
                 return f"Error: Template not found: {args['template_filename']}"
 
-            output_dir = get_project_root() / "data" / "outputs" / output_subdir
+            output_dir = get_data_dir() / "outputs" / output_subdir
             output_dir.mkdir(parents=True, exist_ok=True)
             output_path = output_dir / args["output_filename"]
 
@@ -201,6 +213,11 @@ class VisualDesignerAgent(BaseAgent):
             self.logger.error(f"Template error: {e}")
             return f"Error using template: {str(e)}"
 
+    def _regeneration_items(self, slot_ids: set[str]) -> list[dict]:
+        """Sin los carruseles (sus slides los rehace carousel_creator)."""
+        return [item for item in super()._regeneration_items(slot_ids)
+                if "slides" not in item and "carousel" not in (item.get("content_type"), item.get("format"))]
+
     def _build_prompt(self) -> str:
         return """Genera imagenes para todo el contenido visual de A&J Phygital Group.
 
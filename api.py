@@ -4,29 +4,45 @@ FastAPI backend que expone los agentes como endpoints REST.
 Se despliega en el VPS con Docker/Easypanel.
 """
 
+import asyncio
+import importlib
 import json
 import logging
 import os
 import sys
 import threading
+import time
 import traceback
+from contextlib import asynccontextmanager
 from datetime import datetime, timezone
 from pathlib import Path
 
-from dotenv import load_dotenv
-from fastapi import FastAPI, HTTPException, UploadFile, File, Form
+from fastapi import FastAPI, HTTPException, Request, UploadFile, File, Form
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, Response, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from pydantic import BaseModel
 
 # Ensure project root is in path
 sys.path.insert(0, str(Path(__file__).parent))
 
-# Load .env BEFORE anything else
-load_dotenv(Path(__file__).parent / ".env", override=True)
+from utils.helpers import get_data_dir, get_project_root, load_env, load_json, save_json
 
-from utils.helpers import get_project_root, load_json, save_json
+# Load .env BEFORE anything else reads the environment
+load_env()
+
+from utils.agent_pool import get_agent_pool, shutdown_agent_pool
+from utils.approvals import count_decisions, latest_decisions, list_decisions, record_decisions, rejected_items
+from utils.cancellation import POLL_SECONDS, RunCancelled, RunTimeout, cancel_run, check_cancelled, uncancel_run
+from utils.limiter import limited
+from utils.log_buffer import LEVELS as LOG_LEVELS, LOG_BUFFER, LogBufferHandler
+from utils.metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, HTTP_REQUEST_SECONDS, render_metrics
+from utils.output_store import latest_output, list_outputs, query_records, store_enabled
+from utils.pipeline_state import flush_state, get_state, set_state, update_state, wait_for_status
+from utils.retry import call_with_retry
+from utils.run_context import new_run_id, set_run_id, start_thread
+from utils.run_journal import agent_done, latest_resumable, load_progress, record_event
+from utils.tracing import span
 
 # Configure logging for the API
 logging.basicConfig(
@@ -34,11 +50,28 @@ logging.basicConfig(
     format="%(asctime)s [%(levelname)s] %(name)s: %(message)s",
 )
 logger = logging.getLogger("content-engine-api")
+logger.addHandler(LogBufferHandler(agent="api"))
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Start the agent worker pool in the background (startup is not delayed) and stop it on shutdown."""
+    from utils.logger import configure_logging
+    configure_logging()  # loguru sinks + log ring buffer size, before any agent logs
+    _mark_interrupted_run()
+    pool = _agent_pool()
+    if pool is not None:
+        start_thread(pool.warm, name="agent-pool-warmup")
+    yield
+    shutdown_agent_pool()
+    flush_state()
+
 
 app = FastAPI(
     title="A&J Content Engine API",
     version="1.0.0",
     description="Backend API for the AI Content Generation Pipeline",
+    lifespan=lifespan,
 )
 
 # CORS - allow Vercel dashboard
@@ -56,12 +89,31 @@ app.add_middleware(
     allow_origin_regex=r"https://.*\.vercel\.app",
 )
 
+
+@app.middleware("http")
+async def record_request_latency(request: Request, call_next):
+    """Latency histogram per route template (not raw path, to keep label cardinality bounded)."""
+    started = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        route = request.scope.get("route")
+        HTTP_REQUEST_SECONDS.labels(
+            method=request.method,
+            route=getattr(route, "path", "unmatched"),
+            status=str(status),
+        ).observe(time.perf_counter() - started)
+
 PROJECT_ROOT = get_project_root()
-OUTPUTS_DIR = PROJECT_ROOT / "data" / "outputs"
-INPUTS_DIR = PROJECT_ROOT / "data" / "inputs"
-TEMPLATES_DIR = PROJECT_ROOT / "data" / "inputs" / "templates"
-BRAND_ASSETS_DIR = PROJECT_ROOT / "data" / "brand_assets"
+OUTPUTS_DIR = get_data_dir() / "outputs"
+INPUTS_DIR = get_data_dir() / "inputs"
+TEMPLATES_DIR = get_data_dir() / "inputs" / "templates"
+BRAND_ASSETS_DIR = get_data_dir() / "brand_assets"
 FONTS_DIR = BRAND_ASSETS_DIR / "fonts"
+LOG_STREAM_POLL_SECONDS = 0.5
 
 
 # ── Image / file serving ──────────────────────────────
@@ -96,6 +148,10 @@ _pipeline_running = False
 _agent_lock = threading.Lock()
 _running_agents: dict[str, dict] = {}  # {agent_name: {status, started_at, error?}}
 
+# Track slot-level regenerations (POST /api/approvals/regenerate)
+_regeneration_lock = threading.Lock()
+_regenerations: dict[str, dict] = {}  # {run_id: {status, item_ids, stages, started_at, error?}}
+
 # Global agent registry (used by both pipeline and individual runs)
 AGENT_REGISTRY = {
     "trend_researcher": ("agents.trend_researcher.agent", "TrendResearcherAgent"),
@@ -111,6 +167,27 @@ AGENT_REGISTRY = {
     "engagement_analyst": ("agents.engagement_analyst.agent", "EngagementAnalystAgent"),
 }
 
+
+def _agent_pool():
+    """Warm worker pool with the registry agents preloaded (None when worker_pool is disabled)."""
+    return get_agent_pool(tuple(AGENT_REGISTRY.values()))
+
+
+def _execute_agent(agent_name: str, custom_prompt: str | None = None, force: bool = False,
+                   regenerate: dict[str, str] | None = None) -> str:
+    """
+    Run an agent in a pool worker, or in this process when the pool is disabled.
+    `force` runs it even if its inputs are unchanged since a previous run (utils.memo);
+    `regenerate` (slot_id -> feedback) redoes only those slots (BaseAgent.regenerate_slots).
+    """
+    module_path, class_name = AGENT_REGISTRY[agent_name]
+    pool = _agent_pool()
+    if pool is not None:
+        return pool.run_agent(module_path, class_name, custom_prompt, force, regenerate)
+    agent_class = getattr(importlib.import_module(module_path), class_name)
+    return agent_class().run(custom_prompt=custom_prompt, force=force, regenerate=regenerate)
+
+
 # Human-readable agent info for the dashboard
 AGENT_INFO = {
     "trend_researcher": {"label": "Trend Researcher", "description": "Investiga tendencias en redes sociales y Google", "phase": 1, "icon": "search"},
@@ -133,11 +210,18 @@ class CampaignRequest(BaseModel):
     brief: str
     platforms: list[str] = ["instagram", "tiktok", "linkedin", "youtube", "facebook"]
     language: list[str] = ["es", "en"]
+    force: bool = False  # re-run agents even when their inputs are unchanged
 
 
 class AgentRunRequest(BaseModel):
     agent_name: str
     custom_prompt: str = ""  # optional: override the agent's default prompt
+    force: bool = False  # run even if the inputs are unchanged since the last run
+
+
+class ResumeRequest(BaseModel):
+    run_id: str = ""  # default: the run in pipeline_state.json, else the latest unfinished one
+    force: bool = False  # re-run the remaining agents even when their inputs are unchanged
 
 
 class ApprovalRequest(BaseModel):
@@ -146,12 +230,26 @@ class ApprovalRequest(BaseModel):
     decision: str = ""  # approved, rejected, revision
     status: str = ""  # alias — frontend sends 'status' instead of 'decision'
     feedback: str = ""
+    run_id: str = ""  # default: the run in pipeline_state.json
+
+
+class BulkApprovalRequest(BaseModel):
+    decisions: list[ApprovalRequest]
+
+
+class RegenerationRequest(BaseModel):
+    item_ids: list[str] = []  # default: every item of the current run whose latest decision is a rejection
+    feedback: dict[str, str] = {}  # item_id -> reviewer feedback (default: the rejection's feedback)
 
 
 # ── Helpers ─────────────────────────────────────────────
 
 def get_latest_file(prefix: str) -> dict | None:
-    """Get the latest output file for an agent."""
+    """Get the latest output for an agent: from the output store when enabled, else the newest JSON file."""
+    if store_enabled():
+        data = latest_output(prefix)
+        if data is not None:
+            return data
     files = sorted(
         OUTPUTS_DIR.glob(f"{prefix}_*.json"),
         key=lambda f: f.stat().st_mtime,
@@ -163,10 +261,19 @@ def get_latest_file(prefix: str) -> dict | None:
 
 
 def get_pipeline_state() -> dict:
-    state_path = OUTPUTS_DIR / "pipeline_state.json"
-    if state_path.exists():
-        return load_json(state_path)
-    return {"status": "idle", "phase": 0}
+    """Current pipeline state, served from memory (utils.pipeline_state)."""
+    return get_state()
+
+
+def _mark_interrupted_run() -> None:
+    """On startup: a pipeline left running by a previous process has no thread any more; flag it for resume."""
+    state = get_pipeline_state()
+    if state.get("status") in ("running", "approved", "waiting_approval") and state.get("run_id"):
+        state = update_state(
+            {"status": "interrupted", "resumable": load_progress(state["run_id"]) is not None},
+            expect_status=("running", "approved", "waiting_approval"),
+        ) or state
+        logger.warning("Run %s was interrupted by a restart (resumable=%s)", state["run_id"], state["resumable"])
 
 
 def get_campaign_brief() -> dict | None:
@@ -178,13 +285,25 @@ def get_campaign_brief() -> dict | None:
 
 # ── Pipeline Runner (background thread) ────────────────
 
-def _run_pipeline_thread(brief: str, platforms: list[str], language: list[str]):
-    """Runs the full pipeline in a background thread."""
+def _run_pipeline_thread(brief: str, platforms: list[str], language: list[str], run_id: str,
+                         progress: dict | None = None, force: bool = False):
+    """Runs the full pipeline in a background thread, traced as one "pipeline" span."""
+    set_run_id(run_id)
+    with span("pipeline", brief=brief[:200], platforms=",".join(platforms), resumed=progress is not None):
+        _run_pipeline(brief, platforms, language, run_id, progress, force)
+
+
+def _run_pipeline(brief: str, platforms: list[str], language: list[str], run_id: str,
+                  progress: dict | None = None, force: bool = False):
+    """
+    Run the phases for `run_id`, journaling agent completions and checkpoints
+    (utils.run_journal). With `progress` (a resume) agents that already
+    completed in this run are skipped, as are checkpoints already approved.
+    Agents whose inputs are unchanged reuse their previous outputs unless `force`.
+    """
     global _pipeline_running
-    import importlib
-    import time
 
-    logger.info("Pipeline thread started for brief: %s", brief[:100])
+    logger.info("Pipeline thread %s for brief: %s (run %s)", "resumed" if progress else "started", brief[:100], run_id)
 
     # Verify critical env vars upfront
     missing_keys = []
@@ -193,12 +312,12 @@ def _run_pipeline_thread(brief: str, platforms: list[str], language: list[str]):
             missing_keys.append(key)
     if missing_keys:
         logger.error("Missing critical env vars: %s", missing_keys)
-        OUTPUTS_DIR.mkdir(parents=True, exist_ok=True)
-        save_json({
+        set_state({
             "status": "error",
             "error": f"Missing environment variables: {', '.join(missing_keys)}. Configure them in Easypanel.",
             "campaign_brief": brief,
-        }, OUTPUTS_DIR / "pipeline_state.json")
+            "run_id": run_id,
+        })
         with _pipeline_lock:
             _pipeline_running = False
         return
@@ -207,13 +326,13 @@ def _run_pipeline_thread(brief: str, platforms: list[str], language: list[str]):
         from agents.orchestrator.agent import PHASES
     except Exception as e:
         logger.error("Failed to import PHASES: %s\n%s", e, traceback.format_exc())
-        OUTPUTS_DIR.mkdir(parents=True, exist_ok=True)
-        save_json({
+        set_state({
             "status": "error",
             "error": f"Import error: {e}",
             "traceback": traceback.format_exc(),
             "campaign_brief": brief,
-        }, OUTPUTS_DIR / "pipeline_state.json")
+            "run_id": run_id,
+        })
         with _pipeline_lock:
             _pipeline_running = False
         return
@@ -225,19 +344,23 @@ def _run_pipeline_thread(brief: str, platforms: list[str], language: list[str]):
             "brief": brief,
             "platforms": platforms,
             "language": language,
-            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "timestamp": progress["started"]["ts"] if progress else datetime.now(timezone.utc).isoformat(),
             "status": "running",
+            "run_id": run_id,
         }
         save_json(campaign_data, INPUTS_DIR / "campaign_brief.json")
+        if progress is None:
+            record_event(run_id, "run_started", brief=brief, platforms=platforms, language=language)
 
         # Update pipeline state
         OUTPUTS_DIR.mkdir(parents=True, exist_ok=True)
-        save_json({
+        set_state({
             "status": "running",
             "phase": 0,
             "campaign_brief": brief,
+            "run_id": run_id,
             "started_at": campaign_data["timestamp"],
-        }, OUTPUTS_DIR / "pipeline_state.json")
+        })
 
         logger.info("Pipeline state saved, starting phases...")
 
@@ -247,92 +370,112 @@ def _run_pipeline_thread(brief: str, platforms: list[str], language: list[str]):
             logger.info("=== PHASE %d: %s ===", phase_num, phase_info["name"])
 
             # Update state
-            save_json({
+            set_state({
                 "status": "running",
                 "phase": phase_num,
                 "phase_name": phase_info["name"],
                 "campaign_brief": brief,
+                "run_id": run_id,
                 "started_at": campaign_data["timestamp"],
-            }, OUTPUTS_DIR / "pipeline_state.json")
+            })
 
             # Run agents in phase
-            for agent_name in phase_info["agents"]:
-                if agent_name not in AGENT_REGISTRY:
-                    logger.warning("Agent %s not in registry, skipping", agent_name)
-                    continue
-                module_path, class_name = AGENT_REGISTRY[agent_name]
-                logger.info("Running agent: %s (%s.%s)", agent_name, module_path, class_name)
-                try:
-                    module = importlib.import_module(module_path)
-                    agent_class = getattr(module, class_name)
-                    agent_instance = agent_class()
-                    result = agent_instance.run()
-                    logger.info("Agent %s completed. Result length: %d", agent_name, len(result) if result else 0)
-                except Exception as e:
-                    logger.error("Agent %s failed: %s\n%s", agent_name, e, traceback.format_exc())
-                    # Save error to state but continue pipeline
-                    save_json({
-                        "status": "running",
-                        "phase": phase_num,
-                        "phase_name": phase_info["name"],
-                        "campaign_brief": brief,
-                        "started_at": campaign_data["timestamp"],
-                        "last_error": f"Agent {agent_name}: {e}",
-                    }, OUTPUTS_DIR / "pipeline_state.json")
+            with span(f"phase {phase_num}: {phase_info['name']}", phase=phase_num):
+                for agent_name in phase_info["agents"]:
+                    if agent_name not in AGENT_REGISTRY:
+                        logger.warning("Agent %s not in registry, skipping", agent_name)
+                        continue
+                    check_cancelled()  # stopped via /api/pipeline/stop: don't start the next agent
+                    if agent_done(progress, agent_name):
+                        logger.info("Skipping agent %s: already completed in run %s", agent_name, run_id)
+                        continue
+                    module_path, class_name = AGENT_REGISTRY[agent_name]
+                    logger.info("Running agent: %s (%s.%s)", agent_name, module_path, class_name)
+                    try:
+                        result = _execute_agent(agent_name, force=force)
+                        logger.info("Agent %s completed. Result length: %d", agent_name, len(result) if result else 0)
+                    except (Exception, RunTimeout) as e:  # a timed-out agent fails like any other
+                        logger.error("Agent %s failed: %s\n%s", agent_name, e, traceback.format_exc())
+                        # Save error to state but continue pipeline
+                        set_state({
+                            "status": "running",
+                            "phase": phase_num,
+                            "phase_name": phase_info["name"],
+                            "campaign_brief": brief,
+                            "run_id": run_id,
+                            "started_at": campaign_data["timestamp"],
+                            "last_error": f"Agent {agent_name}: {e}",
+                        })
 
             # Checkpoints - pause and wait for approval via API
-            if phase_info.get("checkpoint"):
+            if phase_info.get("checkpoint") and progress and phase_num in progress["approved"]:
+                logger.info("CHECKPOINT at phase %d already approved in run %s", phase_num, run_id)
+            elif phase_info.get("checkpoint"):
                 logger.info("CHECKPOINT at phase %d - waiting for approval", phase_num)
-                save_json({
+                record_event(run_id, "checkpoint_waiting", phase=phase_num)
+                set_state({
                     "status": "waiting_approval",
                     "phase": phase_num,
                     "phase_name": phase_info["name"],
                     "checkpoint": True,
                     "campaign_brief": brief,
+                    "run_id": run_id,
                     "started_at": campaign_data["timestamp"],
-                }, OUTPUTS_DIR / "pipeline_state.json")
-
-                # Wait for approval (poll every 5 seconds)
-                while True:
-                    state = get_pipeline_state()
-                    if state.get("status") == "approved":
-                        logger.info("Checkpoint approved, continuing...")
-                        save_json({
-                            "status": "running",
-                            "phase": phase_num,
-                            "phase_name": phase_info["name"],
-                            "campaign_brief": brief,
-                            "started_at": campaign_data["timestamp"],
-                        }, OUTPUTS_DIR / "pipeline_state.json")
-                        break
-                    elif state.get("status") == "stopped_by_user":
-                        logger.info("Pipeline stopped by user at phase %d", phase_num)
-                        campaign_data["status"] = "stopped"
-                        save_json(campaign_data, INPUTS_DIR / "campaign_brief.json")
-                        return
-                    time.sleep(5)
+                })
+
+                # Wait for approval: woken as soon as /api/pipeline/approve or /stop changes the state
+                with span(f"checkpoint {phase_num}", phase=phase_num) as checkpoint_span:
+                    while True:
+                        check_cancelled()
+                        state = wait_for_status(("approved", "stopped_by_user"), timeout=POLL_SECONDS)
+                        if state.get("status") == "approved":
+                            logger.info("Checkpoint approved, continuing...")
+                            record_event(run_id, "checkpoint_approved", phase=phase_num)
+                            set_state({
+                                "status": "running",
+                                "phase": phase_num,
+                                "phase_name": phase_info["name"],
+                                "campaign_brief": brief,
+                                "run_id": run_id,
+                                "started_at": campaign_data["timestamp"],
+                            })
+                            break
+                        elif state.get("status") == "stopped_by_user":
+                            logger.info("Pipeline stopped by user at phase %d", phase_num)
+                            checkpoint_span.set_attribute("stopped_by_user", True)
+                            campaign_data["status"] = "stopped"
+                            save_json(campaign_data, INPUTS_DIR / "campaign_brief.json")
+                            return
 
         # Completed
         logger.info("Pipeline completed successfully!")
+        record_event(run_id, "run_finished", status="completed")
         campaign_data["status"] = "completed"
         save_json(campaign_data, INPUTS_DIR / "campaign_brief.json")
-        save_json({
+        set_state({
             "status": "completed",
             "phase": 7,
             "campaign_brief": brief,
+            "run_id": run_id,
             "started_at": campaign_data["timestamp"],
             "completed_at": datetime.now(timezone.utc).isoformat(),
-        }, OUTPUTS_DIR / "pipeline_state.json")
+        })
 
+    except RunCancelled as e:
+        logger.info("Pipeline stopped by user: %s", e)
+        campaign_data["status"] = "stopped"
+        save_json(campaign_data, INPUTS_DIR / "campaign_brief.json")
+        update_state(status="stopped_by_user")
     except Exception as e:
         logger.error("Pipeline fatal error: %s\n%s", e, traceback.format_exc())
         try:
-            save_json({
+            set_state({
                 "status": "error",
                 "error": str(e),
                 "traceback": traceback.format_exc(),
                 "campaign_brief": brief,
-            }, OUTPUTS_DIR / "pipeline_state.json")
+                "run_id": run_id,
+            })
         except Exception as save_err:
             logger.error("Could not save error state: %s", save_err)
     finally:
@@ -376,24 +519,26 @@ def start_campaign(req: CampaignRequest):
         if _pipeline_running:
             # Check if the pipeline is actually stuck (error state but flag still True)
             state = get_pipeline_state()
-            if state.get("status") in ("error", "idle", "completed", "stopped_by_user"):
+            if state.get("status") in ("error", "idle", "completed", "stopped_by_user", "interrupted"):
                 logger.warning("Pipeline flag was stuck (state=%s), auto-resetting", state.get("status"))
                 _pipeline_running = False
             else:
                 raise HTTPException(409, "A campaign is already running. Use POST /api/pipeline/reset to force-reset.")
         _pipeline_running = True
 
-    logger.info("Starting campaign: %s", req.brief.strip()[:100])
+    run_id = new_run_id()
+    set_run_id(run_id)
+    logger.info("Starting campaign: %s (run %s)", req.brief.strip()[:100], run_id)
 
-    # Launch pipeline in background thread
-    thread = threading.Thread(
-        target=_run_pipeline_thread,
-        args=(req.brief.strip(), req.platforms, req.language),
-        daemon=True,
-    )
-    thread.start()
+    # Launch pipeline in background thread (inherits the run id and request span)
+    with span("POST /api/campaigns", kind="server"):
+        start_thread(
+            _run_pipeline_thread,
+            args=(req.brief.strip(), req.platforms, req.language, run_id, None, req.force),
+            name=f"pipeline-{run_id}",
+        )
 
-    return {"status": "started", "brief": req.brief.strip()}
+    return {"status": "started", "brief": req.brief.strip(), "run_id": run_id}
 
 
 # -- Pipeline Control --
@@ -401,22 +546,59 @@ def start_campaign(req: CampaignRequest):
 @app.post("/api/pipeline/approve")
 def approve_checkpoint():
     """Approve a checkpoint to continue the pipeline."""
-    state = get_pipeline_state()
-    if state.get("status") != "waiting_approval":
+    state = update_state(status="approved", expect_status="waiting_approval")
+    if state is None:
         raise HTTPException(400, "No checkpoint waiting for approval")
-
-    state["status"] = "approved"
-    save_json(state, OUTPUTS_DIR / "pipeline_state.json")
     return {"status": "approved", "phase": state.get("phase")}
 
 
+@app.post("/api/pipeline/resume")
+def resume_pipeline(req: ResumeRequest | None = None):
+    """
+    Resume an interrupted (or stopped) pipeline run from its journal: agents whose
+    outputs already exist for the run are skipped, approved checkpoints are not
+    asked again and a checkpoint that was pending waits for approval again.
+    """
+    global _pipeline_running
+
+    run_id = (req.run_id if req else "") or get_pipeline_state().get("run_id") or latest_resumable()
+    progress = load_progress(run_id) if run_id else None
+    if progress is None:
+        raise HTTPException(404, "No resumable pipeline run found")
+    if progress["finished"] == "completed":
+        raise HTTPException(409, f"Run {run_id} already completed")
+
+    with _pipeline_lock:
+        if _pipeline_running:
+            raise HTTPException(409, "A campaign is already running. Use POST /api/pipeline/reset to force-reset.")
+        _pipeline_running = True
+
+    uncancel_run(run_id)
+    set_run_id(run_id)
+    started = progress["started"]
+    skipped = [name for name in progress["completed"] if agent_done(progress, name)]
+    logger.info("Resuming run %s (skipping %s)", run_id, ", ".join(skipped) or "nothing")
+    with span("POST /api/pipeline/resume", kind="server"):
+        start_thread(
+            _run_pipeline_thread,
+            args=(started["brief"], started["platforms"], started["language"], run_id, progress,
+                  bool(req and req.force)),
+            name=f"pipeline-{run_id}",
+        )
+    return {"status": "resumed", "run_id": run_id, "skipped_agents": skipped, "pending_checkpoint": progress["waiting"]}
+
+
 @app.post("/api/pipeline/stop")
 def stop_pipeline():
-    """Stop the running pipeline."""
-    state = get_pipeline_state()
-    state["status"] = "stopped_by_user"
-    save_json(state, OUTPUTS_DIR / "pipeline_state.json")
-    return {"status": "stopped"}
+    """
+    Stop the running pipeline. The run is cancelled: the active agent stops at its
+    next cancellation point (between turns, before a tool, while streaming or
+    waiting on a provider) and no further agents start.
+    """
+    state = update_state(status="stopped_by_user")
+    if state.get("run_id"):
+        cancel_run(state["run_id"])
+    return {"status": "stopped", "run_id": state.get("run_id")}
 
 
 @app.get("/api/pipeline")
@@ -463,8 +645,6 @@ def list_agents():
 @app.post("/api/agents/run")
 def run_single_agent(req: AgentRunRequest):
     """Run a single agent independently (not as part of the pipeline)."""
-    import importlib
-
     agent_name = req.agent_name
     if agent_name not in AGENT_REGISTRY:
         raise HTTPException(400, f"Unknown agent: {agent_name}. Available: {', '.join(AGENT_REGISTRY.keys())}")
@@ -480,58 +660,77 @@ def run_single_agent(req: AgentRunRequest):
         raise HTTPException(400, "ANTHROPIC_API_KEY not configured")
 
     # Mark as running
+    run_id = new_run_id()
     with _agent_lock:
         _running_agents[agent_name] = {
             "status": "running",
+            "run_id": run_id,
             "started_at": datetime.now(timezone.utc).isoformat(),
             "custom_prompt": bool(req.custom_prompt),
         }
 
     def _run_agent():
         try:
-            module_path, class_name = AGENT_REGISTRY[agent_name]
-            module = importlib.import_module(module_path)
-            agent_class = getattr(module, class_name)
-            agent_instance = agent_class()
-
             logger.info("Running individual agent: %s (custom_prompt=%s)", agent_name, bool(req.custom_prompt))
-
-            if req.custom_prompt:
-                result = agent_instance.run(custom_prompt=req.custom_prompt)
-            else:
-                result = agent_instance.run()
+            result = _execute_agent(agent_name, req.custom_prompt or None, req.force)
 
             logger.info("Agent %s completed. Result length: %d", agent_name, len(result) if result else 0)
 
             with _agent_lock:
                 _running_agents[agent_name] = {
                     "status": "completed",
+                    "run_id": run_id,
                     "started_at": _running_agents[agent_name]["started_at"],
                     "completed_at": datetime.now(timezone.utc).isoformat(),
                     "result_length": len(result) if result else 0,
                 }
 
+        except RunCancelled as e:
+            logger.warning("Agent %s cancelled: %s", agent_name, e)
+            with _agent_lock:
+                _running_agents[agent_name] = {
+                    "status": "timeout" if isinstance(e, RunTimeout) else "stopped",
+                    "run_id": run_id,
+                    "started_at": _running_agents.get(agent_name, {}).get("started_at", ""),
+                    "error": str(e),
+                    "completed_at": datetime.now(timezone.utc).isoformat(),
+                }
+
         except Exception as e:
             logger.error("Agent %s failed: %s\n%s", agent_name, e, traceback.format_exc())
             with _agent_lock:
                 _running_agents[agent_name] = {
                     "status": "error",
+                    "run_id": run_id,
                     "started_at": _running_agents.get(agent_name, {}).get("started_at", ""),
                     "error": str(e),
                     "completed_at": datetime.now(timezone.utc).isoformat(),
                 }
 
-    thread = threading.Thread(target=_run_agent, daemon=True)
-    thread.start()
+    set_run_id(run_id)
+    with span("POST /api/agents/run", kind="server", agent=agent_name):
+        start_thread(_run_agent, name=f"agent-{agent_name}-{run_id}")
 
     return {
         "status": "started",
         "agent": agent_name,
+        "run_id": run_id,
         "label": AGENT_INFO.get(agent_name, {}).get("label", agent_name),
         "message": f"Agent {agent_name} is now running in the background.",
     }
 
 
+@app.post("/api/agents/{agent_name}/stop")
+def stop_single_agent(agent_name: str):
+    """Stop an individually launched agent at its next cancellation point."""
+    with _agent_lock:
+        status = _running_agents.get(agent_name)
+    if not status or status.get("status") != "running":
+        raise HTTPException(409, f"Agent {agent_name} is not running")
+    cancel_run(status["run_id"])
+    return {"status": "stopping", "agent": agent_name, "run_id": status["run_id"]}
+
+
 @app.get("/api/agents/status")
 def get_agents_status():
     """Get the status of all agents (running, completed, error)."""
@@ -588,36 +787,200 @@ def get_content(content_type: str):
     return {"data": data}
 
 
+def _require_output_store() -> None:
+    if not store_enabled():
+        raise HTTPException(404, "Output store is disabled (config.yaml -> output_store.enabled)")
+
+
+@app.get("/api/outputs")
+def get_outputs(agent: str = "", run_id: str = "", limit: int = 50):
+    """Saved agent outputs (metadata only), newest first."""
+    _require_output_store()
+    return {"outputs": list_outputs(agent or None, run_id or None, min(max(limit, 1), 500))}
+
+
+@app.get("/api/outputs/records")
+def get_output_records(agent: str = "", run_id: str = "", slot_id: str = "", platform: str = "",
+                       language: str = "", content_type: str = "", date_from: str = "", date_to: str = "",
+                       limit: int = 100, offset: int = 0):
+    """
+    Slot-level content records across every saved output, e.g. all TikTok scripts
+    in Spanish from last month: ?agent=copywriter&platform=tiktok&language=es&date_from=...
+    Dates are YYYY-MM-DD (inclusive); newest first.
+    """
+    _require_output_store()
+    records, total = query_records(
+        agent or None, run_id or None, slot_id or None, platform or None, language or None, content_type or None,
+        date_from or None, date_to or None, min(max(limit, 1), 1000), max(offset, 0),
+    )
+    return {"records": records, "total": total, "limit": limit, "offset": offset}
+
+
 # -- Approvals --
 
 @app.get("/api/approvals")
-def get_approvals():
-    """Get all approval decisions."""
-    approvals_path = OUTPUTS_DIR / "approvals.json"
-    if approvals_path.exists():
-        return load_json(approvals_path)
-    return {"decisions": []}
-
+def get_approvals(checkpoint: str = "", item_id: str = "", run_id: str = "", latest: bool = False, limit: int = 0):
+    """
+    Approval decisions in arrival order, optionally filtered by checkpoint, item and run.
+    latest=true returns only the latest decision per (checkpoint, item); limit keeps the newest N.
+    """
+    if latest:
+        decisions = latest_decisions(checkpoint or None, run_id or None, item_id or None)
+    else:
+        decisions = list_decisions(checkpoint or None, item_id or None, run_id or None, limit or None)
+    return {"decisions": decisions}
 
-@app.post("/api/approvals")
-def save_approval(req: ApprovalRequest):
-    """Save an approval decision."""
-    approvals_path = OUTPUTS_DIR / "approvals.json"
-    data = load_json(approvals_path) if approvals_path.exists() else {"decisions": []}
 
+def _decision(req: ApprovalRequest) -> dict:
     # Frontend sends 'status', backend model has 'decision' — accept either
-    resolved_decision = req.decision or req.status or "approved"
-    data["decisions"].append({
+    return {
         "checkpoint": req.checkpoint,
         "item_id": req.item_id,
-        "decision": resolved_decision,
-        "status": resolved_decision,
+        "decision": req.decision or req.status or "approved",
         "feedback": req.feedback,
+        "run_id": req.run_id or get_pipeline_state().get("run_id"),
         "timestamp": datetime.now(timezone.utc).isoformat(),
-    })
+    }
 
-    save_json(data, approvals_path)
-    return {"status": "saved", "total_decisions": len(data["decisions"])}
+
+@app.post("/api/approvals")
+def save_approval(req: ApprovalRequest):
+    """Save an approval decision (appended to the decision log)."""
+    ids = record_decisions([_decision(req)])
+    return {"status": "saved", "id": ids[0], "total_decisions": count_decisions()}
+
+
+@app.post("/api/approvals/bulk")
+def save_approvals_bulk(req: BulkApprovalRequest):
+    """Save many approval decisions in one transaction (e.g. approve a whole week's plan)."""
+    if not req.decisions:
+        raise HTTPException(400, "No decisions to save")
+    ids = record_decisions([_decision(d) for d in req.decisions])
+    return {"status": "saved", "saved": len(ids), "ids": ids, "total_decisions": count_decisions()}
+
+
+# Stages a rejected slot goes through again, in pipeline order
+REGENERATION_STAGES = ("copywriter", "seo_hashtag_specialist", "visual_designer", "carousel_creator", "brand_guardian")
+
+
+def _run_regeneration(run_id: str, feedback: dict[str, str]):
+    """Redo the rejected slots stage by stage; a failed stage stops the rest (they would read stale pieces)."""
+    def update(**fields):
+        with _regeneration_lock:
+            _regenerations[run_id].update(fields)
+
+    try:
+        with span("regeneration", items=len(feedback)):
+            for agent_name in REGENERATION_STAGES:
+                check_cancelled()
+                started = time.perf_counter()
+                logger.info("Regenerating %d slots with %s (run %s)", len(feedback), agent_name, run_id)
+                result = _execute_agent(agent_name, regenerate=feedback)
+                with _regeneration_lock:
+                    _regenerations[run_id]["stages"][agent_name] = {
+                        "result": result, "duration_s": round(time.perf_counter() - started, 2),
+                    }
+        update(status="completed", completed_at=datetime.now(timezone.utc).isoformat())
+    except RunCancelled as e:
+        logger.warning("Regeneration %s cancelled: %s", run_id, e)
+        update(status="timeout" if isinstance(e, RunTimeout) else "stopped", error=str(e),
+               completed_at=datetime.now(timezone.utc).isoformat())
+    except Exception as e:
+        logger.error("Regeneration %s failed: %s\n%s", run_id, e, traceback.format_exc())
+        update(status="error", error=str(e), completed_at=datetime.now(timezone.utc).isoformat())
+
+
+@app.post("/api/approvals/regenerate")
+def regenerate_rejected(req: RegenerationRequest | None = None):
+    """
+    Regenerate only the rejected items (slot ids) through the copywriter, SEO, visual
+    and compliance stages, merging the new pieces into the existing outputs. Without
+    item_ids, every item whose latest decision is a rejection is regenerated.
+    """
+    req = req or RegenerationRequest()
+    rejected = rejected_items(get_pipeline_state().get("run_id"))
+    item_ids = req.item_ids or list(rejected)
+    if not item_ids:
+        raise HTTPException(400, "No rejected items to regenerate")
+    feedback = {item_id: req.feedback.get(item_id) or rejected.get(item_id, "") for item_id in item_ids}
+    if not os.getenv("ANTHROPIC_API_KEY"):
+        raise HTTPException(400, "ANTHROPIC_API_KEY not configured")
+
+    # A running pipeline is about to replace the outputs the slots would be merged into
+    with _pipeline_lock:
+        if _pipeline_running and get_pipeline_state().get("status") in ("running", "approved"):
+            raise HTTPException(409, "A campaign is running. Regenerate once it finishes or stops.")
+
+    with _regeneration_lock:
+        if any(r["status"] == "running" for r in _regenerations.values()):
+            raise HTTPException(409, "A regeneration is already running")
+        run_id = new_run_id()
+        _regenerations[run_id] = {
+            "status": "running",
+            "run_id": run_id,
+            "item_ids": item_ids,
+            "stages": {},
+            "started_at": datetime.now(timezone.utc).isoformat(),
+        }
+
+    set_run_id(run_id)
+    with span("POST /api/approvals/regenerate", kind="server", items=len(item_ids)):
+        start_thread(_run_regeneration, args=(run_id, feedback), name=f"regeneration-{run_id}")
+    return {"status": "started", "run_id": run_id, "item_ids": item_ids, "stages": list(REGENERATION_STAGES)}
+
+
+@app.get("/api/approvals/regenerate/{run_id}")
+def get_regeneration(run_id: str):
+    """Status of a slot regeneration and the result of each stage."""
+    with _regeneration_lock:
+        status = _regenerations.get(run_id)
+        if status is None:
+            raise HTTPException(404, f"Regeneration {run_id} not found")
+        return {**status, "stages": dict(status["stages"])}
+
+
+# -- Metrics --
+
+@app.get("/metrics", include_in_schema=False)
+def prometheus_metrics():
+    """Prometheus text exposition: route latency, agent runs, provider calls, queue depth, caches."""
+    return Response(content=render_metrics(), media_type=METRICS_CONTENT_TYPE)
+
+
+@app.get("/api/metrics/runs")
+def get_run_metrics(limit: int = 50):
+    """Token, latency and cost totals for the most recent runs, per agent."""
+    from utils.accounting import list_runs
+    return {"runs": list_runs(limit=limit)}
+
+
+@app.get("/api/metrics/runs/{run_id}")
+def get_run_metrics_detail(run_id: str, turns: bool = False):
+    """Totals for one run by agent and by tool; with turns=true includes every per-turn record."""
+    from utils.accounting import load_run_records, summarize_run
+    summary = summarize_run(run_id)
+    if not summary:
+        raise HTTPException(404, f"No metrics for run: {run_id}")
+    if turns:
+        summary["records"] = load_run_records(run_id)
+    return summary
+
+
+@app.get("/api/runs/{run_id}/trace")
+def get_run_trace(run_id: str):
+    """Span tree of a run (pipeline > phase > agent > turn > tool) with start offsets for flame graphs."""
+    from utils.tracing import build_span_tree, load_trace, trace_id_for
+    spans = load_trace(run_id)
+    if not spans:
+        raise HTTPException(404, f"No trace for run: {run_id}")
+    tree = build_span_tree(spans)
+    return {
+        "run_id": run_id,
+        "trace_id": trace_id_for(run_id),
+        "span_count": len(spans),
+        "duration_ms": max((n["start_ms"] + n["duration_ms"] for n in tree), default=0),
+        "spans": tree,
+    }
 
 
 # -- Debug & Maintenance --
@@ -629,7 +992,10 @@ def reset_pipeline():
     with _pipeline_lock:
         was_running = _pipeline_running
         _pipeline_running = False
-    save_json({"status": "idle", "phase": 0}, OUTPUTS_DIR / "pipeline_state.json")
+    run_id = get_pipeline_state().get("run_id")
+    if was_running and run_id:
+        cancel_run(run_id)  # the old pipeline thread stops instead of running on in the background
+    set_state({"status": "idle", "phase": 0})
     logger.info("Pipeline reset. Was running: %s", was_running)
     return {"status": "reset", "was_running": was_running}
 
@@ -661,17 +1027,69 @@ def debug_env():
 
 
 @app.get("/api/debug/logs")
-def debug_logs():
-    """Get recent pipeline logs from pipeline_state.json."""
-    state = get_pipeline_state()
-    campaign = get_campaign_brief()
+def debug_logs(
+    run_id: str | None = None,
+    agent: str | None = None,
+    level: str | None = None,
+    q: str | None = None,
+    before: int | None = None,
+    after: int | None = None,
+    limit: int = 200,
+):
+    """
+    Recent structured log records from the in-memory ring buffer, oldest first.
+    Filters: run_id, agent, level (minimum), q (substring of the message).
+    Page back with ?before=<next_before>; poll for new records with ?after=<next_after>.
+    """
+    if level and level.upper() not in LOG_LEVELS:
+        raise HTTPException(400, f"Unknown level: {level}. Use one of: {', '.join(LOG_LEVELS)}")
+    logs = LOG_BUFFER.query(run_id=run_id, agent=agent, level=level, q=q, before=before, after=after,
+                            limit=max(1, min(limit, 1000)))
     return {
-        "pipeline_state": state,
-        "campaign_brief": campaign,
+        "logs": logs,
+        "pipeline_state": get_pipeline_state(),
+        "campaign_brief": get_campaign_brief(),
         "pipeline_running_flag": _pipeline_running,
     }
 
 
+@app.get("/api/debug/logs/stream")
+async def stream_debug_logs(
+    request: Request,
+    run_id: str | None = None,
+    agent: str | None = None,
+    level: str | None = None,
+    q: str | None = None,
+    after: int | None = None,
+):
+    """
+    Tail of the log ring buffer as Server-Sent Events (one JSON record per event).
+    Starts after ?after=<seq> (default: only new records); same filters as /api/debug/logs.
+    """
+    if level and level.upper() not in LOG_LEVELS:
+        raise HTTPException(400, f"Unknown level: {level}. Use one of: {', '.join(LOG_LEVELS)}")
+
+    async def events():
+        cursor = LOG_BUFFER.last_seq if after is None else after
+        idle = 0.0
+        while not await request.is_disconnected():
+            page = LOG_BUFFER.query(run_id=run_id, agent=agent, level=level, q=q, after=cursor, limit=500)
+            for record in page["records"]:
+                yield f"id: {record['seq']}\ndata: {json.dumps(record, ensure_ascii=False)}\n\n"
+            if page["has_more"]:
+                cursor = page["next_after"]
+                continue
+            # Records that did not match the filters still advance the cursor
+            cursor = max(cursor, page["last_seq"])
+            idle += LOG_STREAM_POLL_SECONDS
+            if idle >= 15:
+                idle = 0.0
+                yield ": keepalive\n\n"
+            await asyncio.sleep(LOG_STREAM_POLL_SECONDS)
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+
 @app.get("/api/debug/files")
 def debug_files():
     """List all output files in data/outputs/ for debugging."""
@@ -730,23 +1148,30 @@ def regenerate_image(req: RegenerateImageRequest):
     output_path = output_dir / req.filename
 
     def _regen():
-        import httpx
-        import replicate
+        from utils.api_clients import get_http_client, run_replicate
         try:
             logger.info("Regenerating image: %s with prompt: %s", req.filename, req.prompt[:100])
-            output = replicate.run(
-                "black-forest-labs/flux-1.1-pro",
-                input={
-                    "prompt": req.prompt,
-                    "width": req.width,
-                    "height": req.height,
-                    "output_format": "png",
-                    "prompt_upsampling": True,
-                },
+            output = call_with_retry(
+                "replicate", "flux-1.1-pro",
+                lambda: limited(  # adaptive concurrency (utils.limiter): one slot per attempt
+                    "replicate", run_replicate,
+                    "black-forest-labs/flux-1.1-pro",
+                    {
+                        "prompt": req.prompt,
+                        "width": req.width,
+                        "height": req.height,
+                        "output_format": "png",
+                        "prompt_upsampling": True,
+                    },
+                ),
+                idempotent=False,
+                logger=logger,
             )
             img_url = str(output)
-            img_response = httpx.get(img_url, timeout=60)
-            img_response.raise_for_status()
+            img_response = call_with_retry(
+                "replicate", "download", lambda: get_http_client().get(img_url, timeout=60).raise_for_status(),
+                logger=logger,
+            )
             output_path.write_bytes(img_response.content)
             logger.info("Image regenerated: %s", output_path)
 
@@ -754,7 +1179,11 @@ def regenerate_image(req: RegenerateImageRequest):
             if req.text_overlays:
                 try:
                     from utils.image_text import add_text_overlay
-                    add_text_overlay(str(output_path), req.text_overlays)
+                    pool = _agent_pool()
+                    if pool is not None:
+                        pool.call(add_text_overlay, str(output_path), req.text_overlays)
+                    else:
+                        add_text_overlay(str(output_path), req.text_overlays)
                     logger.info("Text overlay applied to regenerated image: %s", req.filename)
                 except Exception as te:
                     logger.error("Text overlay failed on regen: %s", te)
@@ -855,7 +1284,7 @@ async def upload_template(
         "filename": file.filename,
         "category": category,
         "size": len(content),
-        "path": str(dest_path.relative_to(PROJECT_ROOT)),
+        "path": str(dest_path.relative_to(get_data_dir().parent)),
     }
 
 
@@ -0,0 +1,4 @@
+"""
+Benchmarks del Content Engine contra proveedores locales (sin red ni costo).
+Ver bench/run_pipeline.py.
+"""
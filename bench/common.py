@@ -0,0 +1,65 @@
+"""
+Piezas compartidas por los benchmarks: entorno aislado, baselines y comparación.
+"""
+
+import json
+import os
+import platform
+import tempfile
+from datetime import datetime, timezone
+from pathlib import Path
+
+from rich.console import Console
+from rich.markup import escape
+from rich.table import Table
+
+BASELINES_DIR = Path(__file__).parent / "baselines"
+
+
+def isolated_data_dir() -> Path:
+    """Data dir temporal vía CONTENT_ENGINE_DATA_DIR; llamar antes de importar api o los agentes."""
+    data_dir = Path(tempfile.mkdtemp(prefix="content_engine_bench_"))
+    os.environ["CONTENT_ENGINE_DATA_DIR"] = str(data_dir)
+    return data_dir
+
+
+def environment() -> dict:
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "created_at": datetime.now(timezone.utc).isoformat(),
+    }
+
+
+def write_json(data: dict, path: Path) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(data, indent=2, ensure_ascii=False), encoding="utf-8")
+
+
+def compare_metrics(current: dict[str, float], baseline: dict[str, float], tolerance: float,
+                    tolerances: dict[str, float] | None = None) -> list[dict]:
+    """
+    Compara métricas donde más alto es peor. Marca regresión cuando el valor
+    actual supera al del baseline en más de `tolerance` (o su override en `tolerances`).
+    """
+    rows = []
+    for key, base in baseline.items():
+        value = current.get(key)
+        if not isinstance(base, (int, float)) or not isinstance(value, (int, float)):
+            continue
+        change = (value - base) / base if base else 0.0
+        limit = (tolerances or {}).get(key, tolerance)
+        rows.append({"metric": key, "baseline": base, "current": value, "change": round(change, 4),
+                     "tolerance": limit, "regression": change > limit})
+    return rows
+
+
+def print_comparison(console: Console, rows: list[dict], title: str) -> None:
+    table = Table(title=title)
+    for column in ("Metric", "Baseline", "Current", "Change", "Limit"):
+        table.add_column(column, justify="left" if column == "Metric" else "right")
+    for row in rows:
+        table.add_row(escape(row["metric"]), str(row["baseline"]), str(row["current"]), f"{row['change']:+.1%}",
+                      f"{row['tolerance']:+.0%}", style="red" if row["regression"] else "")
+    console.print(table)
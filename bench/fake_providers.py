@@ -0,0 +1,353 @@
+"""
+Servidores HTTP locales que reemplazan a los proveedores en el benchmark:
+Anthropic Messages (transcripts guionados), Perplexity, Replicate (PNGs
+generados con Pillow) y Meta Graph. Cada uno corre en su propio thread con
+keep-alive, una latencia fija configurable y un contador de requests.
+
+Los clientes del Content Engine se redirigen con variables de entorno
+(ANTHROPIC_BASE_URL, PERPLEXITY_BASE_URL, REPLICATE_BASE_URL, META_GRAPH_URL),
+ver FakeProviders.env().
+"""
+
+import io
+import itertools
+import json
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from PIL import Image
+
+from bench.transcripts import build_script, shard_script
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _body(self) -> dict:
+        length = int(self.headers.get("content-length") or 0)
+        raw = self.rfile.read(length) if length else b""
+        self.raw_body = raw
+        try:
+            return json.loads(raw) if raw else {}
+        except ValueError:
+            return {}
+
+    def _send(self, status: int, payload: bytes, content_type: str = "application/json") -> None:
+        self.send_response(status)
+        self.send_header("content-type", content_type)
+        self.send_header("content-length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _json(self, data: dict, status: int = 200) -> None:
+        self._send(status, json.dumps(data, ensure_ascii=False).encode("utf-8"))
+
+    def _start_events(self) -> None:
+        """Respuesta text/event-stream con chunked encoding (keep-alive sin content-length)."""
+        self.send_response(200)
+        self.send_header("content-type", "text/event-stream")
+        self.send_header("transfer-encoding", "chunked")
+        self.end_headers()
+
+    def _event(self, event: str, data: dict) -> None:
+        payload = f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n".encode("utf-8")
+        self.wfile.write(f"{len(payload):x}\r\n".encode() + payload + b"\r\n")
+        self.wfile.flush()
+
+    def _end_events(self) -> None:
+        self.wfile.write(b"0\r\n\r\n")
+        self.wfile.flush()
+
+    def _dispatch(self, method: str) -> None:
+        provider: FakeProvider = self.server.provider
+        path = urlsplit(self.path).path
+        body = self._body() if method == "POST" else {}
+        provider.requests[f"{method} {provider.route_name(path)}"] += 1
+        delay = provider.delay(body)
+        if delay:
+            time.sleep(delay)
+        provider.handle(self, method, path, body)
+
+    def do_GET(self):
+        self._dispatch("GET")
+
+    def do_POST(self):
+        self._dispatch("POST")
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # Un cliente que corta un stream a la mitad (escalado de modelo) no es un error del benchmark
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+
+class FakeProvider:
+    """Un proveedor falso: ThreadingHTTPServer en un puerto libre de 127.0.0.1."""
+
+    name = "fake"
+
+    def __init__(self, latency_ms: float = 0.0):
+        self.latency_s = latency_ms / 1000
+        self.requests: Counter = Counter()
+        self._server = _Server(("127.0.0.1", 0), _Handler)
+        self._server.provider = self
+        self._thread = threading.Thread(target=self._server.serve_forever, name=f"fake-{self.name}", daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "FakeProvider":
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def delay(self, body: dict) -> float:
+        """Latencia antes de responder (s)."""
+        return self.latency_s
+
+    def route_name(self, path: str) -> str:
+        """Ruta normalizada para el conteo (sin ids)."""
+        return re.sub(r"/[A-Za-z0-9_.-]*\d[A-Za-z0-9_.-]*", "/{id}", path)
+
+    def handle(self, h: _Handler, method: str, path: str, body: dict) -> None:
+        h._json({"error": f"not found: {method} {path}"}, status=404)
+
+
+# ── Anthropic ──────────────────────────────────────────
+
+class FakeAnthropic(FakeProvider):
+    """
+    /v1/messages con transcripts guionados: identifica al agente por la primera
+    línea de su system prompt y responde el turno según cuántos mensajes del
+    assistant trae la conversación. Message Batches no está soportado (404).
+    Con "stream": true responde por SSE, con la latencia repartida entre los
+    bloques (cada uno llega cuando "terminó de generarse").
+    """
+
+    name = "anthropic"
+
+    def __init__(self, slots: list[dict], agents: dict[str, str], max_turns: dict[str, int],
+                 files_url: str, latency_ms: float = 0.0):
+        super().__init__(latency_ms)
+        self.slots = slots
+        self.agents = agents  # primera línea del prompt → nombre del agente
+        self.max_turns = max_turns
+        self.files_url = files_url
+        self._scripts: dict[str, list] = {}
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+
+    def delay(self, body: dict) -> float:
+        return 0.0 if body.get("stream") else self.latency_s
+
+    def _agent_for(self, system) -> str:
+        if isinstance(system, list):
+            system = "".join(block.get("text", "") for block in system if isinstance(block, dict))
+        first_line = (system or "").strip().split("\n", 1)[0].strip()
+        return self.agents.get(first_line, "unknown")
+
+    def _script(self, agent: str) -> list:
+        with self._lock:
+            if agent not in self._scripts:
+                self._scripts[agent] = build_script(agent, self.slots, self.max_turns.get(agent, 12), self.files_url)
+            return self._scripts[agent]
+
+    def handle(self, h: _Handler, method: str, path: str, body: dict) -> None:
+        if method != "POST" or path != "/v1/messages":
+            return super().handle(h, method, path, body)
+        agent = self._agent_for(body.get("system"))
+        messages = body.get("messages") or []
+        first = messages[0]["content"] if messages else ""
+        user_prompt = first if isinstance(first, str) else json.dumps(first, ensure_ascii=False)
+        if "## MODO SHARD" in user_prompt:
+            script = shard_script(agent, user_prompt, self.slots)
+        else:
+            script = self._script(agent)
+        turn = sum(1 for m in messages if m.get("role") == "assistant")
+        n = next(self._ids)
+
+        if turn < len(script):
+            content = [
+                {"type": "tool_use", "id": f"toolu_bench_{n:06d}_{i}", "name": name, "input": tool_input}
+                for i, (name, tool_input) in enumerate(script[turn])
+            ]
+            stop_reason = "tool_use"
+        else:
+            content = [{"type": "text", "text": f"{agent}: trabajo completado."}]
+            stop_reason = "end_turn"
+
+        output = json.dumps(content, ensure_ascii=False)
+        message = {
+            "id": f"msg_bench_{n:06d}",
+            "type": "message",
+            "role": "assistant",
+            "model": body.get("model", ""),
+            "content": content,
+            "stop_reason": stop_reason,
+            "stop_sequence": None,
+            "usage": {"input_tokens": len(h.raw_body) // 4, "output_tokens": max(len(output) // 4, 1)},
+        }
+        if body.get("stream"):
+            return self._stream(h, message)
+        h._json(message)
+
+    def _stream(self, h: _Handler, message: dict) -> None:
+        """Los eventos de messages.stream: un content_block_start/delta/stop por bloque."""
+        content, usage = message["content"], message["usage"]
+        h._start_events()
+        h._event("message_start", {"type": "message_start", "message": {
+            **message, "content": [], "stop_reason": None, "usage": {**usage, "output_tokens": 1},
+        }})
+        for index, block in enumerate(content):
+            if self.latency_s:
+                time.sleep(self.latency_s / len(content))
+            if block["type"] == "tool_use":
+                start = {**block, "input": {}}
+                delta = {"type": "input_json_delta", "partial_json": json.dumps(block["input"], ensure_ascii=False)}
+            else:
+                start = {"type": "text", "text": ""}
+                delta = {"type": "text_delta", "text": block["text"]}
+            h._event("content_block_start", {"type": "content_block_start", "index": index, "content_block": start})
+            h._event("content_block_delta", {"type": "content_block_delta", "index": index, "delta": delta})
+            h._event("content_block_stop", {"type": "content_block_stop", "index": index})
+        h._event("message_delta", {"type": "message_delta",
+                                   "delta": {"stop_reason": message["stop_reason"], "stop_sequence": None},
+                                   "usage": {"output_tokens": usage["output_tokens"]}})
+        h._event("message_stop", {"type": "message_stop"})
+        h._end_events()
+
+
+# ── Perplexity ─────────────────────────────────────────
+
+class FakePerplexity(FakeProvider):
+    name = "perplexity"
+
+    def handle(self, h: _Handler, method: str, path: str, body: dict) -> None:
+        if method != "POST" or path != "/chat/completions":
+            return super().handle(h, method, path, body)
+        query = (body.get("messages") or [{}])[-1].get("content", "")
+        answer = f"Resultados para '{query}': " + "La automatización con IA crece en pymes de LATAM. " * 20
+        h._json({"id": "pplx_bench", "model": body.get("model", "sonar"),
+                 "choices": [{"index": 0, "message": {"role": "assistant", "content": answer}}]})
+
+
+# ── Replicate ──────────────────────────────────────────
+
+class FakeReplicate(FakeProvider):
+    """Predicciones que terminan al instante; el output apunta a /files/ de este mismo server."""
+
+    name = "replicate"
+
+    def __init__(self, latency_ms: float = 0.0):
+        super().__init__(latency_ms)
+        self._pngs: dict[tuple[int, int], bytes] = {}
+        self._png_lock = threading.Lock()
+        self._ids = itertools.count(1)
+
+    def png(self, width: int, height: int) -> bytes:
+        """PNG de fondo (degradado) del tamaño pedido; se genera una vez por tamaño."""
+        key = (width, height)
+        with self._png_lock:
+            if key not in self._pngs:
+                gradient = Image.linear_gradient("L").resize((width, height))
+                img = Image.merge("RGB", (gradient.point(lambda v: v // 4), gradient.point(lambda v: v // 2), gradient))
+                buf = io.BytesIO()
+                img.save(buf, "PNG")
+                self._pngs[key] = buf.getvalue()
+            return self._pngs[key]
+
+    def handle(self, h: _Handler, method: str, path: str, body: dict) -> None:
+        if method == "GET" and path.startswith("/files/"):
+            query = parse_qs(urlsplit(h.path).query)
+            width = int(query.get("w", ["1080"])[0])
+            height = int(query.get("h", ["1080"])[0])
+            return h._send(200, self.png(width, height), "image/png")
+        match = re.fullmatch(r"/v1/models/([^/]+)/([^/]+)/predictions", path)
+        if method != "POST" or not match:
+            return super().handle(h, method, path, body)
+        pred_id = f"bench{next(self._ids):06d}"
+        model_input = body.get("input") or {}
+        width, height = int(model_input.get("width", 1080)), int(model_input.get("height", 1080))
+        h._json({
+            "id": pred_id,
+            "model": f"{match.group(1)}/{match.group(2)}",
+            "version": "bench",
+            "status": "succeeded",
+            "input": model_input,
+            "output": f"{self.url}/files/{pred_id}.png?w={width}&h={height}",
+            "error": None,
+            "logs": "",
+            "metrics": {"predict_time": self.latency_s},
+            "created_at": "2026-01-01T00:00:00Z",
+            "urls": {"get": f"{self.url}/v1/predictions/{pred_id}", "cancel": f"{self.url}/v1/predictions/{pred_id}/cancel"},
+        }, status=201)
+
+
+# ── Meta Graph ─────────────────────────────────────────
+
+class FakeMetaGraph(FakeProvider):
+    name = "meta"
+
+    def __init__(self, latency_ms: float = 0.0):
+        super().__init__(latency_ms)
+        self._ids = itertools.count(1)
+
+    def handle(self, h: _Handler, method: str, path: str, body: dict) -> None:
+        if method == "POST" and path.endswith(("/feed", "/media", "/media_publish")):
+            return h._json({"id": f"{path.rsplit('/', 1)[-1]}_{next(self._ids)}"})
+        return super().handle(h, method, path, body)
+
+
+class FakeProviders:
+    """Levanta los cuatro proveedores falsos; usar como context manager."""
+
+    def __init__(self, slots: list[dict], agents: dict[str, str], max_turns: dict[str, int],
+                 llm_ms: float = 0.0, provider_ms: float = 0.0):
+        self.replicate = FakeReplicate(provider_ms)
+        self.perplexity = FakePerplexity(provider_ms)
+        self.meta = FakeMetaGraph(provider_ms)
+        self.anthropic = FakeAnthropic(slots, agents, max_turns, self.replicate.url, llm_ms)
+        self.all = (self.anthropic, self.perplexity, self.replicate, self.meta)
+
+    def __enter__(self) -> "FakeProviders":
+        for provider in self.all:
+            provider.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        for provider in self.all:
+            provider.stop()
+
+    def env(self) -> dict[str, str]:
+        """Variables de entorno que apuntan los clientes a los proveedores falsos."""
+        return {
+            "ANTHROPIC_BASE_URL": self.anthropic.url,
+            "ANTHROPIC_API_KEY": "bench-key",
+            "PERPLEXITY_BASE_URL": self.perplexity.url,
+            "PERPLEXITY_API_KEY": "bench-key",
+            "REPLICATE_BASE_URL": self.replicate.url,
+            "REPLICATE_API_TOKEN": "bench-token",
+            "META_GRAPH_URL": self.meta.url,
+            "META_ACCESS_TOKEN": "bench-token",
+            "META_PAGE_ID": "1000",
+            "INSTAGRAM_BUSINESS_ACCOUNT_ID": "2000",
+        }
+
+    def request_counts(self) -> dict[str, dict[str, int]]:
+        return {p.name: dict(sorted(p.requests.items())) for p in self.all}
@@ -0,0 +1,179 @@
+"""
+Presupuesto de import (cold start) de los entry points, medido con
+`python -X importtime` en un proceso nuevo por corrida:
+  - main (CLI), api (uvicorn api:app), agents.base y algunos agentes
+  - wall time de `main.py list` y `main.py status` (incluye el arranque del intérprete)
+
+Cada entry point tiene un presupuesto en ms (mínimo de --repeat corridas) y una
+lista de módulos pesados que no debe importar: los SDKs (anthropic, replicate,
+httpx), Pillow y PyYAML se cargan en el primer uso, no al importar. Un módulo
+prohibido o un presupuesto excedido hacen fallar la corrida (exit 1).
+
+Uso:
+    python -m bench.importtime                     # tabla + bench/results/importtime.json
+    python -m bench.importtime --repeat 10 --json
+    python -m bench.importtime --save-baseline     # guarda bench/baselines/importtime.json
+    python -m bench.importtime --compare --tolerance 0.30
+"""
+
+import json
+import os
+import shutil
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import typer
+from rich.console import Console
+from rich.markup import escape
+from rich.table import Table
+
+from bench.common import BASELINES_DIR, compare_metrics, environment, isolated_data_dir, print_comparison, write_json
+
+app = typer.Typer(help="Presupuesto de tiempo de import de los entry points del Content Engine")
+console = Console()
+
+PROJECT_ROOT = Path(__file__).parent.parent
+RESULTS_PATH = Path(__file__).parent / "results" / "importtime.json"
+
+SDKS = ("anthropic", "replicate", "httpx", "PIL")
+
+# módulo → presupuesto (ms, import acumulado) y módulos de primer nivel prohibidos
+ENTRY_POINTS = {
+    "main": {"budget_ms": 150, "forbidden": SDKS + ("yaml", "fastapi", "loguru", "agents")},
+    "api": {"budget_ms": 900, "forbidden": SDKS + ("yaml", "loguru", "agents")},
+    "agents.base": {"budget_ms": 200, "forbidden": SDKS + ("yaml", "fastapi")},
+    "agents.orchestrator.agent": {"budget_ms": 250, "forbidden": SDKS + ("yaml", "fastapi")},
+    "agents.visual_designer.agent": {"budget_ms": 200, "forbidden": SDKS + ("yaml", "fastapi")},
+    "agents.scheduler.agent": {"budget_ms": 200, "forbidden": SDKS + ("yaml", "fastapi")},
+}
+
+# comando de main.py → presupuesto de wall time (ms, proceso completo)
+COMMANDS = {
+    "list": 400,
+    "status": 400,
+}
+
+
+def parse_importtime(stderr: str) -> dict[str, int]:
+    """Líneas `import time: self | cumulative | module` → {módulo: acumulado en µs}."""
+    cumulative = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cum, name = (part.strip() for part in line[len("import time:"):].split("|"))
+        if cum.isdigit():
+            cumulative[name] = int(cum)
+    return cumulative
+
+
+def measure_import(module: str) -> tuple[float, set[str]]:
+    """Import acumulado de `module` (ms) y los paquetes de primer nivel que arrastra."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=PROJECT_ROOT, capture_output=True, text=True, env=os.environ.copy(),
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{proc.stderr[-2000:]}")
+    cumulative = parse_importtime(proc.stderr)
+    return cumulative.get(module, 0) / 1000, {name.partition(".")[0] for name in cumulative}
+
+
+def measure_command(command: str) -> float:
+    started = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, "main.py", command],
+        cwd=PROJECT_ROOT, capture_output=True, text=True, env=os.environ.copy(),
+    )
+    elapsed = (time.perf_counter() - started) * 1000
+    if proc.returncode != 0:
+        raise RuntimeError(f"main.py {command} failed:\n{proc.stderr[-2000:]}")
+    return elapsed
+
+
+def run_checks(repeat: int) -> list[dict]:
+    results = []
+    for module, spec in ENTRY_POINTS.items():
+        console.print(f"[cyan]>> import {escape(module)}[/cyan]")
+        timings, loaded = [], set()
+        for _ in range(repeat):
+            ms, modules = measure_import(module)
+            timings.append(ms)
+            loaded |= modules
+        violations = sorted(m for m in spec["forbidden"] if m in loaded)
+        best = min(timings)
+        results.append({
+            "name": f"import {module}", "min_ms": round(best, 1), "median_ms": round(sorted(timings)[len(timings) // 2], 1),
+            "budget_ms": spec["budget_ms"], "forbidden_imported": violations,
+            "ok": best <= spec["budget_ms"] and not violations,
+        })
+    for command, budget in COMMANDS.items():
+        console.print(f"[cyan]>> main.py {command}[/cyan]")
+        timings = sorted(measure_command(command) for _ in range(repeat))
+        results.append({
+            "name": f"main.py {command}", "min_ms": round(timings[0], 1), "median_ms": round(timings[len(timings) // 2], 1),
+            "budget_ms": budget, "forbidden_imported": [], "ok": timings[0] <= budget,
+        })
+    return results
+
+
+@app.command()
+def main(
+    repeat: int = typer.Option(5, help="Procesos por entry point; se reporta el mínimo"),
+    output: Path = typer.Option(RESULTS_PATH, help="Archivo JSON de resultados"),
+    as_json: bool = typer.Option(False, "--json", help="Imprimir el JSON de resultados en stdout"),
+    save_baseline: bool = typer.Option(False, "--save-baseline", help="Guardar como bench/baselines/importtime.json"),
+    compare_baseline: bool = typer.Option(False, "--compare", help="Comparar mínimos contra el baseline"),
+    baseline: Path = typer.Option(BASELINES_DIR / "importtime.json", help="Baseline a usar"),
+    tolerance: float = typer.Option(0.30, help="Empeoramiento tolerado del mínimo (0.30 = 30%)"),
+):
+    """Medir el tiempo de import de los entry points contra su presupuesto."""
+    # Data dir aislado: main.py status y api leen/crean directorios al importar
+    data_dir = isolated_data_dir()
+    try:
+        results = run_checks(max(repeat, 1))
+    finally:
+        shutil.rmtree(data_dir, ignore_errors=True)
+
+    report = {"suite": "importtime", "environment": environment(), "results": results}
+    write_json(report, output)
+    if save_baseline:
+        write_json(report, baseline)
+        console.print(f"[green]Baseline saved: {baseline}[/green]")
+
+    if as_json:
+        print(json.dumps(report, indent=2, ensure_ascii=False))
+    else:
+        table = Table(title=f"Import time ({repeat} runs each)")
+        for column in ("Entry point", "min ms", "median ms", "budget ms", "forbidden imported"):
+            table.add_column(column, justify="left" if column in ("Entry point", "forbidden imported") else "right")
+        for r in results:
+            table.add_row(escape(r["name"]), f"{r['min_ms']:.1f}", f"{r['median_ms']:.1f}", str(r["budget_ms"]),
+                          ", ".join(r["forbidden_imported"]), style="" if r["ok"] else "red")
+        console.print(table)
+
+    failed = [r["name"] for r in results if not r["ok"]]
+    if failed:
+        console.print(f"[red]Over budget or importing heavy modules: {', '.join(failed)}[/red]")
+
+    regressions = False
+    if compare_baseline:
+        if not baseline.exists():
+            console.print(f"[red]Baseline not found: {baseline}[/red]")
+            raise typer.Exit(2)
+        base = {r["name"]: r["min_ms"] for r in json.loads(baseline.read_text(encoding="utf-8"))["results"]}
+        current = {r["name"]: r["min_ms"] for r in results}
+        base = {k: v for k, v in base.items() if k in current}
+        rows = compare_metrics(current, base, tolerance)
+        print_comparison(console, rows, f"min ms vs {baseline.name}")
+        regressions = any(row["regression"] for row in rows)
+
+    if failed or regressions:
+        raise typer.Exit(1)
+
+
+if __name__ == "__main__":
+    app()
@@ -0,0 +1,303 @@
+"""
+Load test de los endpoints que usa el dashboard sobre api.py.
+
+Genera un fixture de data/outputs (outputs de todos los agentes para N slots,
+imágenes y slides PNG, approvals y un historial de runs anteriores), levanta
+la API con uvicorn en un subproceso (como en el Dockerfile) apuntada a ese
+data dir y reproduce tráfico de dashboard en lazo cerrado: cada usuario
+virtual encadena requests según el mix de TRAFFIC, con una pausa opcional
+entre requests.
+
+Para cada nivel de concurrencia reporta, por ruta y en total, p50/p95/p99,
+throughput y tasa de error, y la mayor concurrencia que cumple el SLO.
+
+Uso:
+    python -m bench.load_dashboard
+    python -m bench.load_dashboard --concurrency 1,8,32,64 --duration 20 --slots 100 --history 50
+    python -m bench.load_dashboard --url http://localhost:8000   # contra una API ya levantada (sin fixture)
+"""
+
+import asyncio
+import io
+import json
+import os
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import httpx
+import typer
+from rich.console import Console
+from rich.table import Table
+
+from bench.common import environment, isolated_data_dir, write_json
+from bench.transcripts import CAROUSEL_SLIDES, _content_plan, _optimization, _review, _script, build_slots
+
+app = typer.Typer(help="Load test de los endpoints del dashboard")
+console = Console()
+
+PROJECT_ROOT = Path(__file__).parent.parent
+RESULTS_PATH = Path(__file__).parent / "results" / "load_dashboard.json"
+CONTENT_TYPES = ("plan", "scripts", "compliance", "trends", "seo", "schedule", "images", "carousels", "engagement")
+
+
+# ── Fixture ────────────────────────────────────────────
+
+def _png(width: int, height: int) -> bytes:
+    from PIL import Image
+    gradient = Image.linear_gradient("L").resize((width, height))
+    buf = io.BytesIO()
+    Image.merge("RGB", (gradient.point(lambda v: v // 3), gradient.point(lambda v: v // 2), gradient)).save(buf, "PNG")
+    return buf.getvalue()
+
+
+def build_fixture(data_dir: Path, slots: int, history: int) -> dict[str, list[str]]:
+    """
+    Outputs de un pipeline completo para `slots` slots más `history` runs
+    anteriores por agente. Retorna los nombres de imágenes y slides servibles.
+    """
+    outputs = data_dir / "outputs"
+    (outputs / "images").mkdir(parents=True, exist_ok=True)
+    (outputs / "carousels").mkdir(parents=True, exist_ok=True)
+    plan = build_slots(slots)
+    images = [f"{s['slot_id']}.png" for s in plan if s["format"] == "image"]
+    carousels = [s for s in plan if s["format"] == "carousel"]
+    slides = [f"{s['slot_id']}_slide{n}.png" for s in carousels for n in range(1, CAROUSEL_SLIDES + 1)]
+
+    latest = {
+        "content_planner": _content_plan(plan),
+        "copywriter": {"scripts": [_script(s) for s in plan]},
+        "seo_hashtag_specialist": {"optimizations": [_optimization(s) for s in plan]},
+        "brand_guardian": {"content_reviews": [_review(s) for s in plan], "overall_score": 92},
+        "trend_researcher": {"trends": [{"name": f"Tendencia {i}", "score": 90 - i} for i in range(10)]},
+        "viral_analyzer": {"patterns": [{"pattern": f"Patrón {i}"} for i in range(8)]},
+        "scheduler": {"scheduled_posts": [{"slot_id": s["slot_id"], "platform": s["platform"]} for s in plan]},
+        "visual_designer": {"images_generated": [{"slot_id": f[:-4], "filename": f} for f in images]},
+        "carousel_creator": {"carousels": [
+            {"slot_id": s["slot_id"], "slides": [{"filename": f"{s['slot_id']}_slide{n}.png"}
+                                                for n in range(1, CAROUSEL_SLIDES + 1)]}
+            for s in carousels
+        ]},
+        "engagement_analyst": {"summary": "Reporte semanal", "recommendations": ["Publicar más carruseles"] * 5},
+    }
+    now = time.time()
+    for agent, data in latest.items():
+        body = json.dumps(data, ensure_ascii=False)
+        for i in range(history + 1):
+            path = outputs / f"{agent}_2026{i:08d}_output.json"
+            path.write_text(body, encoding="utf-8")
+            mtime = now - (history - i) * 60  # el último es el más reciente
+            os.utime(path, (mtime, mtime))
+
+    image_png, slide_png = _png(1080, 1080), _png(1080, 1350)
+    for name in images:
+        (outputs / "images" / name).write_bytes(image_png)
+    for name in slides:
+        (outputs / "carousels" / name).write_bytes(slide_png)
+
+    decisions = [{"checkpoint": "content_review", "item_id": s["slot_id"], "decision": "approved",
+                  "status": "approved", "feedback": "", "timestamp": "2026-03-01T12:00:00+00:00"} for s in plan]
+    (outputs / "approvals.json").write_text(json.dumps({"decisions": decisions}), encoding="utf-8")
+    (outputs / "pipeline_state.json").write_text(json.dumps({"status": "completed", "phase": 7}), encoding="utf-8")
+    return {"images": images, "slides": slides, "slot_ids": [s["slot_id"] for s in plan]}
+
+
+# ── Tráfico ────────────────────────────────────────────
+
+# (ruta agregada, peso): polling de estado domina, luego páginas de contenido y assets
+TRAFFIC = (
+    ("GET /api/campaigns", 30),
+    ("GET /api/pipeline", 10),
+    ("GET /api/content/{type}", 25),
+    ("GET /api/images/{file}", 12),
+    ("GET /api/carousels/slides/{file}", 12),
+    ("GET /api/approvals", 8),
+    ("POST /api/approvals", 3),
+)
+
+
+def _request(route: str, rng: random.Random, fixture: dict[str, list[str]]) -> tuple[str, str, dict | None]:
+    if route == "GET /api/content/{type}":
+        return "GET", f"/api/content/{rng.choice(CONTENT_TYPES)}", None
+    if route == "GET /api/images/{file}":
+        return "GET", f"/api/images/{rng.choice(fixture['images'] or ['missing.png'])}", None
+    if route == "GET /api/carousels/slides/{file}":
+        return "GET", f"/api/carousels/slides/{rng.choice(fixture['slides'] or ['missing.png'])}", None
+    if route == "POST /api/approvals":
+        return "POST", "/api/approvals", {
+            "checkpoint": "content_review", "item_id": rng.choice(fixture["slot_ids"] or ["slot_001"]),
+            "status": rng.choice(("approved", "rejected", "revision")), "feedback": "load test",
+        }
+    if route == "GET /api/approvals":
+        return "GET", "/api/approvals?latest=true", None  # lo que pide la página de approvals
+    method, path = route.split(" ", 1)
+    return method, path, None
+
+
+async def _user(client: httpx.AsyncClient, rng: random.Random, fixture: dict, deadline: float,
+                think_s: float, samples: dict[str, list], errors: dict[str, int]) -> None:
+    routes = [r for r, _ in TRAFFIC]
+    weights = [w for _, w in TRAFFIC]
+    while time.perf_counter() < deadline:
+        route = rng.choices(routes, weights)[0]
+        method, path, payload = _request(route, rng, fixture)
+        started = time.perf_counter()
+        try:
+            response = await client.request(method, path, json=payload)
+            await response.aread()
+            ok = response.status_code < 400
+        except httpx.HTTPError:
+            ok = False
+        samples.setdefault(route, []).append(time.perf_counter() - started)
+        if not ok:
+            errors[route] = errors.get(route, 0) + 1
+        if think_s:
+            await asyncio.sleep(think_s * rng.uniform(0.5, 1.5))
+
+
+def _percentile(ordered: list[float], q: float) -> float:
+    if not ordered:
+        return 0.0
+    return ordered[min(int(round(q * (len(ordered) - 1))), len(ordered) - 1)]
+
+
+def _stats(latencies: list[float], errors: int, elapsed: float) -> dict:
+    ordered = sorted(latencies)
+    return {
+        "requests": len(ordered),
+        "errors": errors,
+        "error_rate": round(errors / len(ordered), 4) if ordered else 0.0,
+        "throughput_rps": round(len(ordered) / elapsed, 2) if elapsed else 0.0,
+        "p50_ms": round(_percentile(ordered, 0.50) * 1000, 2),
+        "p95_ms": round(_percentile(ordered, 0.95) * 1000, 2),
+        "p99_ms": round(_percentile(ordered, 0.99) * 1000, 2),
+    }
+
+
+async def run_level(base_url: str, users: int, duration_s: float, think_s: float, fixture: dict, seed: int) -> dict:
+    samples: dict[str, list[float]] = {}
+    errors: dict[str, int] = {}
+    limits = httpx.Limits(max_connections=users, max_keepalive_connections=users)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30) as client:
+        started = time.perf_counter()
+        deadline = started + duration_s
+        await asyncio.gather(*(
+            _user(client, random.Random(seed + i), fixture, deadline, think_s, samples, errors) for i in range(users)
+        ))
+        elapsed = time.perf_counter() - started
+    routes = {route: _stats(samples[route], errors.get(route, 0), elapsed) for route, _ in TRAFFIC if route in samples}
+    everything = [s for route in samples.values() for s in route]
+    return {"users": users, "duration_s": round(elapsed, 2), "total": _stats(everything, sum(errors.values()), elapsed),
+            "routes": routes}
+
+
+# ── Servidor ───────────────────────────────────────────
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_api(data_dir: Path, workers: int, log_path: Path) -> tuple[subprocess.Popen, str]:
+    """Levanta api:app con uvicorn sobre data_dir; stdout/stderr del server van a log_path."""
+    port = _free_port()
+    env = {**os.environ, "CONTENT_ENGINE_DATA_DIR": str(data_dir)}
+    log_path.parent.mkdir(parents=True, exist_ok=True)
+    log = open(log_path, "w", encoding="utf-8")
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "api:app", "--host", "127.0.0.1", "--port", str(port),
+         "--workers", str(workers), "--log-level", "warning", "--no-access-log"],
+        cwd=PROJECT_ROOT, env=env, stdout=log, stderr=subprocess.STDOUT,
+    )
+    log.close()
+    url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"API exited with code {proc.returncode}, see {log_path}")
+        try:
+            if httpx.get(f"{url}/api/health", timeout=1).status_code == 200:
+                return proc, url
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    proc.terminate()
+    raise RuntimeError("API did not become healthy in 60s")
+
+
+def _print_level(level: dict) -> None:
+    table = Table(title=f"{level['users']} users · {level['duration_s']}s")
+    for column in ("Route", "req", "rps", "p50 ms", "p95 ms", "p99 ms", "errors"):
+        table.add_column(column, justify="left" if column == "Route" else "right")
+    for route, s in [*level["routes"].items(), ("TOTAL", level["total"])]:
+        table.add_row(route, str(s["requests"]), f"{s['throughput_rps']:.1f}", f"{s['p50_ms']:.1f}",
+                      f"{s['p95_ms']:.1f}", f"{s['p99_ms']:.1f}", f"{s['errors']} ({s['error_rate']:.1%})",
+                      style="bold" if route == "TOTAL" else "")
+    console.print(table)
+
+
+@app.command()
+def main(
+    concurrency: str = typer.Option("1,4,16,32", help="Niveles de usuarios concurrentes, separados por coma"),
+    duration: float = typer.Option(10.0, help="Segundos por nivel"),
+    think_ms: float = typer.Option(0.0, help="Pausa media entre requests de un usuario (0 = lazo cerrado)"),
+    slots: int = typer.Option(28, min=1, help="Slots del fixture"),
+    history: int = typer.Option(20, min=0, help="Runs anteriores por agente en data/outputs"),
+    workers: int = typer.Option(1, help="Workers de uvicorn (el contenedor usa 1)"),
+    url: str = typer.Option("", help="API ya levantada (no genera fixture; las rutas de assets pueden dar 404)"),
+    slo_p95_ms: float = typer.Option(500.0, help="SLO de p95 total para la capacidad reportada"),
+    slo_error_rate: float = typer.Option(0.01, help="Tasa de error máxima para la capacidad reportada"),
+    seed: int = typer.Option(7, help="Semilla del mix de tráfico"),
+    output: Path = typer.Option(RESULTS_PATH, help="Archivo JSON de resultados"),
+):
+    """Reproducir tráfico de dashboard a concurrencia creciente y reportar latencia por ruta."""
+    levels = [int(c) for c in concurrency.split(",") if c.strip()]
+    data_dir, proc = None, None
+    if url:
+        fixture = {"images": [], "slides": [], "slot_ids": []}
+        base_url = url.rstrip("/")
+    else:
+        data_dir = isolated_data_dir()
+        console.print(f"[cyan]Building fixture: {slots} slots, {history} older runs per agent[/cyan]")
+        fixture = build_fixture(data_dir, slots, history)
+        proc, base_url = start_api(data_dir, workers, output.with_suffix(".server.log"))
+
+    results = []
+    try:
+        for users in levels:
+            console.print(f"[cyan]>> {users} concurrent users for {duration:.0f}s[/cyan]")
+            level = asyncio.run(run_level(base_url, users, duration, think_ms / 1000, fixture, seed))
+            _print_level(level)
+            results.append(level)
+    finally:
+        if proc:
+            proc.terminate()
+            proc.wait(timeout=30)
+        if data_dir:
+            shutil.rmtree(data_dir, ignore_errors=True)
+
+    passing = [lvl["users"] for lvl in results
+               if lvl["total"]["p95_ms"] <= slo_p95_ms and lvl["total"]["error_rate"] <= slo_error_rate]
+    report = {
+        "suite": "load_dashboard",
+        "environment": environment(),
+        "config": {"duration_s": duration, "think_ms": think_ms, "slots": slots, "history": history,
+                   "workers": workers, "traffic": dict(TRAFFIC), "url": url or None},
+        "slo": {"p95_ms": slo_p95_ms, "error_rate": slo_error_rate,
+                "max_users_within_slo": max(passing) if passing else 0},
+        "levels": results,
+    }
+    write_json(report, output)
+    console.print(f"Max concurrent users within SLO (p95 <= {slo_p95_ms:.0f} ms, errors <= {slo_error_rate:.0%}): "
+                  f"[bold]{report['slo']['max_users_within_slo']}[/bold]")
+    console.print(f"Results: {output}" + (f" (server log: {output.with_suffix('.server.log')})" if proc else ""))
+
+
+if __name__ == "__main__":
+    app()
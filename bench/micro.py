@@ -0,0 +1,299 @@
+"""
+Microbenchmarks de los hot paths locales (sin red):
+  - utils.image_text: add_text_overlay, _wrap_text y add_brand_bar en cada
+    tamaño de visual_designer.image_sizes (config.yaml)
+  - save_json / load_json con outputs grandes
+  - api.get_latest_file con 10k archivos en data/outputs
+  - carga de config (config, brand, platforms)
+  - BaseAgent._extract_json / _auto_save_output sobre respuestas grandes
+
+Resultados en JSON (min/mediana/p95 por llamada, en ms). Con --compare cada
+benchmark falla si su mediana empeora más que su tolerancia respecto al baseline;
+versionar bench/baselines/micro.json deja los cambios de performance en el diff.
+
+Uso:
+    python -m bench.micro                          # tabla + bench/results/micro.json
+    python -m bench.micro --filter image_text --json
+    python -m bench.micro --save-baseline          # guarda bench/baselines/micro.json
+    python -m bench.micro --compare --tolerance 0.25
+"""
+
+import gc
+import json
+import os
+import shutil
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Callable
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import typer
+from rich.console import Console
+from rich.markup import escape
+from rich.table import Table
+
+from bench.common import BASELINES_DIR, compare_metrics, environment, isolated_data_dir, print_comparison, write_json
+
+app = typer.Typer(help="Microbenchmarks de los hot paths locales del Content Engine")
+console = Console(stderr=True)
+
+RESULTS_PATH = Path(__file__).parent / "results" / "micro.json"
+LATEST_FILE_COUNT = 10_000
+LONG_TEXT = (
+    "Automatiza los procesos repetitivos de tu negocio y enfoca a tu equipo en lo que genera valor: "
+    "te mostramos cómo lo hicieron otras empresas de la región en pocas semanas"
+)
+# El render de imágenes varía más entre corridas que el resto
+IMAGE_TOLERANCE = 0.35
+
+
+class Benchmark:
+    """Un caso: setup() arma el estado (fuera del tiempo medido) y retorna la función a medir."""
+
+    def __init__(self, name: str, setup: Callable[[], Callable[[], object]], number: int = 1,
+                 repeat: int = 15, tolerance: float | None = None, params: dict | None = None):
+        self.name = name
+        self.setup = setup
+        self.number = number
+        self.repeat = repeat
+        self.tolerance = tolerance
+        self.params = params or {}
+
+    def run(self, scale: float = 1.0) -> dict:
+        fn = self.setup()
+        fn()  # warmup (caches de fuentes, imports perezosos)
+        repeat = max(int(self.repeat * scale), 3)
+        samples = []
+        gc_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            for _ in range(repeat):
+                started = time.perf_counter()
+                for _ in range(self.number):
+                    fn()
+                samples.append((time.perf_counter() - started) / self.number * 1000)
+        finally:
+            if gc_enabled:
+                gc.enable()
+        samples.sort()
+        return {
+            "name": self.name,
+            "params": self.params,
+            "number": self.number,
+            "repeat": repeat,
+            "min_ms": round(samples[0], 4),
+            "median_ms": round(statistics.median(samples), 4),
+            "p95_ms": round(samples[min(int(len(samples) * 0.95), len(samples) - 1)], 4),
+            "mean_ms": round(statistics.fmean(samples), 4),
+            "stdev_ms": round(statistics.stdev(samples), 4) if len(samples) > 1 else 0.0,
+        }
+
+
+# ── Casos ──────────────────────────────────────────────
+
+def _image_sizes() -> dict[str, tuple[int, int]]:
+    from utils.helpers import get_config
+    sizes = ((get_config().get("agents") or {}).get("visual_designer") or {}).get("image_sizes") or {}
+    return {name: (int(w), int(h)) for name, (w, h) in sizes.items()}
+
+
+def _base_image(data_dir: Path, width: int, height: int) -> Path:
+    from PIL import Image
+    path = data_dir / "micro" / f"base_{width}x{height}.png"
+    if not path.exists():
+        path.parent.mkdir(parents=True, exist_ok=True)
+        gradient = Image.linear_gradient("L").resize((width, height))
+        Image.merge("RGB", (gradient, gradient.point(lambda v: v // 2), gradient.point(lambda v: 255 - v))).save(path)
+    return path
+
+
+def _image_text_cases(data_dir: Path) -> list[Benchmark]:
+    from utils import image_text
+
+    texts = [
+        {"text": "¿Tu equipo sigue haciendo esto a mano?", "position": "top", "font_size": 64},
+        {"text": LONG_TEXT, "position": "center", "font_size": 44, "bg_color": "#1a1a2e"},
+        {"text": "Agenda tu diagnóstico gratis", "position": "bottom", "font_size": 36},
+    ]
+    cases = []
+    for size_name, (w, h) in _image_sizes().items():
+        params = {"size": size_name, "width": w, "height": h}
+
+        def overlay(w=w, h=h):
+            src, out = _base_image(data_dir, w, h), data_dir / "micro" / f"overlay_{w}x{h}.png"
+            return lambda: image_text.add_text_overlay(src, texts, output_path=out)
+
+        def brand_bar(w=w, h=h):
+            src, out = _base_image(data_dir, w, h), data_dir / "micro" / f"bar_{w}x{h}.png"
+            return lambda: image_text.add_brand_bar(src, output_path=out)
+
+        def wrap(w=w, h=h):
+            from PIL import Image, ImageDraw
+            draw = ImageDraw.Draw(Image.new("RGBA", (w, h)))
+            font = image_text._get_font(48)
+            return lambda: image_text._wrap_text(draw, LONG_TEXT, font, int(w * 0.85))
+
+        cases += [
+            Benchmark(f"image_text.add_text_overlay[{size_name}]", overlay, repeat=10,
+                      tolerance=IMAGE_TOLERANCE, params=params),
+            Benchmark(f"image_text.add_brand_bar[{size_name}]", brand_bar, repeat=10,
+                      tolerance=IMAGE_TOLERANCE, params=params),
+            Benchmark(f"image_text._wrap_text[{size_name}]", wrap, number=50, params=params),
+        ]
+    return cases
+
+
+def _large_output(n_slots: int) -> dict:
+    from bench.transcripts import _optimization, _script, build_slots
+    slots = build_slots(n_slots)
+    return {"scripts": [_script(s) for s in slots], "optimizations": [_optimization(s) for s in slots]}
+
+
+def _json_cases(data_dir: Path) -> list[Benchmark]:
+    from utils.helpers import load_json, save_json
+
+    cases = []
+    for n_slots in (100, 1000):
+        data = _large_output(n_slots)
+        path = data_dir / "micro" / f"large_{n_slots}.json"
+        size_kb = round(len(json.dumps(data, ensure_ascii=False).encode("utf-8")) / 1024)
+        params = {"slots": n_slots, "size_kb": size_kb}
+
+        def save(data=data, path=path):
+            return lambda: save_json(data, path)
+
+        def load(data=data, path=path):
+            save_json(data, path)
+            return lambda: load_json(path)
+
+        cases += [
+            Benchmark(f"helpers.save_json[{n_slots}_slots]", save, params=params),
+            Benchmark(f"helpers.load_json[{n_slots}_slots]", load, params=params),
+        ]
+    return cases
+
+
+def _latest_file_cases(data_dir: Path) -> list[Benchmark]:
+    def setup():
+        from api import get_latest_file
+        outputs = data_dir / "outputs"
+        outputs.mkdir(parents=True, exist_ok=True)
+        if not any(outputs.glob("copywriter_*.json")):
+            agents = ("trend_researcher", "content_planner", "copywriter", "seo_hashtag_specialist", "brand_guardian")
+            now = time.time()
+            for i in range(LATEST_FILE_COUNT):
+                path = outputs / f"{agents[i % len(agents)]}_{i:05d}_output.json"
+                path.write_text('{"ok": true}', encoding="utf-8")
+                os.utime(path, (now - LATEST_FILE_COUNT + i, now - LATEST_FILE_COUNT + i))
+        return lambda: get_latest_file("copywriter")
+
+    return [Benchmark("api.get_latest_file[10k_files]", setup, repeat=10, params={"files": LATEST_FILE_COUNT})]
+
+
+def _config_cases() -> list[Benchmark]:
+    from utils import helpers
+    return [
+        Benchmark(f"helpers.{fn}", lambda fn=fn: getattr(helpers, fn), number=20)
+        for fn in ("get_config", "get_brand_config", "get_platform_config")
+    ]
+
+
+def _agent_cases() -> list[Benchmark]:
+    from agents.copywriter.agent import CopywriterAgent
+
+    data = _large_output(300)
+    pretty = json.dumps(data, ensure_ascii=False, indent=2)
+    responses = {
+        "fenced": f"Aquí está el resultado final:\n\n```json\n{pretty}\n```\n\nQuedo atento a comentarios.",
+        "raw_json": pretty,
+        "embedded": f"Resultado final (sin bloque de código): {pretty} -- fin del reporte.",
+        "no_json": (LONG_TEXT + " ") * 4000,
+    }
+    agent = CopywriterAgent()
+    cases = [
+        Benchmark(f"base_agent._extract_json[{kind}]", lambda text=text: lambda: agent._extract_json(text),
+                  params={"chars": len(text)})
+        for kind, text in responses.items()
+    ]
+    cases.append(Benchmark("base_agent._auto_save_output[fenced]",
+                           lambda: lambda: agent._auto_save_output(responses["fenced"]),
+                           repeat=10, params={"chars": len(responses["fenced"])}))
+    return cases
+
+
+def collect(data_dir: Path) -> list[Benchmark]:
+    return [
+        *_image_text_cases(data_dir),
+        *_json_cases(data_dir),
+        *_latest_file_cases(data_dir),
+        *_config_cases(),
+        *_agent_cases(),
+    ]
+
+
+# ── CLI ────────────────────────────────────────────────
+
+@app.command()
+def main(
+    filter: str = typer.Option("", "--filter", "-k", help="Correr solo los benchmarks cuyo nombre contenga esto"),
+    scale: float = typer.Option(1.0, help="Multiplicador de repeticiones (0.3 para una corrida rápida)"),
+    output: Path = typer.Option(RESULTS_PATH, help="Archivo JSON de resultados"),
+    as_json: bool = typer.Option(False, "--json", help="Imprimir el JSON de resultados en stdout"),
+    save_baseline: bool = typer.Option(False, "--save-baseline", help="Guardar como bench/baselines/micro.json"),
+    compare_baseline: bool = typer.Option(False, "--compare", help="Comparar medianas contra el baseline"),
+    baseline: Path = typer.Option(BASELINES_DIR / "micro.json", help="Baseline a usar"),
+    tolerance: float = typer.Option(0.25, help="Empeoramiento tolerado de la mediana (0.25 = 25%)"),
+):
+    """Medir los hot paths locales y emitir resultados en JSON."""
+    # Data dir aislado antes de importar api y los agentes; sin claves reales ni cassettes
+    data_dir = isolated_data_dir()
+    os.environ.setdefault("ANTHROPIC_API_KEY", "bench-key")
+    for var in ("CONTENT_ENGINE_CASSETTE", "CONTENT_ENGINE_CASSETTE_MODE"):
+        os.environ.pop(var, None)
+
+    try:
+        benchmarks = [b for b in collect(data_dir) if filter in b.name]
+        results, tolerances = [], {}
+        for bench in benchmarks:
+            console.print(f"[cyan]>> {escape(bench.name)}[/cyan]")
+            results.append(bench.run(scale))
+            if bench.tolerance is not None:
+                tolerances[bench.name] = bench.tolerance
+    finally:
+        shutil.rmtree(data_dir, ignore_errors=True)
+
+    report = {"suite": "micro", "environment": environment(), "results": results}
+    write_json(report, output)
+    if save_baseline:
+        write_json(report, baseline)
+        console.print(f"[green]Baseline saved: {baseline}[/green]")
+
+    if as_json:
+        print(json.dumps(report, indent=2, ensure_ascii=False))
+    else:
+        table = Table(title=f"Microbenchmarks ({len(results)})")
+        for column in ("Benchmark", "min ms", "median ms", "p95 ms", "runs"):
+            table.add_column(column, justify="left" if column == "Benchmark" else "right")
+        for r in results:
+            table.add_row(escape(r["name"]), f"{r['min_ms']:.3f}", f"{r['median_ms']:.3f}", f"{r['p95_ms']:.3f}",
+                          f"{r['repeat']}x{r['number']}")
+        console.print(table)
+
+    if compare_baseline:
+        if not baseline.exists():
+            console.print(f"[red]Baseline not found: {baseline}[/red]")
+            raise typer.Exit(2)
+        base = {r["name"]: r["median_ms"] for r in json.loads(baseline.read_text(encoding="utf-8"))["results"]}
+        current = {r["name"]: r["median_ms"] for r in results}
+        base = {k: v for k, v in base.items() if k in current}
+        rows = compare_metrics(current, base, tolerance, tolerances)
+        print_comparison(console, rows, f"median ms vs {baseline.name}")
+        if any(row["regression"] for row in rows):
+            raise typer.Exit(1)
+
+
+if __name__ == "__main__":
+    app()
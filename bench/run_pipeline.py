@@ -0,0 +1,323 @@
+"""
+Benchmark end-to-end del pipeline con proveedores locales.
+
+Levanta los proveedores falsos (bench/fake_providers.py), apunta el Content
+Engine a un data dir temporal y corre un flujo completo sobre un plan
+sintético de N slots:
+  - orchestrator: OrchestratorAgent.run_pipeline(skip_checkpoints=True)
+  - api: POST /api/campaigns + aprobación de cada checkpoint vía /api/pipeline/approve
+
+Reporta wall time, tiempo por fase y por agente (spans de utils.tracing), peak
+RSS, conteo de archivos abiertos y bytes de I/O, turnos y tool calls
+(utils.accounting) y requests por proveedor. Un flujo por proceso: el peak RSS
+es del proceso completo.
+
+Uso:
+    python -m bench.run_pipeline --slots 28
+    python -m bench.run_pipeline --slots 100 --flow api --llm-ms 50
+    python -m bench.run_pipeline --slots 28 --save-baseline     # guarda bench/baselines/orchestrator_28.json
+    python -m bench.run_pipeline --slots 28 --compare           # compara contra ese baseline (exit 1 si hay regresión)
+"""
+
+import builtins
+import io
+import json
+import os
+import resource
+import shutil
+import sys
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import typer
+from rich.console import Console
+from rich.table import Table
+
+from bench.common import BASELINES_DIR, compare_metrics, environment, isolated_data_dir, print_comparison, write_json
+from bench.fake_providers import FakeProviders
+from bench.transcripts import build_slots
+
+app = typer.Typer(help="Benchmark end-to-end del pipeline con proveedores locales")
+console = Console()
+
+PROJECT_ROOT = Path(__file__).parent.parent
+BRIEF = "Campaña de benchmark: automatización con IA para pymes"
+# Tokens de integraciones sin proveedor falso: se quitan para que usen su stub
+_UNSET_ENV = ("LINKEDIN_ACCESS_TOKEN", "TIKTOK_ACCESS_TOKEN", "YOUTUBE_API_KEY", "HEYGEN_API_KEY",
+              "CONTENT_ENGINE_CASSETTE", "CONTENT_ENGINE_CASSETTE_MODE")
+# Métricas comparadas contra el baseline (más alto = peor)
+_COMPARED = ("wall_s", "peak_rss_mb", "files.opens_read", "files.opens_write", "turns.total", "tool_calls")
+
+
+def _prompt_agents() -> dict[str, str]:
+    """Primera línea de cada prompts/<agente>.md → nombre del agente."""
+    agents = {}
+    for path in sorted((PROJECT_ROOT / "prompts").glob("*.md")):
+        with open(path, "r", encoding="utf-8") as f:
+            agents[f.readline().strip()] = path.stem
+    return agents
+
+
+def _apply_env(env: dict[str, str]) -> None:
+    for key in _UNSET_ENV:
+        os.environ.pop(key, None)
+    os.environ.update(env)
+
+
+# ── Instrumentación ────────────────────────────────────
+
+class FileIOCounter:
+    """Cuenta open() por modo (lectura/escritura) dentro del data dir y en total."""
+
+    def __init__(self, data_dir: Path):
+        self.data_dir = str(data_dir)
+        self.opens_read = 0
+        self.opens_write = 0
+        self.data_dir_opens = 0
+
+    @contextmanager
+    def patch(self):
+        original = builtins.open
+
+        def counting_open(file, mode="r", *args, **kwargs):
+            if isinstance(file, (str, os.PathLike)):
+                if any(c in mode for c in "wax+"):
+                    self.opens_write += 1
+                else:
+                    self.opens_read += 1
+                if os.fspath(file).startswith(self.data_dir):
+                    self.data_dir_opens += 1
+            return original(file, mode, *args, **kwargs)
+
+        builtins.open = io.open = counting_open
+        try:
+            yield self
+        finally:
+            builtins.open = io.open = original
+
+    def as_dict(self) -> dict:
+        return {"opens_read": self.opens_read, "opens_write": self.opens_write, "data_dir_opens": self.data_dir_opens}
+
+
+def _proc_io() -> dict[str, int]:
+    """Contadores de /proc/self/io (Linux); rchar/wchar incluyen sockets."""
+    try:
+        with open("/proc/self/io", "r") as f:
+            return {k: int(v) for k, v in (line.split(": ") for line in f if ": " in line)}
+    except OSError:
+        return {}
+
+
+def _peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024, 1)
+
+
+def _span_durations(run_id: str) -> dict[str, dict[str, float]]:
+    """Segundos por fase, agente y checkpoint a partir del trace del run."""
+    from utils.tracing import load_trace
+
+    out: dict[str, dict[str, float]] = {"phases": {}, "agents": {}, "checkpoints": {}}
+    for s in load_trace(run_id):
+        seconds = (int(s["endTimeUnixNano"]) - int(s["startTimeUnixNano"])) / 1e9
+        kind, _, rest = s["name"].partition(" ")
+        group = {"phase": "phases", "agent": "agents", "checkpoint": "checkpoints"}.get(kind)
+        if group and rest:
+            key = rest.split(":", 1)[0] if kind == "phase" else rest
+            out[group][key] = round(out[group].get(key, 0.0) + seconds, 3)
+    for group in out.values():
+        ordered = dict(sorted(group.items(), key=lambda kv: (not kv[0].isdigit(), int(kv[0]) if kv[0].isdigit() else 0, kv[0])))
+        group.clear()
+        group.update(ordered)
+    return out
+
+
+# ── Flujos ─────────────────────────────────────────────
+
+def _run_orchestrator() -> tuple[str, str, int]:
+    from agents.orchestrator.agent import OrchestratorAgent
+    from utils.run_context import new_run_id, set_run_id
+
+    set_run_id(new_run_id())
+    result = OrchestratorAgent().run_pipeline(skip_checkpoints=True, campaign_brief=BRIEF)
+    status = result["status"] if not result["errors"] else f"errors: {[e['agent'] for e in result['errors']]}"
+    return result["run_id"], status, 0
+
+
+def _run_api(timeout_s: float) -> tuple[str, str, int]:
+    """Lanza la campaña y aprueba cada checkpoint; cuenta los polls que fallaron (estado leído a medio escribir)."""
+    from fastapi.testclient import TestClient
+
+    from api import app as api_app
+
+    client = TestClient(api_app, raise_server_exceptions=False)
+    response = client.post("/api/campaigns", json={
+        "brief": BRIEF,
+        "platforms": ["instagram", "tiktok", "linkedin", "youtube", "facebook"],
+        "language": ["es", "en"],
+    })
+    response.raise_for_status()
+    run_id = response.json()["run_id"]
+    poll_errors = 0
+    deadline = time.monotonic() + timeout_s
+    while time.monotonic() < deadline:
+        response = client.get("/api/campaigns")
+        if response.status_code != 200:
+            poll_errors += 1
+            continue
+        state = response.json()["pipeline"]
+        status = state.get("status")
+        if status == "waiting_approval":
+            client.post("/api/pipeline/approve")
+        elif status in ("completed", "error", "stopped_by_user"):
+            return run_id, status if status != "error" else f"error: {state.get('error')}", poll_errors
+        time.sleep(0.05)
+    return run_id, "timeout", poll_errors
+
+
+def run_benchmark(slots: int, flow: str, llm_ms: float, provider_ms: float, timeout_s: float,
+                  keep_data: bool) -> dict:
+    data_dir = isolated_data_dir()
+    plan = build_slots(slots)
+    max_turns: dict[str, int] = {}
+
+    with FakeProviders(plan, _prompt_agents(), max_turns, llm_ms=llm_ms, provider_ms=provider_ms) as fakes:
+        env = {**fakes.env(), "CONTENT_ENGINE_DATA_DIR": str(data_dir)}
+        _apply_env(env)
+
+        # Importar después de fijar el entorno (api y los agentes leen rutas y .env al importar)
+        import importlib
+
+        from agents.orchestrator.agent import AGENT_REGISTRY
+        for name, (module_path, class_name) in AGENT_REGISTRY.items():
+            max_turns[name] = getattr(importlib.import_module(module_path), class_name).max_turns
+        if flow == "api":
+            import api  # noqa: F401
+        _apply_env(env)  # load_dotenv(override=True) pudo pisar las variables
+
+        from utils.accounting import summarize_run
+
+        counter = FileIOCounter(data_dir)
+        io_before = _proc_io()
+        started = time.perf_counter()
+        with counter.patch():
+            run_id, status, poll_errors = _run_orchestrator() if flow == "orchestrator" else _run_api(timeout_s)
+        wall_s = time.perf_counter() - started
+        io_after = _proc_io()
+
+        summary = summarize_run(run_id) or {"totals": {}, "agents": {}}
+        spans = _span_durations(run_id)
+        outputs = data_dir / "outputs"
+        result = {
+            "flow": flow,
+            "slots": slots,
+            "status": status,
+            "run_id": run_id,
+            "environment": {**environment(), "llm_ms": llm_ms, "provider_ms": provider_ms},
+            "wall_s": round(wall_s, 3),
+            "phases_s": spans["phases"],
+            "agents_s": spans["agents"],
+            "checkpoints_s": spans["checkpoints"],
+            "state_poll_errors": poll_errors,
+            "peak_rss_mb": _peak_rss_mb(),
+            "files": {
+                **counter.as_dict(),
+                **{k: io_after[k] - io_before.get(k, 0) for k in ("rchar", "wchar", "syscr", "syscw",
+                                                                 "read_bytes", "write_bytes") if k in io_after},
+                "output_files": sum(1 for p in outputs.rglob("*") if p.is_file()) if outputs.exists() else 0,
+            },
+            "turns": {"total": summary["totals"].get("turns", 0),
+                      **{agent: t["turns"] for agent, t in summary["agents"].items()}},
+            "tool_calls": summary["totals"].get("tool_calls", 0),
+            "tool_errors": sum(t["errors"] for t in summary.get("tools", {}).values()),
+            "provider_requests": fakes.request_counts(),
+        }
+
+    if keep_data:
+        result["data_dir"] = str(data_dir)
+    else:
+        shutil.rmtree(data_dir, ignore_errors=True)
+    return result
+
+
+# ── Baseline ───────────────────────────────────────────
+
+def _lookup(data: dict, dotted: str):
+    for part in dotted.split("."):
+        data = data.get(part) if isinstance(data, dict) else None
+    return data
+
+
+def compare(result: dict, baseline: dict, tolerance: float) -> list[dict]:
+    """Métricas (globales y por fase) que empeoraron más que `tolerance` (fracción) respecto al baseline."""
+    keys = list(_COMPARED) + [f"phases_s.{p}" for p in baseline.get("phases_s", {})]
+    return compare_metrics({k: _lookup(result, k) for k in keys}, {k: _lookup(baseline, k) for k in keys}, tolerance)
+
+
+def _print_result(result: dict) -> None:
+    table = Table(title=f"Pipeline benchmark · flow={result['flow']} · slots={result['slots']} · {result['status']}")
+    table.add_column("Metric", style="cyan")
+    table.add_column("Value", style="green", justify="right")
+    table.add_row("wall time", f"{result['wall_s']:.2f} s")
+    for phase, seconds in result["phases_s"].items():
+        table.add_row(f"  phase {phase}", f"{seconds:.2f} s")
+    for checkpoint, seconds in result["checkpoints_s"].items():
+        table.add_row(f"  checkpoint {checkpoint} (wait)", f"{seconds:.2f} s")
+    if result["flow"] == "api":
+        table.add_row("state poll errors", str(result["state_poll_errors"]))
+    table.add_row("peak RSS", f"{result['peak_rss_mb']:.1f} MB")
+    for key, value in result["files"].items():
+        table.add_row(f"files.{key}", str(value))
+    table.add_row("turns", str(result["turns"]["total"]))
+    table.add_row("tool calls", f"{result['tool_calls']} ({result['tool_errors']} errors)")
+    for provider, counts in result["provider_requests"].items():
+        table.add_row(f"requests.{provider}", str(sum(counts.values())))
+    console.print(table)
+
+
+@app.command()
+def main(
+    slots: int = typer.Option(28, min=7, max=100, help="Slots del plan semanal (7-100)"),
+    flow: str = typer.Option("orchestrator", help="orchestrator | api"),
+    llm_ms: float = typer.Option(0.0, help="Latencia fija por turno del Anthropic falso (ms)"),
+    provider_ms: float = typer.Option(0.0, help="Latencia fija de Perplexity/Replicate/Meta falsos (ms)"),
+    timeout: float = typer.Option(600.0, help="Timeout del flujo api (s)"),
+    output: Path = typer.Option(None, help="Guardar el resultado en este JSON"),
+    save_baseline: bool = typer.Option(False, "--save-baseline", help="Guardar como baseline de flow/slots"),
+    compare_baseline: bool = typer.Option(False, "--compare", help="Comparar contra el baseline de flow/slots"),
+    baseline: Path = typer.Option(None, help="Baseline a usar (default: bench/baselines/<flow>_<slots>.json)"),
+    tolerance: float = typer.Option(0.20, help="Empeoramiento tolerado antes de marcar regresión (0.20 = 20%)"),
+    keep_data: bool = typer.Option(False, help="No borrar el data dir temporal"),
+):
+    """Correr el pipeline completo contra proveedores locales y reportar tiempos y recursos."""
+    if flow not in ("orchestrator", "api"):
+        raise typer.BadParameter("flow must be orchestrator or api")
+    baseline_path = baseline or BASELINES_DIR / f"{flow}_{slots}.json"
+
+    result = run_benchmark(slots, flow, llm_ms, provider_ms, timeout, keep_data)
+    _print_result(result)
+
+    if output:
+        write_json(result, output)
+    if save_baseline:
+        write_json(result, baseline_path)
+        console.print(f"[green]Baseline saved: {baseline_path}[/green]")
+
+    failed = result["status"] != "completed" or result["tool_errors"] > 0
+    if compare_baseline:
+        if not baseline_path.exists():
+            console.print(f"[red]Baseline not found: {baseline_path}[/red]")
+            raise typer.Exit(2)
+        rows = compare(result, json.loads(baseline_path.read_text(encoding="utf-8")), tolerance)
+        print_comparison(console, rows, f"vs {baseline_path.name}")
+        failed = failed or any(row["regression"] for row in rows)
+
+    if failed:
+        raise typer.Exit(1)
+
+
+if __name__ == "__main__":
+    app()
@@ -0,0 +1,222 @@
+"""
+Transcripts tool_use guionados para el Anthropic falso del benchmark.
+
+Cada agente sigue un guion fijo de turnos (leer upstream → tools por slot →
+save_agent_output → texto final) sobre un plan sintético de N slots con ids
+deterministas (slot_001, slot_002, ...), así todos los agentes coinciden sin
+tener que interpretar los tool results. Los shards (execution_mode: sharded)
+responden con submit_shard_result para las piezas que trae su prompt.
+"""
+
+import json
+import math
+import re
+from datetime import date, timedelta
+
+from utils.helpers import get_slot_id
+
+PLATFORMS = ("instagram", "tiktok", "linkedin", "youtube", "facebook")
+FORMATS = {
+    "instagram": ("image", "carousel"),
+    "tiktok": ("reel",),
+    "linkedin": ("carousel", "image"),
+    "youtube": ("short",),
+    "facebook": ("image",),
+}
+PILLARS = ("automatizacion", "crecimiento", "casos_de_exito", "educacion")
+CAROUSEL_SLIDES = 3
+START_DATE = date(2026, 3, 2)
+
+_LOREM = (
+    "Automatiza los procesos repetitivos de tu negocio y enfoca a tu equipo en lo que "
+    "genera valor. Te mostramos cómo lo hicieron otras empresas de la región en semanas, "
+    "con métricas reales y sin cambiar sus herramientas actuales. "
+)
+_SHARD_ITEMS = re.compile(r"### Piezas asignadas:\n```json\n(.*?)\n```", re.S)
+
+
+# ── Plan sintético ─────────────────────────────────────
+
+def build_slots(n_slots: int) -> list[dict]:
+    """Slots del plan semanal: plataformas en ciclo, formatos por plataforma, 7 días."""
+    per_day = max(math.ceil(n_slots / 7), 1)
+    slots = []
+    for i in range(n_slots):
+        platform = PLATFORMS[i % len(PLATFORMS)]
+        formats = FORMATS[platform]
+        day = i // per_day
+        slots.append({
+            "slot_id": f"slot_{i + 1:03d}",
+            "day": day + 1,
+            "date": (START_DATE + timedelta(days=day)).isoformat(),
+            "time": f"{9 + (i % per_day) % 10:02d}:00",
+            "platform": platform,
+            "format": formats[(i // len(PLATFORMS)) % len(formats)],
+            "language": "es" if i % 3 else "en",
+            "pillar": PILLARS[i % len(PILLARS)],
+            "topic": f"Tema {i + 1}: automatización para pymes",
+            "hook": f"¿Tu equipo sigue haciendo esto a mano? #{i + 1}",
+        })
+    return slots
+
+
+def _content_plan(slots: list[dict]) -> dict:
+    days: dict[int, list[dict]] = {}
+    for slot in slots:
+        days.setdefault(slot["day"], []).append(slot)
+    return {
+        "week_start": START_DATE.isoformat(),
+        "total_slots": len(slots),
+        "daily_plans": [
+            {"day": day, "date": items[0]["date"], "content_slots": items}
+            for day, items in sorted(days.items())
+        ],
+    }
+
+
+def _script(slot: dict) -> dict:
+    return {
+        "slot_id": slot["slot_id"],
+        "platform": slot["platform"],
+        "format": slot["format"],
+        "language": slot["language"],
+        "hook": slot["hook"],
+        "body": _LOREM * 3,
+        "cta": "Agenda tu diagnóstico gratis",
+        "caption": f"{slot['hook']} {_LOREM}",
+    }
+
+
+def _optimization(slot: dict) -> dict:
+    return {
+        "slot_id": slot["slot_id"],
+        "platform": slot["platform"],
+        "hashtags": [f"#{slot['pillar']}", "#automatizacion", "#pymes", "#ia", "#productividad"],
+        "keywords": ["automatización", "pymes", "inteligencia artificial"],
+        "optimized_caption": f"{slot['hook']} {_LOREM}",
+    }
+
+
+def _review(slot: dict) -> dict:
+    return {"slot_id": slot["slot_id"], "score": 92, "approved": True, "issues": []}
+
+
+SHARD_RESULTS = {
+    "copywriter": _script,
+    "seo_hashtag_specialist": _optimization,
+    "brand_guardian": _review,
+}
+
+
+def _image_url(base_url: str, filename: str) -> str:
+    return f"{base_url}/files/{filename}"
+
+
+# ── Guiones por agente ─────────────────────────────────
+
+def _chunk(calls: list[list[tuple[str, dict]]], turns: int) -> list[list[tuple[str, dict]]]:
+    """Reparte los grupos de tool calls (uno por slot, en orden) en a lo sumo `turns` turnos."""
+    if not calls:
+        return []
+    per_turn = math.ceil(len(calls) / max(turns, 1))
+    return [[call for group in calls[i:i + per_turn] for call in group] for i in range(0, len(calls), per_turn)]
+
+
+def _save(data: dict, suffix: str) -> list[tuple[str, dict]]:
+    return [("save_agent_output", {"output_data": json.dumps(data, ensure_ascii=False), "suffix": suffix})]
+
+
+def build_script(agent: str, slots: list[dict], max_turns: int, files_url: str) -> list[list[tuple[str, dict]]]:
+    """
+    Turnos con tool calls del agente; el turno siguiente al último es el texto
+    final (end_turn). Los tools por slot se agrupan para no pasar de max_turns.
+    """
+    read = lambda *agents: [("read_agent_output", {"agent_name": a}) for a in agents]  # noqa: E731
+    work_turns = max_turns - 3  # read + save + texto final
+
+    if agent == "trend_researcher":
+        queries = [("search_perplexity", {"query": f"tendencias automatización pymes {q}"}) for q in ("LATAM", "2026")]
+        trends = {"trends": [{"name": f"Tendencia {i}", "score": 90 - i, "summary": _LOREM} for i in range(10)]}
+        return [queries, _save(trends, "trend_report")]
+    if agent == "viral_analyzer":
+        patterns = {"patterns": [{"pattern": f"Patrón {i}", "hook_type": "pregunta", "why": _LOREM} for i in range(8)]}
+        return [read("trend_researcher") + [("search_perplexity", {"query": "contenido viral B2B"})],
+                _save(patterns, "viral_analysis")]
+    if agent == "content_planner":
+        return [read("trend_researcher", "viral_analyzer"), _save(_content_plan(slots), "content_plan")]
+    if agent == "copywriter":
+        return [read("content_planner"), _save({"scripts": [_script(s) for s in slots]}, "content_scripts")]
+    if agent == "seo_hashtag_specialist":
+        optimizations = {"optimizations": [_optimization(s) for s in slots]}
+        return [read("copywriter"), _save(optimizations, "seo_optimizations")]
+    if agent == "brand_guardian":
+        reviews = {"content_reviews": [_review(s) for s in slots], "overall_score": 92}
+        return [read("copywriter"), _save(reviews, "compliance_report")]
+    if agent == "engagement_analyst":
+        report = {"summary": _LOREM, "recommendations": [_LOREM] * 5}
+        return [read("scheduler"), _save(report, "engagement_report")]
+
+    if agent == "visual_designer":
+        images = [s for s in slots if s["format"] == "image"]
+        calls = [[
+            ("generate_image", {"prompt": f"abstract blue gradient, {s['pillar']}", "filename": f"{s['slot_id']}.png",
+                                "width": 1080, "height": 1080}),
+            ("add_text_to_image", {"filename": f"{s['slot_id']}.png",
+                                   "texts": [{"text": s["hook"], "position": "top"},
+                                             {"text": "Agenda tu diagnóstico", "position": "bottom", "font_size": 36}]}),
+        ] for s in images]
+        saved = {"images": [{"slot_id": s["slot_id"], "filename": f"{s['slot_id']}.png"} for s in images]}
+        return [read("copywriter"), *_chunk(calls, work_turns), _save(saved, "visual_assets")]
+    if agent == "carousel_creator":
+        carousels = [s for s in slots if s["format"] == "carousel"]
+        calls = []
+        for s in carousels:
+            group = []
+            for n in range(1, CAROUSEL_SLIDES + 1):
+                filename = f"{s['slot_id']}_slide{n}.png"
+                group.append(("generate_carousel_slide", {"prompt": "minimal geometric shapes, brand colors",
+                                                          "slide_number": n, "total_slides": CAROUSEL_SLIDES,
+                                                          "filename": filename, "width": 1080, "height": 1350}))
+                group.append(("add_text_to_slide", {"filename": filename,
+                                                    "texts": [{"text": f"{s['hook']} ({n}/{CAROUSEL_SLIDES})",
+                                                               "position": "center"}]}))
+            calls.append(group)
+        saved = {"carousels": [
+            {"slot_id": s["slot_id"], "slides": [f"{s['slot_id']}_slide{n}.png" for n in range(1, CAROUSEL_SLIDES + 1)]}
+            for s in carousels
+        ]}
+        return [read("copywriter"), *_chunk(calls, work_turns), _save(saved, "carousels")]
+    if agent == "scheduler":
+        calls = []
+        for s in slots:
+            when = f"{s['date']}T{s['time']}:00-05:00"
+            caption = f"{s['hook']} {_LOREM}"
+            if s["platform"] in ("instagram", "facebook"):
+                media_type = {"image": "image", "carousel": "carousel"}.get(s["format"], "video")
+                calls.append([("schedule_meta_post", {
+                    "platform": s["platform"], "caption": caption, "media_type": media_type,
+                    "image_url": _image_url(files_url, f"{s['slot_id']}.png"), "scheduled_time": when,
+                })])
+            elif s["platform"] == "linkedin":
+                calls.append([("schedule_linkedin_post", {"text": caption, "media_type": "image", "scheduled_time": when})])
+            elif s["platform"] == "tiktok":
+                calls.append([("schedule_tiktok_post", {"caption": caption, "scheduled_time": when})])
+            else:
+                calls.append([("schedule_youtube_video", {"title": s["hook"], "description": caption,
+                                                          "scheduled_time": when, "video_type": "short"})])
+        saved = {"scheduled_posts": [{"slot_id": s["slot_id"], "platform": s["platform"], "status": "scheduled"}
+                                     for s in slots]}
+        return [read("brand_guardian", "copywriter"), *_chunk(calls, work_turns), _save(saved, "schedule")]
+
+    return [read("content_planner")]
+
+
+def shard_script(agent: str, user_prompt: str, slots: list[dict]) -> list[list[tuple[str, dict]]]:
+    """Un turno con submit_shard_result para las piezas del prompt del shard."""
+    match = _SHARD_ITEMS.search(user_prompt)
+    items = json.loads(match.group(1)) if match else []
+    ids = {get_slot_id(item) for item in items}
+    slots = [s for s in slots if s["slot_id"] in ids]
+    make = SHARD_RESULTS.get(agent, _review)
+    key = {"copywriter": "scripts", "seo_hashtag_specialist": "optimizations"}.get(agent, "content_reviews")
+    return [[("submit_shard_result", {"result_data": json.dumps({key: [make(s) for s in slots]}, ensure_ascii=False)})]]
@@ -31,7 +31,7 @@ export default function ApprovalsPage() {
         fetch(`${BACKEND}/api/content/scripts`).then(r => r.json()).catch(() => null),
         fetch(`${BACKEND}/api/content/compliance`).then(r => r.json()).catch(() => null),
         fetch(`${BACKEND}/api/content/schedule`).then(r => r.json()).catch(() => null),
-        fetch(`${BACKEND}/api/approvals`).then(r => r.json()).catch(() => ({ decisions: [] })),
+        fetch(`${BACKEND}/api/approvals?latest=true`).then(r => r.json()).catch(() => ({ decisions: [] })),
       ])
       setContentPlan(planRes?.error ? null : planRes)
       setScripts(scriptsRes?.error ? null : scriptsRes)
@@ -51,16 +51,17 @@ export default function ApprovalsPage() {
   }
 
   async function handleBatchApprove(checkpoint: Tab, itemIds: string[]) {
-    for (const id of itemIds) {
-      if (!getDecidedStatus(id, checkpoint)) {
-        await fetch(`${BACKEND}/api/approvals`, {
-          method: 'POST',
-          headers: { 'Content-Type': 'application/json' },
-          body: JSON.stringify({ checkpoint, item_id: id, status: 'approved', feedback: '' }),
-        })
-      }
+    const decisions = itemIds
+      .filter(id => !getDecidedStatus(id, checkpoint))
+      .map(id => ({ checkpoint, item_id: id, status: 'approved', feedback: '' }))
+    if (decisions.length > 0) {
+      await fetch(`${BACKEND}/api/approvals/bulk`, {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({ decisions }),
+      })
     }
-    const res = await fetch(`${BACKEND}/api/approvals`).then(r => r.json())
+    const res = await fetch(`${BACKEND}/api/approvals?latest=true`).then(r => r.json())
     setApprovals(res)
   }
 
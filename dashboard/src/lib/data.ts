@@ -145,6 +145,39 @@ export interface ApprovalsFile {
   decisions: ApprovalDecision[]
 }
 
+export interface OutputRecord {
+  id: number
+  output_id: number
+  agent: string
+  run_id: string | null
+  slot_id: string
+  platform: string | null
+  language: string | null
+  content_type: string | null
+  date: string | null
+  data: Record<string, any>
+}
+
+export interface OutputRecordQuery {
+  agent?: string
+  run_id?: string
+  slot_id?: string
+  platform?: string
+  language?: string
+  content_type?: string
+  date_from?: string
+  date_to?: string
+  limit?: number
+  offset?: number
+}
+
+export interface OutputRecordsPage {
+  records: OutputRecord[]
+  total: number
+  limit: number
+  offset: number
+}
+
 // --- API Client ---
 
 async function fetchBackend<T>(endpoint: string, options?: RequestInit): Promise<T | null> {
@@ -198,6 +231,15 @@ export async function getEngagementReport(): Promise<EngagementReport | null> {
 }
 
 export async function getApprovals(): Promise<ApprovalsFile> {
-  const data = await fetchBackend<ApprovalsFile>('/api/approvals')
+  const data = await fetchBackend<ApprovalsFile>('/api/approvals?latest=true')
   return data || { decisions: [] }
 }
+
+export async function queryOutputRecords(query: OutputRecordQuery = {}): Promise<OutputRecordsPage> {
+  const params = new URLSearchParams()
+  for (const [key, value] of Object.entries(query)) {
+    if (value !== undefined && value !== '') params.set(key, String(value))
+  }
+  const data = await fetchBackend<OutputRecordsPage>(`/api/outputs/records?${params}`)
+  return data || { records: [], total: 0, limit: query.limit ?? 100, offset: query.offset ?? 0 }
+}
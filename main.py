@@ -5,9 +5,13 @@ Entry point principal del pipeline de generación de contenido.
 Uso:
     python main.py pipeline                          # Pipeline completo
     python main.py campaign "brief de campaña"       # Lanzar campaña con brief
+    python main.py resume [run_id]                   # Retomar una campaña interrumpida
     python main.py agent trend_researcher            # Un agente específico
     python main.py phase 1                           # Una fase específica
+    python main.py phase 3 --force                   # Re-ejecutar aunque los inputs no cambiaron
     python main.py status                            # Estado del pipeline
+    python main.py --record semana1 phase 3          # Grabar llamadas a proveedores
+    python main.py --replay semana1 phase 3          # Reproducir sin red ni costo
 """
 
 import json
@@ -23,7 +27,11 @@ from rich.console import Console
 from rich.panel import Panel
 from rich.table import Table
 
-from utils.helpers import get_project_root, save_json
+from utils.helpers import get_data_dir, save_json
+from utils.pipeline_state import get_state, set_state, state_path
+from utils.run_context import new_run_id, set_run_id
+from utils.run_journal import agent_done, latest_resumable, load_progress, record_event
+from utils.tracing import span
 
 app = typer.Typer(help="A&J Phygital Group Content Engine")
 console = Console()
@@ -53,8 +61,28 @@ PHASES = {
 }
 
 
-def _run_agent(agent_name: str) -> str:
-    """Instancia y ejecuta un agente."""
+@app.callback()
+def main_options(
+    record: str = typer.Option(None, "--record", help="Grabar las llamadas a proveedores en este cassette"),
+    replay: str = typer.Option(None, "--replay", help="Reproducir las llamadas desde este cassette (sin red)"),
+    replay_latency: float = typer.Option(
+        0.0, "--replay-latency", help="Factor de los tiempos grabados a inyectar en replay (1.0 = tiempos reales)",
+    ),
+):
+    """Opciones globales: record/replay de llamadas a proveedores."""
+    if record and replay:
+        raise typer.BadParameter("Use --record or --replay, not both")
+    if record or replay:
+        from utils.cassette import configure
+        cassette = configure("record" if record else "replay", record or replay, replay_latency)
+        console.print(f"[magenta]Cassette {cassette.mode}: {cassette.path}[/magenta]")
+
+
+FORCE_HELP = "Ejecutar aunque los inputs no cambiaron (ignora la memoización)"
+
+
+def _run_agent(agent_name: str, force: bool = False) -> str:
+    """Instancia y ejecuta un agente (con force ignora la memoización de utils.memo)."""
     if agent_name not in AGENT_CLASSES:
         console.print(f"[red]Agent '{agent_name}' not found.[/red]")
         console.print(f"Available: {', '.join(AGENT_CLASSES.keys())}")
@@ -67,32 +95,36 @@ def _run_agent(agent_name: str) -> str:
     agent_instance = agent_class()
 
     console.print(f"[cyan]>> Running {agent_name}...[/cyan]")
-    result = agent_instance.run()
+    result = agent_instance.run(force=force)
     console.print(f"[green]OK {agent_name} completed[/green]")
     return result
 
 
 @app.command()
-def pipeline():
+def pipeline(force: bool = typer.Option(False, "--force", help=FORCE_HELP)):
     """Ejecutar el pipeline completo (fase por fase)."""
+    run_id = new_run_id()
+    set_run_id(run_id)
     console.print(Panel(
-        "[bold]A&J Phygital Group Content Engine[/bold]\nAutomate. Grow. Dominate.",
+        f"[bold]A&J Phygital Group Content Engine[/bold]\nAutomate. Grow. Dominate.\nRun: {run_id}",
         style="bold blue",
     ))
 
-    for phase_num in sorted(PHASES.keys()):
-        phase_info = PHASES[phase_num]
-        console.print(f"\n[bold blue]=== FASE {phase_num}: {phase_info['name']} ===[/bold blue]")
+    with span("pipeline"):
+        for phase_num in sorted(PHASES.keys()):
+            phase_info = PHASES[phase_num]
+            console.print(f"\n[bold blue]=== FASE {phase_num}: {phase_info['name']} ===[/bold blue]")
 
-        for agent_name in phase_info["agents"]:
-            _run_agent(agent_name)
+            with span(f"phase {phase_num}: {phase_info['name']}", phase=phase_num):
+                for agent_name in phase_info["agents"]:
+                    _run_agent(agent_name, force)
 
-        if phase_info.get("checkpoint"):
-            console.print("[yellow]CHECKPOINT: Requiere aprobacion humana.[/yellow]")
-            proceed = typer.confirm("¿Aprobar y continuar?")
-            if not proceed:
-                console.print("[red]Pipeline detenido por el usuario.[/red]")
-                return
+            if phase_info.get("checkpoint"):
+                console.print("[yellow]CHECKPOINT: Requiere aprobacion humana.[/yellow]")
+                proceed = typer.confirm("¿Aprobar y continuar?")
+                if not proceed:
+                    console.print("[red]Pipeline detenido por el usuario.[/red]")
+                    return
 
     console.print(Panel("[bold green]Pipeline completado![/bold green]", style="green"))
 
@@ -102,12 +134,14 @@ def campaign(
     brief: str = typer.Argument(help="Brief de la campaña (ej: 'campaña para restaurantes')"),
     platforms: str = typer.Option("instagram,tiktok,linkedin,youtube,facebook", help="Plataformas separadas por coma"),
     language: str = typer.Option("es,en", help="Idiomas: es, en, o es,en"),
+    force: bool = typer.Option(False, "--force", help=FORCE_HELP),
 ):
     """Lanzar una campaña completa a partir de un brief."""
     # Guardar brief en data/inputs/campaign_brief.json
-    project_root = get_project_root()
-    inputs_dir = project_root / "data" / "inputs"
+    inputs_dir = get_data_dir() / "inputs"
     inputs_dir.mkdir(parents=True, exist_ok=True)
+    run_id = new_run_id()
+    set_run_id(run_id)
 
     campaign_data = {
         "brief": brief,
@@ -115,81 +149,152 @@ def campaign(
         "language": [l.strip() for l in language.split(",")],
         "timestamp": datetime.now(timezone.utc).isoformat(),
         "status": "running",
+        "run_id": run_id,
     }
     save_json(campaign_data, inputs_dir / "campaign_brief.json")
 
     console.print(Panel(
         f"[bold]Campaña: {brief}[/bold]\n"
         f"Plataformas: {', '.join(campaign_data['platforms'])}\n"
-        f"Idiomas: {', '.join(campaign_data['language'])}",
+        f"Idiomas: {', '.join(campaign_data['language'])}\n"
+        f"Run: {run_id}",
         title="[bold blue]Nueva Campaña[/bold blue]",
         style="blue",
     ))
 
-    # Actualizar pipeline_state con info de campaña
-    outputs_dir = project_root / "data" / "outputs"
-    outputs_dir.mkdir(parents=True, exist_ok=True)
-    save_json({
+    record_event(run_id, "run_started", brief=brief, platforms=campaign_data["platforms"],
+                 language=campaign_data["language"])
+    _run_campaign_phases(campaign_data, force=force)
+
+
+def _run_campaign_phases(campaign_data: dict, progress: dict | None = None, force: bool = False) -> None:
+    """
+    Ejecuta las fases de la campaña registrando agentes y checkpoints en el journal
+    del run (utils.run_journal). Con `progress` (resume) saltea los agentes que ya
+    completaron en este run y los checkpoints ya aprobados; con `force` ejecuta
+    los agentes aunque sus inputs no hayan cambiado.
+    """
+    brief, run_id = campaign_data["brief"], campaign_data["run_id"]
+    inputs_dir = get_data_dir() / "inputs"
+
+    # Actualizar el estado del pipeline con info de campaña
+    set_state({
         "status": "running",
         "phase": 0,
         "campaign_brief": brief,
+        "run_id": run_id,
         "started_at": campaign_data["timestamp"],
-    }, outputs_dir / "pipeline_state.json")
-
-    # Ejecutar pipeline fase por fase
-    for phase_num in sorted(PHASES.keys()):
-        phase_info = PHASES[phase_num]
-        console.print(f"\n[bold blue]=== FASE {phase_num}: {phase_info['name']} ===[/bold blue]")
-
-        for agent_name in phase_info["agents"]:
-            _run_agent(agent_name)
-
-        # Actualizar estado
-        save_json({
-            "status": "running",
-            "phase": phase_num,
-            "phase_name": phase_info["name"],
-            "campaign_brief": brief,
-            "started_at": campaign_data["timestamp"],
-        }, outputs_dir / "pipeline_state.json")
-
-        if phase_info.get("checkpoint"):
-            console.print("[yellow]CHECKPOINT: Requiere aprobacion humana.[/yellow]")
-            console.print("[yellow]Revisa y aprueba en el dashboard: http://localhost:3000/approvals[/yellow]")
-            proceed = typer.confirm("¿Aprobar y continuar?")
-            if not proceed:
-                console.print("[red]Pipeline detenido por el usuario.[/red]")
-                campaign_data["status"] = "stopped"
-                save_json(campaign_data, inputs_dir / "campaign_brief.json")
-                save_json({
-                    "status": "stopped_by_user",
-                    "phase": phase_num,
-                    "campaign_brief": brief,
-                }, outputs_dir / "pipeline_state.json")
-                return
+    })
+
+    with span("pipeline", brief=brief[:200], resumed=progress is not None):
+        # Ejecutar pipeline fase por fase
+        for phase_num in sorted(PHASES.keys()):
+            phase_info = PHASES[phase_num]
+            console.print(f"\n[bold blue]=== FASE {phase_num}: {phase_info['name']} ===[/bold blue]")
+
+            with span(f"phase {phase_num}: {phase_info['name']}", phase=phase_num):
+                for agent_name in phase_info["agents"]:
+                    if agent_done(progress, agent_name):
+                        console.print(f"[dim]-- {agent_name} ya completado en {run_id}, se saltea[/dim]")
+                        continue
+                    _run_agent(agent_name, force)
+
+            # Actualizar estado
+            set_state({
+                "status": "running",
+                "phase": phase_num,
+                "phase_name": phase_info["name"],
+                "campaign_brief": brief,
+                "run_id": run_id,
+                "started_at": campaign_data["timestamp"],
+            })
+
+            if phase_info.get("checkpoint") and not (progress and phase_num in progress["approved"]):
+                console.print("[yellow]CHECKPOINT: Requiere aprobacion humana.[/yellow]")
+                console.print("[yellow]Revisa y aprueba en el dashboard: http://localhost:3000/approvals[/yellow]")
+                record_event(run_id, "checkpoint_waiting", phase=phase_num)
+                proceed = typer.confirm("¿Aprobar y continuar?")
+                if proceed:
+                    record_event(run_id, "checkpoint_approved", phase=phase_num)
+                else:
+                    console.print("[red]Pipeline detenido por el usuario.[/red]")
+                    campaign_data["status"] = "stopped"
+                    save_json(campaign_data, inputs_dir / "campaign_brief.json")
+                    set_state({
+                        "status": "stopped_by_user",
+                        "phase": phase_num,
+                        "campaign_brief": brief,
+                        "run_id": run_id,
+                    })
+                    return
 
     # Marcar como completado
+    record_event(run_id, "run_finished", status="completed")
     campaign_data["status"] = "completed"
     save_json(campaign_data, inputs_dir / "campaign_brief.json")
-    save_json({
+    set_state({
         "status": "completed",
         "phase": 7,
         "campaign_brief": brief,
+        "run_id": run_id,
         "started_at": campaign_data["timestamp"],
         "completed_at": datetime.now(timezone.utc).isoformat(),
-    }, outputs_dir / "pipeline_state.json")
+    })
 
     console.print(Panel("[bold green]Campaña completada![/bold green]", style="green"))
 
 
 @app.command()
-def agent(name: str = typer.Argument(help="Nombre del agente")):
+def resume(
+    run_id: str = typer.Argument(None, help="Run a retomar (default: el último sin terminar)"),
+    force: bool = typer.Option(False, "--force", help=FORCE_HELP),
+):
+    """Retomar una campaña interrumpida desde el primer agente incompleto."""
+    run_id = run_id or latest_resumable()
+    progress = load_progress(run_id) if run_id else None
+    if progress is None:
+        console.print("[yellow]No hay runs para retomar.[/yellow]")
+        raise typer.Exit(1)
+    if progress["finished"] == "completed":
+        console.print(f"[yellow]El run {run_id} ya terminó.[/yellow]")
+        raise typer.Exit(1)
+
+    set_run_id(run_id)
+    started = progress["started"]
+    campaign_data = {
+        "brief": started["brief"],
+        "platforms": started["platforms"],
+        "language": started["language"],
+        "timestamp": started["ts"],
+        "status": "running",
+        "run_id": run_id,
+    }
+    save_json(campaign_data, get_data_dir() / "inputs" / "campaign_brief.json")
+    done = [name for name in progress["completed"] if agent_done(progress, name)]
+    console.print(Panel(
+        f"[bold]Campaña: {started['brief']}[/bold]\n"
+        f"Run: {run_id}\n"
+        f"Completados: {', '.join(done) or '-'}",
+        title="[bold blue]Retomando Campaña[/bold blue]",
+        style="blue",
+    ))
+    _run_campaign_phases(campaign_data, progress, force)
+
+
+@app.command()
+def agent(
+    name: str = typer.Argument(help="Nombre del agente"),
+    force: bool = typer.Option(False, "--force", help=FORCE_HELP),
+):
     """Ejecutar un agente específico."""
-    _run_agent(name)
+    _run_agent(name, force)
 
 
 @app.command()
-def phase(number: int = typer.Argument(help="Número de fase (1-7)")):
+def phase(
+    number: int = typer.Argument(help="Número de fase (1-7)"),
+    force: bool = typer.Option(False, "--force", help=FORCE_HELP),
+):
     """Ejecutar una fase específica del pipeline."""
     if number not in PHASES:
         console.print(f"[red]Phase {number} not found. Available: 1-7[/red]")
@@ -197,16 +302,14 @@ def phase(number: int = typer.Argument(help="Número de fase (1-7)")):
     phase_info = PHASES[number]
     console.print(Panel(f"FASE {number}: {phase_info['name']}", style="bold blue"))
     for agent_name in phase_info["agents"]:
-        _run_agent(agent_name)
+        _run_agent(agent_name, force)
 
 
 @app.command()
 def status():
     """Ver estado del pipeline."""
-    from utils.helpers import get_project_root, load_json
-    state_path = get_project_root() / "data" / "outputs" / "pipeline_state.json"
-    if state_path.exists():
-        state = load_json(state_path)
+    if state_path().exists():
+        state = get_state()
         table = Table(title="Pipeline Status")
         table.add_column("Field", style="cyan")
         table.add_column("Value", style="green")
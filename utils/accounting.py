@@ -0,0 +1,215 @@
+"""
+Contabilidad de tokens, latencia y costo por turno de cada ejecución de agente.
+
+Cada `BaseAgent.run` abre un RunAccount que registra un record por turno
+(tokens de input/output/cache, modelo, latencia, stop_reason y la duración y
+tamaño de cada tool call). Al terminar, el record del agente se agrega como
+una línea a data/outputs/metrics/runs/<run_id>.jsonl.
+"""
+
+import json
+import threading
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+from utils.helpers import get_config, get_data_dir
+
+# USD por millón de tokens. Se pueden sobreescribir en config.yaml (accounting.pricing).
+DEFAULT_PRICING = {
+    "claude-opus": {"input": 15.00, "output": 75.00},
+    "claude-sonnet": {"input": 3.00, "output": 15.00},
+    "claude-haiku": {"input": 1.00, "output": 5.00},
+}
+CACHE_WRITE_MULTIPLIER = 1.25
+CACHE_READ_MULTIPLIER = 0.10
+BATCH_DISCOUNT = 0.50
+# Los tool handlers no lanzan excepciones: reportan errores con estos prefijos
+TOOL_ERROR_PREFIXES = ("Error", "Tool error", "Search error")
+
+_write_lock = threading.Lock()
+_pricing_cache: dict | None = None
+
+
+def metrics_dir() -> Path:
+    return get_data_dir() / "outputs" / "metrics" / "runs"
+
+
+def _pricing() -> dict:
+    global _pricing_cache
+    if _pricing_cache is None:
+        overrides = (get_config().get("accounting") or {}).get("pricing") or {}
+        _pricing_cache = {**DEFAULT_PRICING, **overrides}
+    return _pricing_cache
+
+
+def estimate_cost(model: str, usage: dict, batch: bool = False) -> float:
+    """Costo en USD de un turno según el prefijo de modelo más largo que coincida."""
+    pricing = _pricing()
+    prefixes = sorted((p for p in pricing if model.startswith(p)), key=len, reverse=True)
+    if not prefixes:
+        return 0.0
+    price = pricing[prefixes[0]]
+    cost = (
+        usage.get("input_tokens", 0) * price["input"]
+        + usage.get("cache_creation_input_tokens", 0) * price["input"] * CACHE_WRITE_MULTIPLIER
+        + usage.get("cache_read_input_tokens", 0) * price["input"] * CACHE_READ_MULTIPLIER
+        + usage.get("output_tokens", 0) * price["output"]
+    ) / 1_000_000
+    return round(cost * (BATCH_DISCOUNT if batch else 1.0), 6)
+
+
+def usage_to_dict(usage) -> dict:
+    """Normaliza response.usage del SDK (los campos de cache pueden venir en None)."""
+    return {
+        key: int(getattr(usage, key, 0) or 0)
+        for key in ("input_tokens", "output_tokens", "cache_creation_input_tokens", "cache_read_input_tokens")
+    }
+
+
+class RunAccount:
+    """Records por turno de una ejecución de agente. Thread-safe (los shards escriben en paralelo)."""
+
+    def __init__(self, agent: str, run_id: str, mode: str = "agentic"):
+        self.agent = agent
+        self.run_id = run_id
+        self.mode = mode
+        self.started_at = datetime.now(timezone.utc)
+        self._t0 = time.perf_counter()
+        self._lock = threading.Lock()
+        self.turns: list[dict] = []
+
+    def record_turn(self, response, model: str, latency_s: float | None, shard: int | None = None,
+                    batch: bool = False, escalated: bool = False) -> dict:
+        """
+        Registra un turno a partir de la respuesta de messages.create y retorna el record.
+        escalated: intento del modelo rápido descartado por el routing (sus tokens igual se pagan).
+        """
+        usage = usage_to_dict(getattr(response, "usage", None))
+        record = {
+            "model": model,
+            **usage,
+            "latency_ms": round(latency_s * 1000, 1) if latency_s is not None else None,
+            "stop_reason": getattr(response, "stop_reason", None),
+            "cost_usd": estimate_cost(model, usage, batch=batch),
+            "tools": [],
+        }
+        if shard is not None:
+            record["shard"] = shard
+        if batch:
+            record["batch"] = True
+        if escalated:
+            record["escalated"] = True
+        with self._lock:
+            record["turn"] = len(self.turns) + 1
+            self.turns.append(record)
+        return record
+
+    def record_tool(self, turn: dict, name: str, duration_s: float, result: str) -> None:
+        entry = {
+            "name": name,
+            "duration_ms": round(duration_s * 1000, 1),
+            "result_chars": len(result),
+            "error": result.startswith(TOOL_ERROR_PREFIXES),
+        }
+        with self._lock:
+            turn["tools"].append(entry)
+
+    def totals(self) -> dict:
+        with self._lock:
+            turns = list(self.turns)
+        totals = {
+            key: sum(t[key] for t in turns)
+            for key in ("input_tokens", "output_tokens", "cache_creation_input_tokens", "cache_read_input_tokens")
+        }
+        totals["turns"] = len(turns)
+        totals["cost_usd"] = round(sum(t["cost_usd"] for t in turns), 6)
+        totals["llm_ms"] = round(sum(t["latency_ms"] or 0 for t in turns), 1)
+        totals["tool_ms"] = round(sum(tool["duration_ms"] for t in turns for tool in t["tools"]), 1)
+        totals["tool_calls"] = sum(len(t["tools"]) for t in turns)
+        return totals
+
+    def finish(self, status: str = "completed", error: str | None = None) -> dict:
+        """Cierra el record del agente y lo persiste en el archivo del run."""
+        record = {
+            "run_id": self.run_id,
+            "agent": self.agent,
+            "mode": self.mode,
+            "status": status,
+            "started_at": self.started_at.isoformat(),
+            "finished_at": datetime.now(timezone.utc).isoformat(),
+            "duration_ms": round((time.perf_counter() - self._t0) * 1000, 1),
+            "totals": self.totals(),
+            "turns": self.turns,
+        }
+        if error:
+            record["error"] = error
+        path = metrics_dir() / f"{self.run_id}.jsonl"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        line = json.dumps(record, ensure_ascii=False, default=str)
+        with _write_lock, open(path, "a", encoding="utf-8") as f:
+            f.write(line + "\n")
+        return record
+
+
+# ── Agregación para /api/metrics/runs ─────────────────
+
+def load_run_records(run_id: str) -> list[dict]:
+    path = metrics_dir() / f"{run_id}.jsonl"
+    if not path.exists():
+        return []
+    with open(path, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def _sum_totals(records: list[dict]) -> dict:
+    keys = ("turns", "input_tokens", "output_tokens", "cache_creation_input_tokens",
+            "cache_read_input_tokens", "tool_calls", "llm_ms", "tool_ms")
+    totals = {key: sum(r["totals"].get(key, 0) for r in records) for key in keys}
+    totals["cost_usd"] = round(sum(r["totals"].get("cost_usd", 0) for r in records), 6)
+    totals["duration_ms"] = round(sum(r.get("duration_ms", 0) for r in records), 1)
+    return totals
+
+
+def summarize_run(run_id: str) -> dict | None:
+    """Totales del run, por agente y por tool (para ver quién domina tiempo y costo)."""
+    records = load_run_records(run_id)
+    if not records:
+        return None
+    by_agent: dict[str, list[dict]] = {}
+    tools: dict[str, dict] = {}
+    for record in records:
+        by_agent.setdefault(record["agent"], []).append(record)
+        for turn in record["turns"]:
+            for tool in turn["tools"]:
+                agg = tools.setdefault(tool["name"], {"calls": 0, "errors": 0, "duration_ms": 0.0, "result_chars": 0})
+                agg["calls"] += 1
+                agg["errors"] += int(tool["error"])
+                agg["duration_ms"] = round(agg["duration_ms"] + tool["duration_ms"], 1)
+                agg["result_chars"] += tool["result_chars"]
+    return {
+        "run_id": run_id,
+        "started_at": min(r["started_at"] for r in records),
+        "finished_at": max(r["finished_at"] for r in records),
+        "totals": _sum_totals(records),
+        "agents": {
+            agent: {**_sum_totals(recs), "runs": len(recs), "status": recs[-1]["status"]}
+            for agent, recs in by_agent.items()
+        },
+        "tools": dict(sorted(tools.items(), key=lambda kv: kv[1]["duration_ms"], reverse=True)),
+    }
+
+
+def list_runs(limit: int = 50) -> list[dict]:
+    """Resumen de los runs más recientes (sin el detalle por tool)."""
+    directory = metrics_dir()
+    if not directory.exists():
+        return []
+    files = sorted(directory.glob("*.jsonl"), key=lambda f: f.stat().st_mtime, reverse=True)[:limit]
+    runs = []
+    for f in files:
+        summary = summarize_run(f.stem)
+        if summary:
+            summary.pop("tools")
+            runs.append(summary)
+    return runs
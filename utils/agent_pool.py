@@ -0,0 +1,250 @@
+"""
+Pool de workers pre-forkeados para ejecutar agentes fuera del proceso del API.
+
+Los workers nacen de un fork server (multiprocessing "forkserver") que ya
+importó los módulos de los agentes, y al arrancar cada uno precarga configs,
+fonts y clientes (Anthropic, httpx, Replicate). Un worker conserva una
+instancia por agente entre jobs: el siguiente run del mismo agente solo
+refresca las configs si cambiaron en disco. Los workers loguean por las colas
+del logger del API (utils.logger.adopt_logger) y comparten con el API el estado
+de los limiters de proveedores (utils.limiter.adopt_limits) y los runs
+cancelados (utils.cancellation.adopt_cancellation). El trabajo
+de CPU (Pillow, JSON grandes) corre en el worker y no compite por el GIL con
+el event loop del API.
+
+Los jobs llegan por la cola local de ProcessPoolExecutor. El run id, el
+deadline y el span activo viajan con cada job (los spans del worker cuelgan del span del API en el
+mismo trace). Al terminar un job el worker devuelve sus métricas acumuladas y el
+API las suma a /metrics como un shard más por worker (utils.metrics.import_samples).
+
+Config (config.yaml → worker_pool): enabled, workers.
+Con el pool deshabilitado get_agent_pool() retorna None y el API corre los
+agentes en su propio proceso, como antes.
+"""
+
+import contextvars
+import importlib
+import multiprocessing
+import os
+import threading
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable
+
+from utils.cancellation import RunCancelled, RunTimeout, get_deadline, set_deadline
+from utils.helpers import get_config, get_project_root
+from utils.metrics import export_samples, import_samples
+from utils.run_context import get_run_id, set_run_id
+from utils.tracing import attach_parent, span_context
+
+DEFAULT_WORKERS = 2
+# Tamaños que usan los prompts de visual_designer y carousel_creator
+FONT_PRELOAD = tuple((weight, size) for weight in ("Bold", "Regular") for size in (28, 32, 36, 40, 48, 52, 56, 64, 72))
+_CONFIG_FILES = ("config.yaml", "brand.yaml", "platforms.yaml")
+
+
+class AgentJobError(RuntimeError):
+    """Un job falló dentro del worker; el traceback remoto queda en __cause__."""
+
+
+class _RemoteTraceback(Exception):
+    def __init__(self, tb: str):
+        self.tb = tb
+
+    def __str__(self) -> str:
+        return self.tb
+
+
+# ── Lado del worker ────────────────────────────────────
+
+_instances: dict[tuple[str, str], Any] = {}
+_configs: tuple[dict, dict, dict] | None = None
+_configs_stamp: tuple[int, ...] | None = None
+
+
+def _load_configs() -> tuple[dict, dict, dict]:
+    """(config, brand, platforms), releídos solo si algún YAML cambió desde el último job."""
+    global _configs, _configs_stamp
+    from utils.helpers import get_brand_config, get_platform_config
+
+    config_dir = get_project_root() / "config"
+    stamp = tuple(os.stat(config_dir / name).st_mtime_ns for name in _CONFIG_FILES)
+    if _configs is None or stamp != _configs_stamp:
+        _configs = (get_config(), get_brand_config(), get_platform_config())
+        _configs_stamp = stamp
+    return _configs
+
+
+def _init_worker(agents: tuple[tuple[str, str], ...], parent_logger, limits=None, cancelled=None) -> None:
+    """
+    Precarga de cada worker: logger, limiters y runs cancelados del API, configs, directorios de salida, fonts,
+    clientes y una instancia por agente. Todo es best-effort: si el initializer lanza,
+    el pool entero queda roto, así que los errores se imprimen y el job los verá al correr.
+    """
+    from utils.api_clients import get_http_client, get_replicate_client
+    from utils.helpers import ensure_output_dirs
+    from utils.image_text import _get_font
+    from utils.cancellation import adopt_cancellation
+    from utils.limiter import adopt_limits
+    from utils.logger import adopt_logger
+
+    adopt_logger(parent_logger)
+    adopt_limits(limits)
+    adopt_cancellation(cancelled)
+
+    warmups = [_load_configs, ensure_output_dirs, get_http_client, get_replicate_client]
+    warmups += [lambda weight=weight, size=size: _get_font(size, weight) for weight, size in FONT_PRELOAD]
+    warmups += [lambda agent=agent: _agent(*agent) for agent in agents]
+    for warmup in warmups:
+        try:
+            warmup()
+        except Exception:
+            traceback.print_exc()
+
+
+def _agent(module_path: str, class_name: str):
+    """Instancia del agente en este worker: se crea una vez y se reutiliza entre jobs."""
+    key = (module_path, class_name)
+    agent = _instances.get(key)
+    if agent is None:
+        agent = getattr(importlib.import_module(module_path), class_name)()
+        _instances[key] = agent
+    else:
+        agent.config, agent.brand, agent.platforms = _load_configs()
+    return agent
+
+
+def _run_job(fn: Callable, args: tuple, kwargs: dict, run_id: str | None, parent: tuple[str, str] | None,
+             deadline: float | None = None) -> dict:
+    """Corre fn en un contexto limpio con el run id, el deadline y el span padre del API; nunca lanza."""
+    def job():
+        if run_id:
+            set_run_id(run_id)
+        set_deadline(deadline)
+        attach_parent(parent)
+        return fn(*args, **kwargs)
+
+    outcome: dict[str, Any] = {"pid": os.getpid()}
+    try:
+        outcome["result"] = contextvars.Context().run(job)
+    except RunCancelled as e:
+        outcome["cancelled"] = {"timeout": isinstance(e, RunTimeout), "message": str(e)}
+    except Exception as e:
+        outcome["error"] = f"{type(e).__name__}: {e}"
+        outcome["traceback"] = traceback.format_exc()
+    outcome["metrics"] = export_samples()
+    return outcome
+
+
+def _run_agent(module_path: str, class_name: str, custom_prompt: str | None, force: bool = False,
+               regenerate: dict[str, str] | None = None) -> str:
+    return _agent(module_path, class_name).run(custom_prompt=custom_prompt, force=force, regenerate=regenerate)
+
+
+def _ping() -> int:
+    return os.getpid()
+
+
+# ── Lado del API ───────────────────────────────────────
+
+class AgentPool:
+    """
+    ProcessPoolExecutor sobre un fork server con los agentes ya importados.
+    `agents` son pares (módulo, clase) a precargar e instanciar en cada worker.
+    """
+
+    def __init__(self, workers: int = DEFAULT_WORKERS, agents: tuple[tuple[str, str], ...] = ()):
+        self.workers = max(1, workers)
+        self.agents = tuple(agents)
+        self._executor: ProcessPoolExecutor | None = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        from utils.cancellation import export_cancellation
+        from utils.limiter import export_limits
+        from utils.logger import export_logger
+
+        with self._lock:
+            if self._executor is None:
+                ctx = multiprocessing.get_context("forkserver")
+                # Solo tiene efecto antes de que arranque el fork server (una vez por proceso)
+                ctx.set_forkserver_preload(["agents.base", "utils.image_text", *(m for m, _ in self.agents)])
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers, mp_context=ctx,
+                    initializer=_init_worker,
+                    initargs=(self.agents, export_logger(), export_limits(), export_cancellation()),
+                )
+            return self._executor
+
+    def _reset(self, broken: ProcessPoolExecutor) -> None:
+        """Descarta un executor roto (un worker murió) para que el próximo job cree otro."""
+        with self._lock:
+            if self._executor is broken:
+                self._executor = None
+        broken.shutdown(wait=False, cancel_futures=True)
+
+    def warm(self) -> None:
+        """Arranca los workers ahora (en vez de en el primer job) y espera a que terminen su precarga."""
+        executor = self._get_executor()
+        for future in [executor.submit(_ping) for _ in range(self.workers)]:
+            future.result()
+
+    def call(self, fn: Callable, *args, **kwargs) -> Any:
+        """
+        Ejecuta fn (función de módulo, picklable) en un worker y espera el resultado.
+        Hereda el run id, el deadline y el span activo; las métricas del worker se
+        suman a las del API. Un run cancelado en el worker se relanza como RunCancelled / RunTimeout.
+        """
+        executor = self._get_executor()
+        try:
+            outcome = executor.submit(_run_job, fn, args, kwargs, get_run_id(), span_context(), get_deadline()).result()
+        except BrokenProcessPool:
+            self._reset(executor)
+            raise
+        import_samples(f"worker-{outcome['pid']}", outcome["metrics"])
+        if "cancelled" in outcome:
+            raise (RunTimeout if outcome["cancelled"]["timeout"] else RunCancelled)(outcome["cancelled"]["message"])
+        if "error" in outcome:
+            raise AgentJobError(outcome["error"]) from _RemoteTraceback(outcome["traceback"])
+        return outcome["result"]
+
+    def run_agent(self, module_path: str, class_name: str, custom_prompt: str | None = None,
+                  force: bool = False, regenerate: dict[str, str] | None = None) -> str:
+        """Equivalente a instanciar el agente y llamar a run(), en un worker con la instancia ya caliente."""
+        return self.call(_run_agent, module_path, class_name, custom_prompt, force, regenerate)
+
+    def shutdown(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+_pool: AgentPool | None = None
+_pool_enabled: bool | None = None
+_pool_lock = threading.Lock()
+
+
+def get_agent_pool(agents: tuple[tuple[str, str], ...] = ()) -> AgentPool | None:
+    """
+    Pool compartido del proceso, o None si worker_pool.enabled es false en config.yaml.
+    `agents` (pares módulo, clase) solo se usa al crear el pool.
+    """
+    global _pool, _pool_enabled
+    if _pool_enabled is None:
+        with _pool_lock:
+            if _pool_enabled is None:
+                settings = get_config().get("worker_pool") or {}
+                if settings.get("enabled", False):
+                    _pool = AgentPool(workers=int(settings.get("workers", DEFAULT_WORKERS)), agents=agents)
+                _pool_enabled = _pool is not None
+    return _pool
+
+
+def shutdown_agent_pool() -> None:
+    global _pool, _pool_enabled
+    with _pool_lock:
+        pool, _pool, _pool_enabled = _pool, None, None
+    if pool is not None:
+        pool.shutdown()
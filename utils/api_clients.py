@@ -1,21 +1,103 @@
 """
 Clientes de API centralizados para todos los agentes.
 Cada agente importa el cliente que necesita de aquí.
+
+Los SDKs (anthropic, replicate, httpx) y el cassette se importan en el primer
+uso: importar un agente no los paga, solo ejecutarlo.
 """
 
+import importlib
 import os
-from pathlib import Path
+import threading
+from typing import TYPE_CHECKING, Any
+
+from utils.cancellation import RunCancelled, interruptible_sleep, time_left
+from utils.helpers import load_env
 
-from dotenv import load_dotenv
+if TYPE_CHECKING:
+    import httpx
 
 # Cargar variables de entorno
-load_dotenv(Path(__file__).parent.parent / ".env")
+load_env()
+
+
+_http_client: "httpx.Client | None" = None
+_replicate_client = None
+_clients_lock = threading.Lock()
 
 
 def get_anthropic_client():
-    """Retorna cliente de Anthropic."""
+    """Retorna cliente de Anthropic (sobre el cassette activo si hay record/replay)."""
     import anthropic
-    return anthropic.Anthropic(api_key=os.getenv("ANTHROPIC_API_KEY"))
+    from utils.cassette import cassette_transport
+    # El SDK puede venir con su propio paquete HTTP compatible con httpx (p.ej. httpx2)
+    sdk_client = next(c for c in anthropic.DefaultHttpxClient.__mro__[1:] if c.__name__ == "Client")
+    transport = cassette_transport(importlib.import_module(sdk_client.__module__.partition(".")[0]))
+    # Sin reintentos del SDK: los hace utils.retry (backoff, retry-after y presupuesto por proveedor)
+    if transport is None:
+        return anthropic.Anthropic(api_key=os.getenv("ANTHROPIC_API_KEY"), max_retries=0)
+    replaying = transport.cassette.mode == "replay"
+    return anthropic.Anthropic(
+        api_key=os.getenv("ANTHROPIC_API_KEY") or ("replay" if replaying else None),
+        http_client=anthropic.DefaultHttpxClient(transport=transport),
+        max_retries=0,
+    )
+
+
+def get_http_client() -> "httpx.Client":
+    """
+    Cliente httpx compartido para las llamadas REST directas (Perplexity, Meta,
+    HeyGen, LinkedIn, descargas de Replicate). Reutiliza conexiones entre
+    llamadas y pasa por el cassette activo si hay record/replay.
+    """
+    global _http_client
+    if _http_client is None:
+        import httpx
+        from utils.cassette import cassette_transport
+        with _clients_lock:
+            if _http_client is None:
+                _http_client = httpx.Client(transport=cassette_transport(), follow_redirects=True)
+    return _http_client
+
+
+def get_replicate_client():
+    """Retorna cliente de Replicate (sobre el cassette activo si hay record/replay)."""
+    global _replicate_client
+    if _replicate_client is None:
+        import replicate
+        from utils.cassette import cassette_transport
+        with _clients_lock:
+            if _replicate_client is None:
+                transport = cassette_transport()
+                kwargs = {"transport": transport} if transport else {}
+                _replicate_client = replicate.Client(api_token=os.getenv("REPLICATE_API_TOKEN"), **kwargs)
+    return _replicate_client
+
+
+def run_replicate(ref: str, model_input: dict, wait_seconds: int = 5) -> Any:
+    """
+    Equivalente a replicate.run("owner/model") pero cancelable: el request espera
+    la predicción como mucho wait_seconds (Prefer: wait) y después se hace
+    polling con interruptible_sleep. Si el run se cancela o vence su deadline,
+    cancela la predicción en Replicate (deja de cobrarse) y relanza.
+    Retorna el output de la predicción (URL o lista de URLs).
+    """
+    from replicate.exceptions import ModelError
+
+    client = get_replicate_client()
+    owner, name = ref.split("/", 1)
+    wait = max(1, min(wait_seconds, int(time_left(wait_seconds))))
+    prediction = client.models.predictions.create(model=(owner, name), input=model_input, wait=wait)
+    try:
+        while prediction.status not in ("succeeded", "failed", "canceled"):
+            interruptible_sleep(client.poll_interval)
+            prediction.reload()
+    except RunCancelled:
+        prediction.cancel()
+        raise
+    if prediction.status != "succeeded":
+        raise ModelError(prediction)
+    return prediction.output
 
 
 def get_openai_client():
@@ -0,0 +1,165 @@
+"""
+Registro de decisiones de aprobación (dashboard → POST /api/approvals).
+
+Las decisiones viven en SQLite (data/outputs/approvals.db), en una tabla
+append-only: cada click inserta una fila y nunca se reescribe el historial, así
+guardar es O(1) y los clicks concurrentes no se pisan (SQLite serializa las
+escrituras). Índices por item, checkpoint y run: el historial de un item, la
+última decisión por item (latest_decisions) y los filtros del dashboard no
+recorren la tabla entera. record_decisions inserta muchas decisiones en una sola
+transacción (POST /api/approvals/bulk: aprobar el plan de una semana de una vez).
+
+La primera vez que se abre la base, las decisiones de un approvals.json previo
+se importan (el archivo queda como está).
+"""
+
+import sqlite3
+import threading
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any
+
+from utils.helpers import get_data_dir, load_json
+
+REJECTED_DECISIONS = ("rejected", "revision", "needs_revision")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS decisions (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    checkpoint TEXT NOT NULL,
+    item_id TEXT NOT NULL,
+    decision TEXT NOT NULL,
+    feedback TEXT NOT NULL DEFAULT '',
+    run_id TEXT,
+    timestamp TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_decisions_item ON decisions (item_id, checkpoint, id);
+CREATE INDEX IF NOT EXISTS idx_decisions_checkpoint ON decisions (checkpoint, id);
+CREATE INDEX IF NOT EXISTS idx_decisions_run ON decisions (run_id, id);
+"""
+_COLUMNS = ("checkpoint", "item_id", "decision", "feedback", "run_id", "timestamp")
+
+_local = threading.local()  # una conexión por thread y por base
+_init_lock = threading.Lock()
+
+
+def db_path() -> Path:
+    return get_data_dir() / "outputs" / "approvals.db"
+
+
+def _connect() -> sqlite3.Connection:
+    path = db_path()
+    connections = getattr(_local, "connections", None)
+    if connections is None:
+        connections = _local.connections = {}
+    conn = connections.get(path)
+    if conn is None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(path, timeout=10)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        with _init_lock:
+            conn.executescript(_SCHEMA)
+            if conn.execute("PRAGMA user_version").fetchone()[0] == 0:
+                _import_legacy(conn, path.with_name("approvals.json"))
+                conn.execute("PRAGMA user_version = 1")
+        connections[path] = conn
+    return conn
+
+
+def _import_legacy(conn: sqlite3.Connection, legacy: Path) -> None:
+    """Importa el historial de approvals.json (formato anterior) a la base nueva."""
+    if not legacy.exists():
+        return
+    try:
+        decisions = load_json(legacy).get("decisions", [])
+    except Exception:
+        return
+    with conn:
+        conn.executemany(
+            f"INSERT INTO decisions ({', '.join(_COLUMNS)}) VALUES (?, ?, ?, ?, ?, ?)",
+            [_row(d) for d in decisions if d.get("item_id")],
+        )
+
+
+def _row(decision: dict) -> tuple:
+    value = decision.get("decision") or decision.get("status") or "approved"
+    return (
+        decision.get("checkpoint", ""),
+        str(decision["item_id"]),
+        value,
+        decision.get("feedback") or "",
+        decision.get("run_id"),
+        decision.get("timestamp") or datetime.now(timezone.utc).isoformat(),
+    )
+
+
+def _as_dict(row: sqlite3.Row) -> dict[str, Any]:
+    # "status" es el alias que usa el frontend
+    return {**dict(row), "status": row["decision"]}
+
+
+# ── Escritura ──────────────────────────────────────────
+
+def record_decisions(decisions: list[dict]) -> list[int]:
+    """
+    Agrega decisiones (checkpoint, item_id, decision o status, feedback, run_id) en
+    una sola transacción y retorna sus ids.
+    """
+    conn = _connect()
+    ids = []
+    with conn:
+        for decision in decisions:
+            cursor = conn.execute(
+                f"INSERT INTO decisions ({', '.join(_COLUMNS)}) VALUES (?, ?, ?, ?, ?, ?)", _row(decision),
+            )
+            ids.append(cursor.lastrowid)
+    return ids
+
+
+# ── Consultas ──────────────────────────────────────────
+
+def _where(checkpoint: str | None, item_id: str | None, run_id: str | None) -> tuple[str, list]:
+    clauses, params = [], []
+    for column, value in (("checkpoint", checkpoint), ("item_id", item_id), ("run_id", run_id)):
+        if value:
+            clauses.append(f"{column} = ?")
+            params.append(value)
+    return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+
+def list_decisions(checkpoint: str | None = None, item_id: str | None = None, run_id: str | None = None,
+                   limit: int | None = None) -> list[dict]:
+    """Historial en orden de llegada, filtrado; con limit, las últimas `limit` decisiones."""
+    where, params = _where(checkpoint, item_id, run_id)
+    query = f"SELECT * FROM decisions{where} ORDER BY id"
+    if limit:
+        query = f"SELECT * FROM (SELECT * FROM decisions{where} ORDER BY id DESC LIMIT ?) ORDER BY id"
+        params.append(int(limit))
+    return [_as_dict(row) for row in _connect().execute(query, params)]
+
+
+def latest_decisions(checkpoint: str | None = None, run_id: str | None = None,
+                     item_id: str | None = None) -> list[dict]:
+    """La última decisión de cada (checkpoint, item_id), filtrada."""
+    where, params = _where(checkpoint, item_id, run_id)
+    query = (
+        f"SELECT * FROM decisions WHERE id IN "
+        f"(SELECT MAX(id) FROM decisions{where} GROUP BY checkpoint, item_id) ORDER BY id"
+    )
+    return [_as_dict(row) for row in _connect().execute(query, params)]
+
+
+def count_decisions() -> int:
+    return _connect().execute("SELECT COUNT(*) FROM decisions").fetchone()[0]
+
+
+def rejected_items(run_id: str | None = None) -> dict[str, str]:
+    """item_id → feedback de cada item (del run, si se da) cuya última decisión en cualquier checkpoint es un rechazo."""
+    latest: dict[str, dict] = {}
+    for decision in latest_decisions(run_id=run_id):
+        previous = latest.get(decision["item_id"])
+        if previous is None or decision["id"] > previous["id"]:
+            latest[decision["item_id"]] = decision
+    return {item_id: d["feedback"] for item_id, d in latest.items() if d["decision"] in REJECTED_DECISIONS}
@@ -0,0 +1,160 @@
+"""
+Cancelación cooperativa y deadlines de los runs.
+
+Un run se cancela por su run id (cancel_run, desde /api/pipeline/stop o
+/api/agents/{name}/stop) y cada agente corre con un deadline (BaseAgent.run:
+agents.<name>.timeout_seconds u orchestrator.timeout_seconds). El deadline vive
+en un ContextVar, así llega a los shards y al thread de tools (submit /
+start_thread copian el contexto) y viaja con cada job a los workers del pool.
+
+El código largo llama a check_cancelled() en sus puntos seguros (entre turnos,
+antes de cada tool, entre eventos del stream), espera con interruptible_sleep()
+(reintentos, polling) y acota los timeouts de red con time_left(). Todos lanzan
+RunCancelled, o RunTimeout si venció el deadline.
+
+RunCancelled hereda de BaseException, como asyncio.CancelledError: los
+`except Exception` que convierten errores de tools en texto para el modelo no
+la atrapan, así corta el agente entero.
+
+Los run ids cancelados se guardan en un ring: con el pool el API lo mueve a
+memoria compartida (export_cancellation) y los workers lo adoptan
+(adopt_cancellation), así un stop llega al worker que está corriendo el agente.
+"""
+
+import contextvars
+import hashlib
+import multiprocessing
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Iterator
+
+from utils.run_context import get_run_id
+
+POLL_SECONDS = 0.25  # cada cuánto interruptible_sleep revisa la cancelación
+RING_SIZE = 64       # runs cancelados recordados (los más viejos se pisan)
+
+
+class RunCancelled(BaseException):
+    """El run fue cancelado (stop del usuario); atraviesa los `except Exception`."""
+
+
+class RunTimeout(RunCancelled):
+    """Venció el deadline del run (timeout_seconds del agente)."""
+
+
+_deadline: contextvars.ContextVar[float | None] = contextvars.ContextVar("deadline", default=None)
+
+# ── Runs cancelados ────────────────────────────────────
+
+# [próxima posición, clave_0 … clave_{RING_SIZE-1}]; 0 = vacío
+_ring: Any = [0] * (RING_SIZE + 1)
+_ring_lock: Any = threading.Lock()
+
+
+def _key(run_id: str) -> int:
+    return int.from_bytes(hashlib.blake2b(run_id.encode(), digest_size=8).digest(), "big") | 1
+
+
+def cancel_run(run_id: str) -> None:
+    """Marca el run como cancelado; sus agentes paran en el próximo check_cancelled()."""
+    key = _key(run_id)
+    with _ring_lock:
+        if key in _ring[1:]:
+            return
+        position = int(_ring[0])
+        _ring[1 + position] = key
+        _ring[0] = (position + 1) % RING_SIZE
+
+
+def uncancel_run(run_id: str) -> None:
+    """Olvida la cancelación del run (al retomarlo con el mismo run id)."""
+    key = _key(run_id)
+    with _ring_lock:
+        for i in range(1, RING_SIZE + 1):
+            if _ring[i] == key:
+                _ring[i] = 0
+
+
+def is_cancelled(run_id: str | None = None) -> bool:
+    """¿Se canceló el run (por defecto, el run activo)?"""
+    run_id = run_id or get_run_id()
+    if not run_id:
+        return False
+    with _ring_lock:
+        keys = _ring[1:]
+    return _key(run_id) in keys
+
+
+def export_cancellation() -> Any:
+    """En el API, antes de crear los workers: mueve el ring a memoria compartida y lo retorna."""
+    global _ring, _ring_lock
+    with _ring_lock:
+        if not hasattr(_ring, "get_lock"):
+            ring = multiprocessing.get_context("forkserver").Array("Q", list(_ring))
+            _ring, _ring_lock = ring, ring.get_lock()
+        return _ring
+
+
+def adopt_cancellation(ring: Any) -> None:
+    """En un worker: usar el ring compartido del API (export_cancellation)."""
+    global _ring, _ring_lock
+    if ring is not None:
+        _ring, _ring_lock = ring, ring.get_lock()
+
+
+# ── Deadlines ──────────────────────────────────────────
+
+def get_deadline() -> float | None:
+    """Deadline activo (epoch, comparable entre procesos) o None."""
+    return _deadline.get()
+
+
+def set_deadline(value: float | None) -> contextvars.Token:
+    return _deadline.set(value)
+
+
+@contextmanager
+def deadline(seconds: float | None) -> Iterator[float | None]:
+    """Acota el contexto a `seconds` desde ahora (sin alargar un deadline anterior); None o 0 = sin límite propio."""
+    current = _deadline.get()
+    if seconds:
+        candidate = time.time() + float(seconds)
+        current = candidate if current is None else min(current, candidate)
+    token = _deadline.set(current)
+    try:
+        yield current
+    finally:
+        _deadline.reset(token)
+
+
+def check_cancelled() -> None:
+    """Lanza RunCancelled si el run activo fue cancelado, o RunTimeout si venció su deadline."""
+    run_id = get_run_id()
+    if run_id and is_cancelled(run_id):
+        raise RunCancelled(f"Run {run_id} stopped")
+    limit = _deadline.get()
+    if limit is not None and time.time() >= limit:
+        raise RunTimeout(f"Run {run_id or '-'} exceeded its deadline")
+
+
+def time_left(default: float) -> float:
+    """Timeout para una llamada de red: `default` acotado a lo que queda del deadline."""
+    check_cancelled()
+    limit = _deadline.get()
+    if limit is None:
+        return default
+    return max(min(default, limit - time.time()), 0.1)
+
+
+def interruptible_sleep(seconds: float) -> None:
+    """time.sleep que se corta (con RunCancelled / RunTimeout) si el run se cancela o vence el deadline."""
+    end = time.monotonic() + seconds
+    while True:
+        check_cancelled()
+        remaining = end - time.monotonic()
+        if remaining <= 0:
+            return
+        limit = _deadline.get()
+        until_deadline = POLL_SECONDS if limit is None else max(limit - time.time(), 0.0)
+        time.sleep(min(remaining, POLL_SECONDS, until_deadline))
@@ -0,0 +1,272 @@
+"""
+Cassettes de record/replay para las llamadas HTTP a proveedores externos.
+
+Un transport de httpx que se instala debajo del cliente de Anthropic, del
+cliente HTTP compartido (Perplexity, Meta, HeyGen, descargas) y del cliente de
+Replicate (ver utils/api_clients.py):
+  - record: hace la llamada real y agrega el par request/response (con su
+    duración) a data/cassettes/<nombre>.jsonl
+  - replay: responde desde el cassette sin tocar la red. Busca primero una
+    interacción con el mismo método, URL y body; si no hay, usa la siguiente
+    no consumida del mismo endpoint (los prompts con timestamps cambian entre
+    corridas). Con latency_factor > 0 reproduce los tiempos grabados.
+
+Se activa con configure() o con las variables de entorno CONTENT_ENGINE_CASSETTE,
+CONTENT_ENGINE_CASSETTE_MODE y CONTENT_ENGINE_CASSETTE_LATENCY.
+"""
+
+import base64
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import deque
+from pathlib import Path
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+import httpx
+
+from utils.helpers import get_data_dir
+
+ENV_NAME = "CONTENT_ENGINE_CASSETTE"
+ENV_MODE = "CONTENT_ENGINE_CASSETTE_MODE"
+ENV_LATENCY = "CONTENT_ENGINE_CASSETTE_LATENCY"
+MODES = ("off", "record", "replay")
+
+# Query params que nunca se graban (Meta usa access_token en la URL)
+_SECRET_PARAMS = {"access_token", "api_key", "key", "token"}
+# Headers de respuesta que dejan de aplicar porque guardamos el body ya decodificado
+_DROP_RESPONSE_HEADERS = {"content-encoding", "content-length", "transfer-encoding", "connection", "set-cookie"}
+_TEXT_TYPES = ("json", "text", "xml", "event-stream")
+
+
+class CassetteMiss(RuntimeError):
+    """No hay una interacción grabada para la request en modo replay."""
+
+
+def cassettes_dir() -> Path:
+    return get_data_dir() / "cassettes"
+
+
+def cassette_path(name: str) -> Path:
+    """Acepta un nombre ("bench_week") o una ruta a un .jsonl."""
+    path = Path(name)
+    if path.suffix == ".jsonl" or path.parent != Path("."):
+        return path
+    return cassettes_dir() / f"{name}.jsonl"
+
+
+def _redact_url(url: str) -> str:
+    parts = urlsplit(url)
+    query = [(k, "REDACTED" if k.lower() in _SECRET_PARAMS else v) for k, v in parse_qsl(parts.query, keep_blank_values=True)]
+    return urlunsplit((parts.scheme, parts.netloc, parts.path, urlencode(query), ""))
+
+
+def _endpoint(method: str, url: str) -> str:
+    parts = urlsplit(url)
+    return f"{method} {parts.scheme}://{parts.netloc}{parts.path}"
+
+
+def _body_hash(content: bytes) -> str:
+    """Hash del body; los JSON se canonizan (orden de claves) para que el match no dependa del serializador."""
+    try:
+        content = json.dumps(json.loads(content), sort_keys=True, ensure_ascii=False).encode("utf-8")
+    except (ValueError, UnicodeDecodeError):
+        pass
+    return hashlib.sha256(content).hexdigest()[:20]
+
+
+def _encode_body(content: bytes, content_type: str) -> dict:
+    if any(t in content_type for t in _TEXT_TYPES):
+        try:
+            return {"text": content.decode("utf-8")}
+        except UnicodeDecodeError:
+            pass
+    return {"base64": base64.b64encode(content).decode("ascii")}
+
+
+def _decode_body(body: dict) -> bytes:
+    if "text" in body:
+        return body["text"].encode("utf-8")
+    return base64.b64decode(body.get("base64", ""))
+
+
+class Cassette:
+    """Interacciones grabadas de un cassette. Thread-safe (los shards llaman en paralelo)."""
+
+    def __init__(self, path: Path, mode: str, latency_factor: float = 0.0, append: bool = False):
+        if mode not in ("record", "replay"):
+            raise ValueError(f"Invalid cassette mode: {mode}")
+        self.path = path
+        self.mode = mode
+        self.latency_factor = latency_factor
+        self._lock = threading.Lock()
+        self._by_body: dict[str, deque[dict]] = {}
+        self._by_endpoint: dict[str, deque[dict]] = {}
+        self.recorded = 0
+        self.replayed = 0
+        if mode == "record":
+            path.parent.mkdir(parents=True, exist_ok=True)
+            if not append:
+                path.write_text("", encoding="utf-8")
+        else:
+            if not path.exists():
+                raise FileNotFoundError(f"Cassette not found: {path}")
+            self._load()
+
+    def _load(self) -> None:
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                interaction = json.loads(line)
+                interaction["_used"] = False
+                req = interaction["request"]
+                self._by_body.setdefault(req["key"], deque()).append(interaction)
+                self._by_endpoint.setdefault(req["endpoint"], deque()).append(interaction)
+
+    def record(self, request: httpx.Request, response: httpx.Response, content: bytes, duration_s: float) -> None:
+        url = _redact_url(str(request.url))
+        interaction = {
+            "request": {
+                "method": request.method,
+                "url": url,
+                "endpoint": _endpoint(request.method, url),
+                "key": f"{request.method} {url} {_body_hash(request.content)}",
+                "body": _encode_body(request.content, request.headers.get("content-type", "")),
+            },
+            "response": {
+                "status_code": response.status_code,
+                "headers": {k: v for k, v in response.headers.items() if k.lower() not in _DROP_RESPONSE_HEADERS},
+                "body": _encode_body(content, response.headers.get("content-type", "")),
+            },
+            "duration_ms": round(duration_s * 1000, 1),
+        }
+        line = json.dumps(interaction, ensure_ascii=False)
+        with self._lock:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+            self.recorded += 1
+
+    def match(self, request: httpx.Request) -> dict:
+        url = _redact_url(str(request.url))
+        key = f"{request.method} {url} {_body_hash(request.content)}"
+        with self._lock:
+            for queue in (self._by_body.get(key), self._by_endpoint.get(_endpoint(request.method, url))):
+                while queue:
+                    interaction = queue.popleft()
+                    if not interaction["_used"]:
+                        interaction["_used"] = True
+                        self.replayed += 1
+                        return interaction
+        raise CassetteMiss(f"No recorded interaction for {request.method} {url} in {self.path.name}")
+
+
+class _CassetteTransportMixin:
+    """Transport que graba o reproduce según el modo del cassette (ver cassette_transport)."""
+
+    _http = httpx
+
+    def __init__(self, cassette: Cassette, wrapped=None):
+        self.cassette = cassette
+        self._wrapped = wrapped or self._http.HTTPTransport()
+
+    def handle_request(self, request):
+        request.read()
+        if self.cassette.mode == "replay":
+            interaction = self.cassette.match(request)
+            if self.cassette.latency_factor > 0:
+                time.sleep(interaction.get("duration_ms", 0) / 1000 * self.cassette.latency_factor)
+            recorded = interaction["response"]
+            return self._http.Response(
+                recorded["status_code"],
+                headers=recorded["headers"],
+                content=_decode_body(recorded["body"]),
+                request=request,
+            )
+
+        started = time.perf_counter()
+        response = self._wrapped.handle_request(request)
+        try:
+            content = response.read()
+        finally:
+            response.close()
+        self.cassette.record(request, response, content, time.perf_counter() - started)
+        headers = [(k, v) for k, v in response.headers.items() if k.lower() not in _DROP_RESPONSE_HEADERS]
+        return self._http.Response(response.status_code, headers=headers, content=content, request=request,
+                                   extensions={"http_version": response.extensions.get("http_version", b"HTTP/1.1")})
+
+    def close(self) -> None:
+        self._wrapped.close()
+
+
+class CassetteTransport(_CassetteTransportMixin, httpx.BaseTransport):
+    pass
+
+
+_transport_classes: dict[str, type] = {"httpx": CassetteTransport}
+
+
+def _transport_class(http_module) -> type:
+    """
+    CassetteTransport para un módulo compatible con httpx. Algunas versiones del
+    SDK de Anthropic usan su propio paquete (httpx2) y rechazan transports de httpx.
+    """
+    cls = _transport_classes.get(http_module.__name__)
+    if cls is None:
+        cls = type("CassetteTransport", (_CassetteTransportMixin, http_module.BaseTransport), {"_http": http_module})
+        _transport_classes[http_module.__name__] = cls
+    return cls
+
+
+# ── Cassette activo del proceso ───────────────────────
+
+_active: Cassette | None = None
+_active_lock = threading.Lock()
+
+
+def configure(mode: str, name: str | None = None, latency_factor: float = 0.0) -> Cassette | None:
+    """
+    Activa (o desactiva con mode="off") el cassette del proceso. También exporta
+    la configuración a variables de entorno para que la hereden los subprocesos.
+    Debe llamarse antes de crear los clientes de los agentes.
+    """
+    global _active
+    if mode not in MODES:
+        raise ValueError(f"Invalid cassette mode: {mode}. Use one of {', '.join(MODES)}")
+    with _active_lock:
+        if mode == "off":
+            _active = None
+            for var in (ENV_NAME, ENV_MODE, ENV_LATENCY):
+                os.environ.pop(var, None)
+            return None
+        if not name:
+            raise ValueError("A cassette name is required to record or replay")
+        _active = Cassette(cassette_path(name), mode, latency_factor)
+        os.environ[ENV_NAME] = str(_active.path)
+        os.environ[ENV_MODE] = mode
+        os.environ[ENV_LATENCY] = str(latency_factor)
+        return _active
+
+
+def active_cassette() -> Cassette | None:
+    """Cassette activo; si no se configuró en este proceso, lo toma de las variables de entorno."""
+    global _active
+    if _active is None and os.getenv(ENV_MODE, "off") in ("record", "replay") and os.getenv(ENV_NAME):
+        with _active_lock:
+            if _active is None:
+                # Un subproceso en modo record agrega al cassette del padre en lugar de truncarlo
+                _active = Cassette(
+                    cassette_path(os.environ[ENV_NAME]),
+                    os.environ[ENV_MODE],
+                    float(os.getenv(ENV_LATENCY, "0") or 0),
+                    append=True,
+                )
+    return _active
+
+
+def cassette_transport(http_module=httpx):
+    """Transport sobre el cassette activo para clientes de http_module, o None si no hay cassette."""
+    cassette = active_cassette()
+    return _transport_class(http_module)(cassette) if cassette else None
@@ -0,0 +1,185 @@
+"""
+Pre-screen determinístico de compliance para el Brand Guardian.
+
+Evalúa en una sola pasada las reglas mecánicas del brand kit sobre todas las
+piezas (longitud de caption, cantidad de hashtags, hashtags de marca, frases
+prohibidas y conteo de palabras) y clasifica cada pieza:
+  - "reject": viola un límite duro → se rechaza sin pasar por el LLM
+  - "pass":   cumple todas las reglas sin advertencias → se aprueba sin LLM
+  - "review": tiene advertencias → la evalúa el LLM
+"""
+
+import re
+
+from utils.helpers import get_slot_id
+
+HASHTAG_RE = re.compile(r"#\w+", re.UNICODE)
+
+# content_type → clave de copywriter.max_script_length
+SCRIPT_LENGTH_KEYS = {
+    "reel": "reel",
+    "tiktok_video": "tiktok",
+    "youtube_video": "youtube",
+    "youtube_short": "reel",
+    "linkedin_post": "linkedin",
+    "facebook_post": "linkedin",
+    "podcast_clip": "podcast",
+    "carousel": "carousel",
+}
+
+# Campos donde los agentes guardan el texto del guión
+_BODY_FIELDS = ("full_script", "script_body", "body", "script", "text")
+
+
+def _platform_limits(platforms: dict) -> dict[str, dict[str, int | None]]:
+    """
+    Límites más permisivos por plataforma a partir de platforms.yaml (caption y
+    hashtags), para piezas sin spec exacta. Solo cuentan los campos de caption:
+    max_length es el largo del cuerpo (LinkedIn article: 125000), salvo en
+    text_post, donde el texto del post es el caption.
+    """
+    limits = {}
+    for name, info in (platforms.get("platforms") or {}).items():
+        captions, hashtags = [], []
+        for spec_name, spec in (info.get("specs") or {}).items():
+            keys = ("max_caption_length", "max_text_length") + (("max_length",) if spec_name == "text_post" else ())
+            for key in keys:
+                if key in spec:
+                    captions.append(spec[key])
+            if "max_hashtags" in spec:
+                hashtags.append(spec["max_hashtags"])
+        limits[name] = {
+            "max_caption_length": max(captions) if captions else None,
+            "max_hashtags": max(hashtags) if hashtags else None,
+        }
+    return limits
+
+
+def _spec_for(platforms: dict, platform: str, content_type: str) -> dict:
+    """Spec de platforms.yaml para un content_type ("tiktok_video" → "video", "linkedin_post" → "text_post")."""
+    specs = ((platforms.get("platforms") or {}).get(platform) or {}).get("specs") or {}
+    for key in (content_type, content_type.removeprefix(f"{platform}_"), "text_post" if content_type.endswith("post") else ""):
+        if key in specs:
+            return specs[key]
+    return {}
+
+
+def _body_text(piece: dict) -> str:
+    for field in _BODY_FIELDS:
+        if isinstance(piece.get(field), str) and piece[field]:
+            return piece[field]
+    slides = piece.get("slides")
+    if isinstance(slides, list):
+        return " ".join(f"{s.get('headline', '')} {s.get('body', '')}" for s in slides if isinstance(s, dict))
+    return ""
+
+
+def _piece_hashtags(piece: dict, caption: str) -> list[str]:
+    """Hashtags de la pieza: los del caption más el set SEO adjunto (piece["seo"]["hashtags"])."""
+    tags = HASHTAG_RE.findall(caption)
+    seo_tags = (piece.get("seo") or {}).get("hashtags") or {}
+    if isinstance(seo_tags, dict):
+        for group in seo_tags.values():
+            if isinstance(group, list):
+                tags.extend(str(t) for t in group)
+    elif isinstance(seo_tags, list):
+        tags.extend(str(t) for t in seo_tags)
+    seen: dict[str, str] = {}
+    for tag in tags:
+        tag = tag if tag.startswith("#") else f"#{tag}"
+        seen.setdefault(tag.lower(), tag)
+    return list(seen.values())
+
+
+def prescreen_pieces(pieces: list[dict], config: dict, platforms: dict) -> list[dict]:
+    """
+    Evalúa todas las piezas contra las reglas mecánicas y retorna un resultado por pieza.
+
+    Args:
+        pieces: guiones del Copywriter (opcionalmente con su SEO en piece["seo"])
+        config: config.yaml completo
+        platforms: platforms.yaml completo
+
+    Returns:
+        Lista alineada con `pieces`: {slot_id, verdict, violations, warnings, metrics}
+    """
+    agents_cfg = config.get("agents") or {}
+    seo_cfg = agents_cfg.get("seo_hashtag_specialist") or {}
+    rules_cfg = (agents_cfg.get("brand_guardian") or {}).get("prescreen") or {}
+    script_limits = (agents_cfg.get("copywriter") or {}).get("max_script_length") or {}
+    hashtags_per_post = seo_cfg.get("hashtags_per_post") or {}
+    branded = {t.lower() for t in seo_cfg.get("branded_hashtags", [])} if seo_cfg.get("include_branded_hashtags") else set()
+    tolerance = float(rules_cfg.get("word_count_tolerance", 1.25))
+    banned = [p for p in rules_cfg.get("banned_phrases", []) if p]
+    banned_re = re.compile("|".join(re.escape(p) for p in banned), re.IGNORECASE) if banned else None
+    platform_limits = _platform_limits(platforms)
+
+    # Columnas: se extraen una vez y cada regla recorre todas las piezas
+    slot_ids = [get_slot_id(p) for p in pieces]
+    platform_col = [str(p.get("platform", "")).lower() for p in pieces]
+    type_col = [str(p.get("content_type", "")).lower() for p in pieces]
+    caption_col = [str(p.get("caption") or "") for p in pieces]
+    body_col = [_body_text(p) for p in pieces]
+    words_col = [len(body.split()) or int(p.get("word_count") or 0) for p, body in zip(pieces, body_col)]
+    tags_col = [_piece_hashtags(p, c) for p, c in zip(pieces, caption_col)]
+
+    violations: list[list[str]] = [[] for _ in pieces]
+    warnings: list[list[str]] = [[] for _ in pieces]
+
+    for i, (platform, content_type, caption) in enumerate(zip(platform_col, type_col, caption_col)):
+        spec = _spec_for(platforms, platform, content_type)
+        limits = platform_limits.get(platform, {})
+        max_caption = spec.get("max_caption_length") or spec.get("max_length") or spec.get("max_text_length") \
+            or limits.get("max_caption_length")
+        if not caption:
+            warnings[i].append("Missing caption")
+        elif max_caption and len(caption) > max_caption:
+            violations[i].append(f"Caption length {len(caption)} exceeds {platform} limit of {max_caption}")
+
+    for i, (platform, content_type, tags) in enumerate(zip(platform_col, type_col, tags_col)):
+        max_tags = _spec_for(platforms, platform, content_type).get("max_hashtags") \
+            or platform_limits.get(platform, {}).get("max_hashtags")
+        target = hashtags_per_post.get(platform)
+        if max_tags and len(tags) > max_tags:
+            violations[i].append(f"{len(tags)} hashtags exceed {platform} maximum of {max_tags}")
+        elif target and len(tags) > target:
+            warnings[i].append(f"{len(tags)} hashtags above the {target} recommended for {platform}")
+        if branded and not branded.intersection(t.lower() for t in tags):
+            warnings[i].append("No branded hashtag present")
+
+    if banned_re:
+        for i, (caption, body) in enumerate(zip(caption_col, body_col)):
+            found = {m.group(0).lower() for m in banned_re.finditer(f"{caption}\n{body}")}
+            if found:
+                violations[i].append(f"Banned phrases: {', '.join(sorted(found))}")
+
+    for i, (content_type, words) in enumerate(zip(type_col, words_col)):
+        limit = script_limits.get(SCRIPT_LENGTH_KEYS.get(content_type, ""))
+        if content_type == "carousel" and limit:
+            limit *= max(len(pieces[i].get("slides") or []), 1)
+        if limit and words > limit * tolerance:
+            violations[i].append(f"{words} words exceed the {content_type} limit of {limit}")
+        elif limit and words > limit:
+            warnings[i].append(f"{words} words above the {content_type} target of {limit}")
+
+    auto_pass = rules_cfg.get("auto_pass", True)
+    results = []
+    for i, slot_id in enumerate(slot_ids):
+        if violations[i]:
+            verdict = "reject"
+        elif warnings[i] or not auto_pass:
+            verdict = "review"
+        else:
+            verdict = "pass"
+        results.append({
+            "slot_id": slot_id,
+            "verdict": verdict,
+            "violations": violations[i],
+            "warnings": warnings[i],
+            "metrics": {
+                "caption_length": len(caption_col[i]),
+                "hashtags": len(tags_col[i]),
+                "word_count": words_col[i],
+            },
+        })
+    return results
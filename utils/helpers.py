@@ -3,13 +3,12 @@ Funciones de utilidad compartidas entre agentes.
 """
 
 import json
+import os
 import uuid
 from datetime import datetime
 from pathlib import Path
 from typing import Any
 
-import yaml
-
 
 def generate_id(prefix: str = "slot") -> str:
     """Genera un ID único para contenido."""
@@ -20,6 +19,7 @@ def generate_id(prefix: str = "slot") -> str:
 
 def load_yaml(file_path: str | Path) -> dict:
     """Carga un archivo YAML."""
+    import yaml  # diferido: CLI y API arrancan sin pagar el import de PyYAML
     with open(file_path, "r", encoding="utf-8") as f:
         return yaml.safe_load(f)
 
@@ -43,6 +43,30 @@ def get_project_root() -> Path:
     return Path(__file__).parent.parent
 
 
+_env_loaded = False
+
+
+def load_env() -> None:
+    """
+    Carga .env (override=True) una sola vez por proceso. Sin .env (contenedor con
+    variables de Easypanel) no importa python-dotenv.
+    """
+    global _env_loaded
+    if _env_loaded:
+        return
+    _env_loaded = True
+    env_path = get_project_root() / ".env"
+    if env_path.exists():
+        from dotenv import load_dotenv
+        load_dotenv(env_path, override=True)
+
+
+def get_data_dir() -> Path:
+    """Directorio de datos (inputs, outputs, brand assets). CONTENT_ENGINE_DATA_DIR lo redirige (p.ej. benchmarks)."""
+    override = os.getenv("CONTENT_ENGINE_DATA_DIR")
+    return Path(override) if override else get_project_root() / "data"
+
+
 def get_config() -> dict:
     """Carga la configuración principal."""
     config_path = get_project_root() / "config" / "config.yaml"
@@ -63,13 +87,13 @@ def get_platform_config() -> dict:
 
 def ensure_output_dirs() -> dict[str, Path]:
     """Crea y retorna los directorios de output."""
-    root = get_project_root()
+    data_dir = get_data_dir()
     dirs = {
-        "images": root / "data" / "outputs" / "images",
-        "videos": root / "data" / "outputs" / "videos",
-        "carousels": root / "data" / "outputs" / "carousels",
-        "scripts": root / "data" / "outputs" / "scripts",
-        "temp": root / "data" / "temp",
+        "images": data_dir / "outputs" / "images",
+        "videos": data_dir / "outputs" / "videos",
+        "carousels": data_dir / "outputs" / "carousels",
+        "scripts": data_dir / "outputs" / "scripts",
+        "temp": data_dir / "temp",
     }
     for d in dirs.values():
         d.mkdir(parents=True, exist_ok=True)
@@ -80,3 +104,67 @@ def timestamp_filename(agent_name: str, content_type: str, ext: str = "json") ->
     """Genera nombre de archivo con timestamp."""
     ts = datetime.now().strftime("%Y%m%d_%H%M%S")
     return f"{agent_name}_{ts}_{content_type}.{ext}"
+
+
+def get_slot_id(item: dict) -> str:
+    """Retorna el slot id de una pieza, tolerando las distintas claves que usan los agentes."""
+    for key in ("slot_id", "content_slot_id", "id"):
+        value = item.get(key)
+        if value:
+            return str(value)
+    return ""
+
+
+def extract_items(data: Any, paths: tuple[str, ...] | list[str]) -> list[dict]:
+    """
+    Extrae las piezas por slot de un output de agente.
+
+    Cada path es una ruta de listas separada por puntos: "daily_plans.content_slots"
+    recorre cada elemento de data["daily_plans"] y aplana su lista "content_slots".
+    Los resultados de todos los paths se concatenan en orden.
+    """
+    if not isinstance(data, dict):
+        return []
+    items: list[dict] = []
+    for path in paths:
+        level = [data]
+        for key in path.split("."):
+            next_level = []
+            for node in level:
+                value = node.get(key) if isinstance(node, dict) else None
+                if isinstance(value, list):
+                    next_level.extend(v for v in value if isinstance(v, dict))
+            level = next_level
+        items.extend(level)
+    return items
+
+
+def merge_slot_items(previous: dict, updates: dict, slot_ids: set[str]) -> dict:
+    """
+    Combina piezas regeneradas en un output de agente existente.
+
+    En cada lista de primer nivel, las piezas de `slot_ids` se reemplazan (en su
+    misma posición) por las que trae `updates`; las de otros slots quedan igual.
+    Las piezas nuevas de un slot que antes estaba en otra lista se agregan al
+    final. El resto de las claves (totales, resúmenes) se conserva de `previous`.
+    """
+    merged = dict(previous)
+    for key in list(previous) + [k for k in updates if k not in previous]:
+        old, new = previous.get(key), updates.get(key)
+        if not isinstance(new, list) and not isinstance(old, list):
+            continue
+        fresh: dict[str, list[dict]] = {}
+        for item in new if isinstance(new, list) else []:
+            if isinstance(item, dict) and get_slot_id(item) in slot_ids:
+                fresh.setdefault(get_slot_id(item), []).append(item)
+        result: list = []
+        for item in old if isinstance(old, list) else []:
+            slot_id = get_slot_id(item) if isinstance(item, dict) else ""
+            if slot_id not in slot_ids:
+                result.append(item)
+            elif slot_id in fresh:
+                result.extend(fresh.pop(slot_id))
+        for items in fresh.values():
+            result.extend(items)
+        merged[key] = result
+    return merged
@@ -10,6 +10,9 @@ from pathlib import Path
 
 from PIL import Image, ImageDraw, ImageFont
 
+from utils.helpers import get_data_dir
+from utils.metrics import IMAGE_RENDER_SECONDS, record_cache
+
 # Brand colors
 BRAND_BLUE = "#667eea"
 BRAND_PURPLE = "#764ba2"
@@ -26,10 +29,11 @@ def _get_font(size: int, weight: str = "Bold") -> ImageFont.FreeTypeFont:
     """Get Inter font at given size, with fallbacks."""
     key = (weight, size)
     if key in _FONT_CACHE:
+        record_cache("font", hit=True)
         return _FONT_CACHE[key]
+    record_cache("font", hit=False)
 
-    project_root = Path(__file__).parent.parent
-    fonts_dir = project_root / "data" / "brand_assets" / "fonts"
+    fonts_dir = get_data_dir() / "brand_assets" / "fonts"
 
     # Try Inter font files
     font_files = [
@@ -63,6 +67,7 @@ def _get_font(size: int, weight: str = "Bold") -> ImageFont.FreeTypeFont:
     return font
 
 
+@IMAGE_RENDER_SECONDS.labels(operation="text_overlay").time()
 def add_text_overlay(
     image_path: str | Path,
     texts: list[dict],
@@ -161,6 +166,7 @@ def add_text_overlay(
     return out
 
 
+@IMAGE_RENDER_SECONDS.labels(operation="brand_bar").time()
 def add_brand_bar(
     image_path: str | Path,
     logo_path: str | Path | None = None,
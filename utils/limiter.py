@@ -0,0 +1,318 @@
+"""
+Límite adaptativo de concurrencia y presupuesto de tokens por minuto por proveedor.
+
+Cada proveedor configurado (config.yaml → limits.providers) tiene:
+  - Un límite de requests en vuelo que se ajusta con AIMD: sube de a
+    1/limit por request exitoso (≈ +1 por "ronda") y se multiplica por
+    decrease_factor ante un 429/529 (utils.retry avisa con note_throttle) o
+    cuando la latencia por unidad de trabajo (segundo por token de output en
+    Anthropic) supera latency_tolerance veces su línea base. Las bajadas tienen
+    un cooldown: una ráfaga de 429 de requests ya en vuelo cuenta una sola vez.
+  - Buckets de tokens de input y de output por minuto (input_tpm, output_tpm).
+    Antes de cada request se reserva una estimación (input por tamaño del
+    request, output = max_tokens, igual que estima Anthropic) y al terminar se
+    ajusta con el usage real (Permit.settle): lo no usado vuelve al bucket.
+
+Se toma todo junto (slot + tokens) o nada, así un request que espera tokens no
+ocupa un slot. Con limits.shared el estado vive en memoria compartida: el API
+la crea (export_limits) y los workers de utils.agent_pool la adoptan
+(adopt_limits), así el presupuesto es uno solo para todos los procesos.
+"""
+
+import json
+import multiprocessing
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Iterator, TypeVar
+
+from utils.cancellation import check_cancelled
+from utils.helpers import get_config
+from utils.metrics import LIMITER_STATE, LIMITER_THROTTLES, LIMITER_WAIT_SECONDS
+
+DEFAULTS = {
+    "min_concurrency": 1,
+    "initial_concurrency": 4,
+    "max_concurrency": 16,
+    "decrease_factor": 0.5,
+    "cooldown_seconds": 5.0,
+    "latency_tolerance": 2.0,
+    "input_tpm": 0,   # 0 = sin presupuesto
+    "output_tpm": 0,
+}
+POLL_SECONDS = 0.02
+BASELINE_WEIGHT = 0.05  # EWMA lenta de la latencia por unidad
+
+T = TypeVar("T")
+
+# Posiciones en el estado (lista local o multiprocessing.Array)
+LIMIT, IN_FLIGHT, LAST_DECREASE, INPUT_TOKENS, OUTPUT_TOKENS, LAST_REFILL, BASELINE = range(7)
+_STATE_SIZE = 7
+
+
+def estimate_tokens(*parts: Any) -> int:
+    """Estimación rápida de tokens de un request (~3.5 caracteres por token en es/en)."""
+    return int(len(json.dumps(parts, ensure_ascii=False, default=str)) / 3.5) + 1
+
+
+class Permit:
+    """Slot y tokens tomados para un request; settle() ajusta la reserva con el usage real."""
+
+    def __init__(self, limiter: "ProviderLimiter", input_tokens: int, output_tokens: int):
+        self.limiter = limiter
+        self.input_tokens = input_tokens
+        self.output_tokens = output_tokens
+        self.units = 1.0
+        self.observe_latency = True
+        self._started = time.monotonic()
+
+    def settle(self, usage: Any = None, input_tokens: int | None = None, output_tokens: int | None = None,
+               observe_latency: bool = True) -> None:
+        """
+        Usage real (objeto usage del SDK o los conteos); la diferencia con la reserva
+        vuelve al bucket. observe_latency=False para respuestas cortadas (no son una
+        muestra de latencia por token).
+        """
+        self.observe_latency = observe_latency
+        if usage is not None:
+            input_tokens = int(getattr(usage, "input_tokens", 0) or 0) + int(
+                getattr(usage, "cache_creation_input_tokens", 0) or 0)
+            output_tokens = int(getattr(usage, "output_tokens", 0) or 0)
+        if input_tokens is None and output_tokens is None:
+            return
+        self.limiter._adjust_tokens(
+            self.input_tokens - (input_tokens if input_tokens is not None else self.input_tokens),
+            self.output_tokens - (output_tokens if output_tokens is not None else self.output_tokens),
+        )
+        self.input_tokens = input_tokens if input_tokens is not None else self.input_tokens
+        self.output_tokens = output_tokens if output_tokens is not None else self.output_tokens
+        self.units = max(float(output_tokens or 0), 1.0)
+
+    @property
+    def elapsed(self) -> float:
+        return time.monotonic() - self._started
+
+
+class ProviderLimiter:
+    """AIMD + buckets de tokens de un proveedor, sobre estado local o compartido entre procesos."""
+
+    def __init__(self, provider: str, settings: dict, state=None):
+        self.provider = provider
+        self.min = max(float(settings["min_concurrency"]), 1.0)
+        self.max = max(float(settings["max_concurrency"]), self.min)
+        self.decrease_factor = float(settings["decrease_factor"])
+        self.cooldown = float(settings["cooldown_seconds"])
+        self.latency_tolerance = float(settings["latency_tolerance"])
+        self.input_tpm = float(settings["input_tpm"])
+        self.output_tpm = float(settings["output_tpm"])
+        if state is None:
+            state = [0.0] * _STATE_SIZE
+            state[LIMIT] = min(max(float(settings["initial_concurrency"]), self.min), self.max)
+            state[INPUT_TOKENS], state[OUTPUT_TOKENS] = self.input_tpm, self.output_tpm
+            state[LAST_REFILL] = time.monotonic()
+        self._state = state
+        # multiprocessing.Array trae su propio lock (compartido); la lista local usa uno de threading
+        self._lock = state.get_lock() if hasattr(state, "get_lock") else threading.Lock()
+
+    # ── Estado (siempre bajo self._lock) ───────────────
+
+    def _refill(self, now: float) -> None:
+        s = self._state
+        elapsed = max(now - s[LAST_REFILL], 0.0)
+        s[LAST_REFILL] = now
+        if self.input_tpm:
+            s[INPUT_TOKENS] = min(self.input_tpm, s[INPUT_TOKENS] + elapsed * self.input_tpm / 60)
+        if self.output_tpm:
+            s[OUTPUT_TOKENS] = min(self.output_tpm, s[OUTPUT_TOKENS] + elapsed * self.output_tpm / 60)
+
+    def _try_acquire(self, input_tokens: int, output_tokens: int) -> bool:
+        s = self._state
+        self._refill(time.monotonic())
+        if s[IN_FLIGHT] >= int(s[LIMIT]):
+            return False
+        if self.input_tpm and s[INPUT_TOKENS] < input_tokens:
+            return False
+        if self.output_tpm and s[OUTPUT_TOKENS] < output_tokens:
+            return False
+        s[IN_FLIGHT] += 1
+        s[INPUT_TOKENS] -= input_tokens if self.input_tpm else 0
+        s[OUTPUT_TOKENS] -= output_tokens if self.output_tpm else 0
+        return True
+
+    def _decrease(self, now: float) -> bool:
+        s = self._state
+        if now - s[LAST_DECREASE] < self.cooldown:
+            return False
+        s[LIMIT] = max(self.min, s[LIMIT] * self.decrease_factor)
+        s[LAST_DECREASE] = now
+        return True
+
+    def _adjust_tokens(self, input_refund: float, output_refund: float) -> None:
+        with self._lock:
+            if self.input_tpm:
+                self._state[INPUT_TOKENS] = min(self.input_tpm, self._state[INPUT_TOKENS] + input_refund)
+            if self.output_tpm:
+                self._state[OUTPUT_TOKENS] = min(self.output_tpm, self._state[OUTPUT_TOKENS] + output_refund)
+
+    # ── API ────────────────────────────────────────────
+
+    @contextmanager
+    def acquire(self, input_tokens: int = 0, output_tokens: int = 0) -> Iterator[Permit]:
+        """Espera slot y tokens (las reservas mayores al presupuesto se recortan al máximo del bucket)."""
+        input_tokens = int(min(input_tokens, self.input_tpm) if self.input_tpm else 0)
+        output_tokens = int(min(output_tokens, self.output_tpm) if self.output_tpm else 0)
+        started = time.monotonic()
+        while True:
+            with self._lock:
+                if self._try_acquire(input_tokens, output_tokens):
+                    break
+            check_cancelled()
+            time.sleep(POLL_SECONDS)
+        LIMITER_WAIT_SECONDS.labels(provider=self.provider).observe(time.monotonic() - started)
+
+        permit = Permit(self, input_tokens, output_tokens)
+        failed = False
+        try:
+            yield permit
+        except BaseException:
+            failed = True
+            raise
+        finally:
+            self._release(permit, failed)
+
+    def _release(self, permit: Permit, failed: bool) -> None:
+        s = self._state
+        with self._lock:
+            s[IN_FLIGHT] = max(s[IN_FLIGHT] - 1, 0)
+            if failed or not permit.observe_latency:
+                return  # los 429/529 llegan por note_throttle; otros errores no dicen nada de la capacidad
+            per_unit = permit.elapsed / permit.units
+            baseline = s[BASELINE]
+            if baseline and per_unit > self.latency_tolerance * baseline:
+                if self._decrease(time.monotonic()):
+                    LIMITER_THROTTLES.labels(provider=self.provider, signal="latency").inc()
+            else:
+                s[LIMIT] = min(self.max, s[LIMIT] + 1 / max(s[LIMIT], 1.0))
+            s[BASELINE] = per_unit if not baseline else baseline + BASELINE_WEIGHT * (per_unit - baseline)
+
+    def note_throttle(self) -> None:
+        """El proveedor respondió 429/529: bajar la concurrencia (una vez por cooldown)."""
+        with self._lock:
+            if self._decrease(time.monotonic()):
+                LIMITER_THROTTLES.labels(provider=self.provider, signal="throttle").inc()
+
+    def snapshot(self) -> dict[str, float]:
+        with self._lock:
+            self._refill(time.monotonic())
+            s = list(self._state)
+        values = {"limit": s[LIMIT], "in_flight": s[IN_FLIGHT]}
+        if self.input_tpm:
+            values["input_tokens"] = s[INPUT_TOKENS]
+        if self.output_tpm:
+            values["output_tokens"] = s[OUTPUT_TOKENS]
+        return values
+
+
+# ── Registro del proceso ───────────────────────────────
+
+_limiters: dict[str, ProviderLimiter] = {}
+_loaded = False
+_registry_lock = threading.Lock()
+
+
+def _limit_settings() -> dict:
+    try:
+        return get_config().get("limits") or {}
+    except Exception:
+        return {}
+
+
+def _provider_settings(settings: dict) -> dict[str, dict]:
+    providers = settings.get("providers") or {}
+    return {name: {key: (cfg or {}).get(key, default) for key, default in DEFAULTS.items()}
+            for name, cfg in providers.items()}
+
+
+def _load(shared_states: dict | None = None) -> None:
+    global _loaded
+    providers = _provider_settings(_limit_settings())
+    for name, settings in providers.items():
+        _limiters[name] = ProviderLimiter(name, settings, (shared_states or {}).get(name))
+    _loaded = True
+
+
+def get_limiter(provider: str) -> ProviderLimiter | None:
+    """Limiter del proveedor, o None si no está en limits.providers."""
+    if not _loaded:
+        with _registry_lock:
+            if not _loaded:
+                _load()
+    return _limiters.get(provider)
+
+
+@contextmanager
+def acquire(provider: str, input_tokens: int = 0, output_tokens: int = 0) -> Iterator[Permit | None]:
+    """Slot (y tokens) del proveedor mientras dura el bloque; sin limiter configurado no espera (Permit None)."""
+    limiter = get_limiter(provider)
+    if limiter is None:
+        yield None
+        return
+    with limiter.acquire(input_tokens, output_tokens) as permit:
+        yield permit
+
+
+def limited(provider: str, fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """
+    fn(*args, **kwargs) con un slot del proveedor. Para usar como el callable de
+    utils.retry.call_with_retry: cada intento toma y suelta su slot, así el
+    backoff entre reintentos no lo retiene ni cuenta como latencia.
+    """
+    with acquire(provider):
+        return fn(*args, **kwargs)
+
+
+def note_throttle(provider: str) -> None:
+    limiter = get_limiter(provider)
+    if limiter is not None:
+        limiter.note_throttle()
+
+
+def export_limits() -> dict[str, Any] | None:
+    """
+    En el API, antes de crear los workers: mueve el estado de cada limiter a
+    memoria compartida y lo retorna para adopt_limits (None si limits.shared es false).
+    """
+    if not _limit_settings().get("shared", False):
+        return None
+    with _registry_lock:
+        if not _loaded:
+            _load()
+        ctx = multiprocessing.get_context("forkserver")
+        states = {}
+        for name, limiter in _limiters.items():
+            state = limiter._state
+            if not hasattr(state, "get_lock"):
+                with limiter._lock:
+                    state = ctx.Array("d", list(limiter._state))
+                limiter._state, limiter._lock = state, state.get_lock()
+            states[name] = state
+        return states
+
+
+def adopt_limits(states: dict[str, Any] | None) -> None:
+    """En un worker: usar el estado compartido del API (export_limits)."""
+    if states is None:
+        return
+    with _registry_lock:
+        _load(states)
+
+
+def _limiter_samples() -> dict[tuple[str, ...], float]:
+    samples = {}
+    for name, limiter in list(_limiters.items()):
+        for key, value in limiter.snapshot().items():
+            samples[(name, key)] = value
+    return samples
+
+
+LIMITER_STATE.set_function(_limiter_samples)
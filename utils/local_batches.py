@@ -0,0 +1,112 @@
+"""
+Stand-in local del endpoint de Message Batches de Anthropic.
+
+Implementa la misma interfaz que `client.messages.batches` (create, retrieve,
+results, cancel) ejecutando cada request con `messages.create` en un pool de
+threads. Se usa en tests y en entornos sin acceso a la Batches API
+(`batch.endpoint: "local"` en config.yaml).
+"""
+
+import itertools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from types import SimpleNamespace
+from typing import Callable, Iterator
+
+# Estado compartido entre instancias: simula un único endpoint por proceso. Un
+# batch se olvida cuando se leen sus resultados, o al terminar si se canceló.
+_BATCHES: dict[str, dict] = {}
+_BATCHES_LOCK = threading.Lock()
+_BATCH_IDS = itertools.count(1)
+
+
+class LocalBatches:
+    """Mismo contrato que anthropic.resources.messages.Batches, resuelto en local."""
+
+    def __init__(self, messages=None, responder: Callable[[dict], object] | None = None, max_workers: int = 4):
+        """
+        Args:
+            messages: recurso `client.messages` usado para ejecutar cada request.
+            responder: alternativa para tests; recibe los params y retorna un Message.
+            max_workers: requests ejecutados en paralelo.
+        """
+        if messages is None and responder is None:
+            raise ValueError("LocalBatches needs either a messages resource or a responder")
+        self._execute = responder or (lambda params: messages.create(**params))
+        self._max_workers = max_workers
+
+    def create(self, *, requests: list[dict], **_: object) -> SimpleNamespace:
+        batch_id = f"msgbatch_local_{next(_BATCH_IDS):06d}"
+        entry = {
+            "id": batch_id,
+            "created_at": datetime.now(timezone.utc),
+            "ended_at": None,
+            "results": {},
+            "pending": len(requests),
+            "canceled": False,
+            "order": [r["custom_id"] for r in requests],
+        }
+        with _BATCHES_LOCK:
+            _BATCHES[batch_id] = entry
+
+        pool = ThreadPoolExecutor(max_workers=self._max_workers, thread_name_prefix="local-batch")
+        for request in requests:
+            pool.submit(self._run_request, entry, request)
+        pool.shutdown(wait=False)
+        return self.retrieve(batch_id)
+
+    def _run_request(self, entry: dict, request: dict) -> None:
+        if entry["canceled"]:
+            result = SimpleNamespace(type="canceled")
+        else:
+            try:
+                result = SimpleNamespace(type="succeeded", message=self._execute(request["params"]))
+            except Exception as e:
+                result = SimpleNamespace(type="errored", error=SimpleNamespace(type="api_error", message=str(e)))
+        with _BATCHES_LOCK:
+            entry["results"][request["custom_id"]] = result
+            entry["pending"] -= 1
+            if entry["pending"] == 0:
+                entry["ended_at"] = datetime.now(timezone.utc)
+                if entry["canceled"]:
+                    _BATCHES.pop(entry["id"], None)
+
+    def retrieve(self, batch_id: str, **_: object) -> SimpleNamespace:
+        with _BATCHES_LOCK:
+            return self._snapshot(_BATCHES[batch_id])
+
+    @staticmethod
+    def _snapshot(entry: dict) -> SimpleNamespace:
+        counts = {"processing": entry["pending"], "succeeded": 0, "errored": 0, "canceled": 0, "expired": 0}
+        for result in entry["results"].values():
+            counts[result.type] += 1
+        return SimpleNamespace(
+            id=entry["id"],
+            type="message_batch",
+            processing_status="ended" if entry["pending"] == 0 else "in_progress",
+            request_counts=SimpleNamespace(**counts),
+            created_at=entry["created_at"],
+            ended_at=entry["ended_at"],
+        )
+
+    def results(self, batch_id: str, **_: object) -> Iterator[SimpleNamespace]:
+        """Resultados en el orden de las requests; el batch se olvida al leerlos (no se pueden pedir dos veces)."""
+        with _BATCHES_LOCK:
+            entry = _BATCHES[batch_id]
+            if entry["pending"]:
+                raise RuntimeError(f"Batch {batch_id} is still in progress")
+            items = [(cid, entry["results"][cid]) for cid in entry["order"]]
+            del _BATCHES[batch_id]
+        for custom_id, result in items:
+            yield SimpleNamespace(custom_id=custom_id, result=result)
+
+    def cancel(self, batch_id: str, **_: object) -> SimpleNamespace:
+        """Cancela las requests que no empezaron; el batch se olvida cuando terminan las que estaban corriendo."""
+        with _BATCHES_LOCK:
+            entry = _BATCHES[batch_id]
+            entry["canceled"] = True
+            snapshot = self._snapshot(entry)
+            if entry["pending"] == 0:
+                del _BATCHES[batch_id]
+        return snapshot
@@ -0,0 +1,161 @@
+"""
+Ring buffer en memoria con los últimos records de log estructurados, para
+GET /api/debug/logs (filtros, paginación y tail en streaming) sin entrar al
+contenedor a buscar en los archivos rotados.
+
+Cada record: seq (creciente), time, level, agent, run_id, message y, si el
+log los trae ligados (logger.bind), turn, shard, tool y duration_ms; el resto
+de los extras va en `fields`. Escribir es O(1) bajo un lock corto (seq y append
+juntos, para que seq quede en orden); leer copia el deque sin lock.
+
+Entradas: utils.logger agrega buffer_sink a loguru (con enqueue, así los records
+de los workers del pool llegan al buffer del API) y el API agrega
+LogBufferHandler a su logger de logging.
+"""
+
+import itertools
+import logging
+import threading
+import traceback
+from collections import deque
+from datetime import datetime, timezone
+from typing import Any
+
+from utils.run_context import get_run_id
+
+DEFAULT_CAPACITY = 5000
+LEVELS = {"TRACE": 5, "DEBUG": 10, "INFO": 20, "SUCCESS": 25, "WARNING": 30, "ERROR": 40, "CRITICAL": 50}
+FIELD_KEYS = ("turn", "shard", "tool", "duration_ms")
+
+
+def _plain(value: Any) -> Any:
+    return value if isinstance(value, (str, int, float, bool, type(None))) else str(value)
+
+
+class LogBuffer:
+    def __init__(self, capacity: int = DEFAULT_CAPACITY):
+        self._records: deque[dict] = deque(maxlen=capacity)
+        self._seq = itertools.count(1)
+        self._lock = threading.Lock()
+        self.last_seq = 0
+
+    @property
+    def capacity(self) -> int:
+        return self._records.maxlen or 0
+
+    def resize(self, capacity: int) -> None:
+        with self._lock:
+            if capacity != self.capacity:
+                self._records = deque(self._records, maxlen=max(capacity, 1))
+
+    def append(self, level: str, agent: str, run_id: str, message: str, extra: dict | None = None,
+               timestamp: datetime | None = None, exception: str | None = None) -> None:
+        extra = dict(extra or {})
+        record = {
+            "time": (timestamp or datetime.now(timezone.utc)).isoformat(),
+            "level": level,
+            "agent": agent or "-",
+            "run_id": run_id or "-",
+            "message": message,
+            **{key: _plain(extra.pop(key, None)) for key in FIELD_KEYS},
+            "fields": {k: _plain(v) for k, v in extra.items()},
+        }
+        if exception:
+            record["exception"] = exception
+        with self._lock:
+            record["seq"] = self.last_seq = next(self._seq)
+            self._records.append(record)
+
+    def query(self, run_id: str | None = None, agent: str | None = None, level: str | None = None,
+              q: str | None = None, before: int | None = None, after: int | None = None,
+              limit: int = 200) -> dict:
+        """
+        Records que pasan los filtros, en orden cronológico.
+        Sin `after`: la página más reciente antes de `before` (paginar hacia atrás con next_before).
+        Con `after`: los siguientes records después de ese seq (tail).
+        """
+        min_level = LEVELS.get((level or "").upper(), 0)
+        needle = (q or "").lower()
+
+        def matches(r: dict) -> bool:
+            return (
+                (not run_id or r["run_id"] == run_id)
+                and (not agent or r["agent"] == agent)
+                and LEVELS.get(r["level"], 0) >= min_level
+                and (not needle or needle in r["message"].lower())
+            )
+
+        records = list(self._records)
+        page: list[dict] = []
+        has_more = False
+        if after is not None:
+            for r in records:
+                if r["seq"] > after and matches(r):
+                    if len(page) == limit:
+                        has_more = True
+                        break
+                    page.append(r)
+        else:
+            for r in reversed(records):
+                if (before is None or r["seq"] < before) and matches(r):
+                    if len(page) == limit:
+                        has_more = True
+                        break
+                    page.append(r)
+            page.reverse()
+
+        return {
+            "records": page,
+            "count": len(page),
+            "has_more": has_more,
+            "next_before": page[0]["seq"] if page and has_more and after is None else None,
+            "next_after": page[-1]["seq"] if page else after,
+            "oldest_seq": records[0]["seq"] if records else None,
+            # del snapshot (no self.last_seq): un tail que avance hasta acá no saltea records
+            "last_seq": records[-1]["seq"] if records else self.last_seq,
+            "capacity": self.capacity,
+        }
+
+
+LOG_BUFFER = LogBuffer()
+
+
+def buffer_sink(message) -> None:
+    """Sink de loguru: agrega el record al buffer del proceso que escribe los sinks."""
+    record = message.record
+    extra = dict(record["extra"])
+    exception = None
+    if record["exception"] is not None:
+        exc = record["exception"]
+        exception = "".join(traceback.format_exception(exc.type, exc.value, exc.traceback))
+    LOG_BUFFER.append(
+        level=record["level"].name,
+        agent=extra.pop("agent", "-"),
+        run_id=extra.pop("run_id", "-"),
+        message=record["message"],
+        extra=extra,
+        timestamp=record["time"].astimezone(timezone.utc),
+        exception=exception,
+    )
+
+
+class LogBufferHandler(logging.Handler):
+    """Handler de logging (stdlib) hacia el buffer; el run id sale del contexto del thread que loguea."""
+
+    def __init__(self, agent: str = "api", level: int = logging.NOTSET):
+        super().__init__(level)
+        self.agent = agent
+
+    def emit(self, record: logging.LogRecord) -> None:
+        try:
+            exception = "".join(traceback.format_exception(*record.exc_info)) if record.exc_info else None
+            LOG_BUFFER.append(
+                level=record.levelname,
+                agent=self.agent,
+                run_id=get_run_id() or "-",
+                message=record.getMessage(),
+                timestamp=datetime.fromtimestamp(record.created, timezone.utc),
+                exception=exception,
+            )
+        except Exception:
+            self.handleError(record)
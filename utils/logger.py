@@ -1,66 +1,194 @@
 """
 Sistema de logging centralizado para el Content Engine.
 Usa loguru para logging estructurado con rotación de archivos.
+
+Los sinks se configuran una sola vez por proceso (consola, un archivo por
+agente, el archivo de errores y el ring buffer de utils.log_buffer), todos con enqueue=True: el thread que loguea
+solo encola el record y un thread por sink escribe a disco. El agente va
+ligado al logger de cada uno (bind) y el run id activo (utils.run_context) se
+agrega a cada record al loguear, así los agentes concurrentes no se pisan.
+
+Los workers de utils.agent_pool reciben el logger del API (export_logger /
+adopt_logger) y escriben por las mismas colas: un único proceso abre, rota y
+comprime cada archivo.
 """
 
+import multiprocessing
 import sys
+import threading
 from pathlib import Path
+from typing import TYPE_CHECKING
+
+from loguru import logger as _loguru_logger
 
-from loguru import logger
+from utils.log_buffer import DEFAULT_CAPACITY, LOG_BUFFER, buffer_sink
+from utils.run_context import get_run_id
+
+if TYPE_CHECKING:
+    from loguru import Logger
 
 # Directorio de logs
 LOG_DIR = Path(__file__).parent.parent / "logs"
 LOG_DIR.mkdir(exist_ok=True)
 
+FILE_FORMAT = "{time:YYYY-MM-DD HH:mm:ss} | {level: <8} | {extra[agent]} | {extra[run_id]} | {message}"
+CONSOLE_FORMAT = (
+    "<green>{time:YYYY-MM-DD HH:mm:ss}</green> | "
+    "<level>{level: <8}</level> | "
+    "<cyan>{extra[agent]}</cyan> | "
+    "<dim>{extra[run_id]}</dim> | "
+    "<level>{message}</level>"
+)
 
-def setup_logger(agent_name: str, log_level: str = "INFO") -> logger:
-    """
-    Configura logger para un agente específico.
+_logger = _loguru_logger
+_configured = False
+_adopted = False
+_agent_sinks: set[str] = set()
+_config_lock = threading.Lock()
 
-    Args:
-        agent_name: Nombre del agente (ej: "orchestrator", "trend_researcher")
-        log_level: Nivel de logging (DEBUG, INFO, WARNING, ERROR)
 
-    Returns:
-        Logger configurado
-    """
-    # Remover handlers por defecto
-    logger.remove()
-
-    # Handler de consola con formato bonito
-    logger.add(
-        sys.stderr,
-        level=log_level,
-        format=(
-            "<green>{time:YYYY-MM-DD HH:mm:ss}</green> | "
-            "<level>{level: <8}</level> | "
-            "<cyan>{extra[agent]}</cyan> | "
-            "<level>{message}</level>"
-        ),
-    )
+class _AgentFilter:
+    """Filtro del archivo de un agente (clase y no lambda: los handlers viajan pickleados a los workers)."""
+
+    def __init__(self, agent_name: str):
+        self.agent_name = agent_name
+
+    def __call__(self, record) -> bool:
+        return record["extra"].get("agent") == self.agent_name
 
-    # Handler de archivo con rotación diaria
-    logger.add(
+
+def _add_run_id(record) -> None:
+    """Patcher: corre en el thread que loguea, antes de encolar, así ve el run id de su contexto."""
+    if record["extra"].get("run_id") in (None, "-"):
+        record["extra"]["run_id"] = get_run_id() or "-"
+
+
+def _queue_context():
+    # Las colas de enqueue=True se comparten con los workers del fork server
+    if "forkserver" in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context("forkserver")
+    return None
+
+
+def _log_settings() -> dict:
+    from utils.helpers import get_config
+    try:
+        return get_config().get("logging") or {}
+    except Exception:
+        return {}
+
+
+def _log_level() -> str:
+    return str(_log_settings().get("level", "INFO")).upper()
+
+
+def _add_agent_sink(agent_name: str, level: str) -> None:
+    """Handler de archivo con rotación diaria para un agente."""
+    _logger.add(
         LOG_DIR / f"{agent_name}_{{time:YYYY-MM-DD}}.log",
-        level=log_level,
-        format="{time:YYYY-MM-DD HH:mm:ss} | {level: <8} | {extra[agent]} | {message}",
+        level=level,
+        format=FILE_FORMAT,
+        filter=_AgentFilter(agent_name),
         rotation="00:00",  # Rotar a medianoche
         retention="30 days",
         compression="zip",
+        delay=True,
+        enqueue=True,
+        context=_queue_context(),
     )
+    _agent_sinks.add(agent_name)
 
-    # Handler para errores en archivo separado
-    logger.add(
-        LOG_DIR / "errors_{time:YYYY-MM-DD}.log",
-        level="ERROR",
-        format="{time:YYYY-MM-DD HH:mm:ss} | {level: <8} | {extra[agent]} | {message}",
-        rotation="00:00",
-        retention="30 days",
-    )
 
-    return logger.bind(agent=agent_name)
+def configure_logging() -> None:
+    """
+    Configura los sinks globales una sola vez por proceso: consola, un archivo por
+    cada agente de config.yaml (más "pipeline") y el archivo de errores.
+    """
+    global _configured
+    if _configured:
+        return
+    with _config_lock:
+        if _configured:
+            return
+        from utils.helpers import get_config
+
+        level = _log_level()
+        try:
+            agent_names = list((get_config().get("agents") or {}).keys())
+        except Exception:
+            agent_names = []
+
+        # Remover el handler por defecto de loguru
+        _logger.remove()
+        _logger.configure(extra={"agent": "-", "run_id": "-"}, patcher=_add_run_id)
+
+        # Handler de consola con formato bonito
+        _logger.add(sys.stderr, level=level, format=CONSOLE_FORMAT, enqueue=True, context=_queue_context())
+
+        for agent_name in dict.fromkeys([*agent_names, "pipeline"]):
+            _add_agent_sink(agent_name, level)
 
+        # Ring buffer en memoria para /api/debug/logs (también recibe los records de los workers)
+        settings = _log_settings()
+        LOG_BUFFER.resize(int(settings.get("buffer_size", DEFAULT_CAPACITY)))
+        _logger.add(
+            buffer_sink,
+            level=str(settings.get("buffer_level", "DEBUG")).upper(),
+            format="{message}",
+            enqueue=True,
+            context=_queue_context(),
+        )
 
-def get_pipeline_logger() -> logger:
+        # Handler para errores en archivo separado
+        _logger.add(
+            LOG_DIR / "errors_{time:YYYY-MM-DD}.log",
+            level="ERROR",
+            format=FILE_FORMAT,
+            rotation="00:00",
+            retention="30 days",
+            delay=True,
+            enqueue=True,
+            context=_queue_context(),
+        )
+        _configured = True
+
+
+def setup_logger(agent_name: str) -> "Logger":
+    """
+    Logger para un agente específico. No toca los sinks de otros agentes: solo
+    la primera llamada del proceso configura los sinks globales.
+
+    Args:
+        agent_name: Nombre del agente (ej: "orchestrator", "trend_researcher")
+
+    Returns:
+        Logger ligado al agente
+    """
+    configure_logging()
+    if not _adopted and agent_name not in _agent_sinks:
+        with _config_lock:
+            if agent_name not in _agent_sinks:
+                _add_agent_sink(agent_name, _log_level())
+    return _logger.bind(agent=agent_name)
+
+
+def get_pipeline_logger() -> "Logger":
     """Logger específico para el pipeline/orchestrator."""
     return setup_logger("pipeline")
+
+
+def export_logger() -> "Logger":
+    """Logger configurado de este proceso, para pasarlo a un worker (ver adopt_logger)."""
+    configure_logging()
+    return _logger
+
+
+def adopt_logger(parent_logger: "Logger") -> None:
+    """
+    En un worker: usar el logger del proceso padre. Sus handlers encolan hacia los
+    threads del padre, que es el único que escribe los archivos; el worker no agrega sinks.
+    """
+    global _logger, _configured, _adopted
+    with _config_lock:
+        _logger = parent_logger
+        _configured = _adopted = True
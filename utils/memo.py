@@ -0,0 +1,138 @@
+"""
+Memoización de agentes por hash de sus inputs, como un build incremental.
+
+Antes de ejecutar, BaseAgent.run arma la huella (fingerprint) del run: sha256
+sobre el prompt del sistema, el prompt del usuario, el campaign brief, brand.yaml,
+platforms.yaml, la config del agente y de modelos, el modelo de generación, el
+modo de ejecución y el contenido del último output de cada agente upstream.
+Si un run anterior con la misma huella terminó bien y sus outputs siguen en
+disco, se reutiliza: se vuelven a marcar como los más recientes (para que los
+agentes downstream lean esos) y el agente retorna al instante. Como la huella
+de un agente incluye los outputs upstream, un agente reutilizado deja intacta la
+huella de los siguientes y la cadena entera se saltea mientras nada cambie.
+
+Las entradas viven en data/outputs/memo/<agente>.json (huella → outputs,
+resultado, run id). `force` en run() (y en el API / CLI) ignora la entrada pero
+registra la nueva. Una regeneración por slot (run con `regenerate`) registra
+el output combinado bajo la huella de sus inputs, así el próximo run no vuelve
+a las piezas rechazadas. config.yaml → memoization (enabled, max_age_hours,
+max_entries); agents.<name>.memoize: false o el atributo `memoize` de la clase
+lo apagan por agente (p.ej. los que publican o leen métricas en vivo).
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any
+
+from utils.helpers import get_config, get_data_dir, load_json
+
+DEFAULTS = {"enabled": True, "max_age_hours": 0, "max_entries": 20}  # max_age_hours 0 = sin vencimiento
+
+_digests: dict[tuple[str, int, int], str] = {}  # (path, mtime_ns, size) → sha256
+_write_lock = threading.Lock()
+
+
+def memo_settings(config: dict | None = None) -> dict:
+    """Sección memoization de config.yaml con sus defaults (config: la ya cargada, si la hay)."""
+    if config is None:
+        try:
+            config = get_config()
+        except Exception:
+            config = {}
+    settings = config.get("memoization") or {}
+    return {key: settings.get(key, default) for key, default in DEFAULTS.items()}
+
+
+def memo_path(agent_name: str) -> Path:
+    return get_data_dir() / "outputs" / "memo" / f"{agent_name}.json"
+
+
+# ── Huella ─────────────────────────────────────────────
+
+def file_digest(path: str | Path | None) -> str | None:
+    """sha256 del contenido de un archivo (None si no existe); se recalcula solo si cambió mtime o tamaño."""
+    if path is None:
+        return None
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    key = (str(path), stat.st_mtime_ns, stat.st_size)
+    digest = _digests.get(key)
+    if digest is None:
+        with open(path, "rb") as f:
+            digest = hashlib.file_digest(f, "sha256").hexdigest()
+        _digests[key] = digest
+    return digest
+
+
+def fingerprint(inputs: dict[str, Any]) -> str:
+    """sha256 de los inputs (JSON canónico: claves ordenadas)."""
+    payload = json.dumps(inputs, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+# ── Entradas ───────────────────────────────────────────
+
+def _load_entries(agent_name: str) -> dict[str, dict]:
+    path = memo_path(agent_name)
+    if not path.exists():
+        return {}
+    try:
+        return load_json(path)
+    except (OSError, json.JSONDecodeError):
+        return {}
+
+
+def lookup_memo(agent_name: str, key: str, max_age_hours: float = 0) -> dict | None:
+    """Entrada de un run anterior con esta huella, si no venció y sus outputs siguen en disco."""
+    entry = _load_entries(agent_name).get(key)
+    if entry is None:
+        return None
+    max_age = float(max_age_hours or 0)
+    if max_age and time.time() - entry["stored_at"] > max_age * 3600:
+        return None
+    if not entry["outputs"] or not all(Path(p).exists() for p in entry["outputs"]):
+        return None
+    return entry
+
+
+def store_memo(agent_name: str, key: str, outputs: list[str], result: str, run_id: str | None,
+               max_entries: int = DEFAULTS["max_entries"]) -> None:
+    """Registra el run terminado; se quedan las max_entries huellas más recientes del agente."""
+    if not outputs:
+        return  # sin outputs no hay nada que reutilizar
+    path = memo_path(agent_name)
+    with _write_lock:
+        entries = _load_entries(agent_name)
+        entries.pop(key, None)
+        entries[key] = {
+            "outputs": outputs,
+            "result": result,
+            "run_id": run_id,
+            "stored_at": time.time(),
+            "created": datetime.now(timezone.utc).isoformat(),
+        }
+        keep = max(int(max_entries), 1)
+        entries = dict(list(entries.items())[-keep:])
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Escritura atómica: los workers del pool pueden registrar a la vez
+        tmp = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        tmp.write_text(json.dumps(entries, ensure_ascii=False, indent=2), encoding="utf-8")
+        os.replace(tmp, path)
+
+
+def touch_outputs(paths: list[str]) -> None:
+    """
+    Marca los outputs reutilizados como los más recientes (sin output store,
+    latest_output_path ordena por mtime), conservando entre ellos el orden en
+    que se guardaron.
+    """
+    now = time.time_ns()
+    for i, p in enumerate(paths):
+        os.utime(p, ns=(now + i * 1000, now + i * 1000))
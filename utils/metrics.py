@@ -0,0 +1,391 @@
+"""
+Métricas en formato de exposición de Prometheus (text/plain; version=0.0.4).
+
+Sin dependencias externas y sin locks en el hot path: cada serie guarda un
+acumulador por thread (indexado por threading.get_ident()), de modo que un
+thread solo escribe su propia entrada y el scrape suma todas. El único lock
+se usa al crear una serie nueva (la primera vez que aparece un set de labels).
+
+Otros procesos (los workers de utils.agent_pool) exportan sus totales con
+export_samples(); el proceso del API los guarda con import_samples() como un
+shard más por worker, así /metrics suma los agentes que corren fuera del API.
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable
+
+from utils.tracing import span
+
+_get_ident = threading.get_ident
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+LONG_BUCKETS = (1.0, 5.0, 15.0, 30.0, 60.0, 120.0, 300.0, 600.0, 1200.0, 1800.0, 3600.0)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: tuple[str, ...], values: tuple[str, ...], extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class _CounterChild:
+    __slots__ = ("_shards",)
+
+    def __init__(self):
+        self._shards: dict[int, float] = {}
+
+    def inc(self, amount: float = 1.0) -> None:
+        tid = _get_ident()
+        self._shards[tid] = self._shards.get(tid, 0.0) + amount
+
+    def value(self) -> float:
+        return sum(list(self._shards.values()))
+
+    def totals(self) -> float:
+        return self.value()
+
+    def merge(self, source: str, totals: float) -> None:
+        """Reemplaza el shard de otro proceso (sus totales son acumulados, no deltas)."""
+        self._shards[source] = totals
+
+
+class _GaugeChild(_CounterChild):
+    """Gauge: usar set() o inc()/dec() en una misma serie, no ambos."""
+    __slots__ = ("_base",)
+
+    def __init__(self):
+        super().__init__()
+        self._base = 0.0
+
+    def dec(self, amount: float = 1.0) -> None:
+        self.inc(-amount)
+
+    def set(self, value: float) -> None:
+        self._base = value
+
+    def value(self) -> float:
+        return self._base + super().value()
+
+
+class _HistogramChild:
+    __slots__ = ("_buckets", "_shards")
+
+    def __init__(self, buckets: tuple[float, ...]):
+        self._buckets = buckets
+        # por thread: [count por bucket..., sum, count]
+        self._shards: dict[int, list[float]] = {}
+
+    def observe(self, value: float) -> None:
+        tid = _get_ident()
+        shard = self._shards.get(tid)
+        if shard is None:
+            shard = [0.0] * (len(self._buckets) + 2)
+            self._shards[tid] = shard
+        for i, bound in enumerate(self._buckets):
+            if value <= bound:
+                shard[i] += 1
+                break
+        shard[-2] += value
+        shard[-1] += 1
+
+    @contextmanager
+    def time(self):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started)
+
+    def totals(self) -> list[float]:
+        """[count por bucket..., sum, count] sumando todos los threads (sin acumular buckets)."""
+        totals = [0.0] * (len(self._buckets) + 2)
+        for shard in list(self._shards.values()):
+            for i, v in enumerate(shard):
+                totals[i] += v
+        return totals
+
+    def merge(self, source: str, totals: list[float]) -> None:
+        if len(totals) == len(self._buckets) + 2:
+            self._shards[source] = list(totals)
+
+    def snapshot(self) -> tuple[list[float], float, float]:
+        """(conteos acumulados por bucket, sum, count) sumando todos los threads."""
+        totals = self.totals()
+        cumulative, running = [], 0.0
+        for v in totals[:-2]:
+            running += v
+            cumulative.append(running)
+        return cumulative, totals[-2], totals[-1]
+
+
+class _Metric:
+    type_name = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: dict[tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+        if not self.labelnames:
+            self._default()  # las métricas sin labels se exponen desde el inicio (en 0)
+        REGISTRY.register(self)
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def labels(self, *values: str, **kwargs: str):
+        key = tuple(str(kwargs[n]) for n in self.labelnames) if kwargs else tuple(str(v) for v in values)
+        child = self._children.get(key)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(key, self._new_child())
+        return child
+
+    def _default(self):
+        return self.labels()
+
+    def samples(self) -> list[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+        lines.extend(self.samples())
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    type_name = "counter"
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def inc(self, amount: float = 1.0) -> None:
+        self._default().inc(amount)
+
+    def samples(self) -> list[str]:
+        return [
+            f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(child.value())}"
+            for key, child in list(self._children.items())
+        ]
+
+
+class Gauge(Counter):
+    type_name = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._function: Callable[[], dict[tuple[str, ...], float]] | None = None
+
+    def _new_child(self):
+        return _GaugeChild()
+
+    def dec(self, amount: float = 1.0) -> None:
+        self._default().dec(amount)
+
+    def set(self, value: float) -> None:
+        self._default().set(value)
+
+    def set_function(self, fn: Callable[[], dict[tuple[str, ...], float]]) -> None:
+        """Valor calculado en cada scrape: fn() retorna {label_values: valor}."""
+        self._function = fn
+
+    def samples(self) -> list[str]:
+        if self._function is None:
+            return super().samples()
+        return [
+            f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+            for key, value in self._function().items()
+        ]
+
+
+class Histogram(_Metric):
+    type_name = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = (),
+                 buckets: tuple[float, ...] = DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames)
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value: float) -> None:
+        self._default().observe(value)
+
+    def time(self):
+        return self._default().time()
+
+    def samples(self) -> list[str]:
+        lines = []
+        for key, child in list(self._children.items()):
+            cumulative, total, count = child.snapshot()
+            for bound, value in zip(self.buckets, cumulative):
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {_format_value(value)}")
+            inf = 'le="+Inf"'
+            lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, inf)} {_format_value(count)}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {_format_value(count)}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> None:
+        self._metrics[metric.name] = metric
+
+    def render(self) -> str:
+        return "\n".join(m.render() for m in list(self._metrics.values())) + "\n"
+
+
+REGISTRY = Registry()
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# ── Métricas del Content Engine ───────────────────────
+
+HTTP_REQUEST_SECONDS = Histogram(
+    "content_engine_http_request_duration_seconds", "API request latency by route",
+    ("method", "route", "status"),
+)
+AGENT_RUN_SECONDS = Histogram(
+    "content_engine_agent_run_duration_seconds", "Agent run duration",
+    ("agent", "mode", "status"), buckets=LONG_BUCKETS,
+)
+AGENT_TURNS = Counter("content_engine_agent_turns_total", "LLM turns executed by agent", ("agent",))
+MODEL_TURNS = Counter(
+    "content_engine_model_turns_total", "LLM calls by agent, model and route (fast, generation, escalated)",
+    ("agent", "model", "route"),
+)
+LLM_TOKENS = Counter("content_engine_llm_tokens_total", "LLM tokens by agent and type", ("agent", "type"))
+PROVIDER_REQUEST_SECONDS = Histogram(
+    "content_engine_provider_request_duration_seconds", "Latency of external provider calls",
+    ("provider", "operation"),
+)
+PROVIDER_ERRORS = Counter(
+    "content_engine_provider_errors_total", "Failed external provider calls", ("provider", "operation"),
+)
+PROVIDER_RETRIES = Counter(
+    "content_engine_provider_retries_total", "Provider calls retried, by status code or connection", ("provider", "reason"),
+)
+PROVIDER_RETRY_GIVEUPS = Counter(
+    "content_engine_provider_retry_giveups_total",
+    "Retryable provider errors not retried (attempts, budget or retry_after exhausted)", ("provider", "cause"),
+)
+PROVIDER_BACKOFF_SECONDS = Counter(
+    "content_engine_provider_backoff_seconds_total", "Time spent waiting between provider retries", ("provider",),
+)
+LIMITER_STATE = Gauge(
+    "content_engine_limiter_state",
+    "Adaptive provider limiter: concurrency limit, in-flight requests and tokens left in the minute buckets",
+    ("provider", "value"),
+)
+LIMITER_WAIT_SECONDS = Histogram(
+    "content_engine_limiter_wait_seconds", "Time waiting for a provider slot and token budget", ("provider",),
+)
+LIMITER_THROTTLES = Counter(
+    "content_engine_limiter_decreases_total", "Concurrency limit decreases by signal (throttle, latency)",
+    ("provider", "signal"),
+)
+TOOL_CALL_SECONDS = Histogram("content_engine_tool_call_duration_seconds", "Agent tool call latency", ("agent", "tool"))
+QUEUE_DEPTH = Gauge("content_engine_queue_depth", "Agent jobs waiting to start (shards, batch requests)")
+ACTIVE_RUNS = Gauge("content_engine_active_runs", "Agent runs in progress", ("agent",))
+IMAGE_RENDER_SECONDS = Histogram(
+    "content_engine_image_render_duration_seconds", "Local image rendering time", ("operation",),
+)
+CACHE_REQUESTS = Counter("content_engine_cache_requests_total", "Cache lookups by result", ("cache", "result"))
+CACHE_HIT_RATIO = Gauge("content_engine_cache_hit_ratio", "Cache hit ratio since process start", ("cache",))
+
+
+_TOKEN_TYPES = {
+    "input_tokens": "input",
+    "output_tokens": "output",
+    "cache_creation_input_tokens": "cache_write",
+    "cache_read_input_tokens": "cache_read",
+}
+
+
+def record_cache(cache: str, hit: bool) -> None:
+    CACHE_REQUESTS.labels(cache=cache, result="hit" if hit else "miss").inc()
+
+
+def record_llm_tokens(agent: str, usage: dict) -> None:
+    """Suma los tokens de un turno (record de RunAccount o usage_to_dict)."""
+    for key, token_type in _TOKEN_TYPES.items():
+        if usage.get(key):
+            LLM_TOKENS.labels(agent=agent, type=token_type).inc(usage[key])
+
+
+def _cache_hit_ratios() -> dict[tuple[str, ...], float]:
+    counts: dict[str, dict[str, float]] = {}
+    for (cache, result), child in list(CACHE_REQUESTS._children.items()):
+        counts.setdefault(cache, {})[result] = child.value()
+    ratios = {}
+    for cache, c in counts.items():
+        total = c.get("hit", 0.0) + c.get("miss", 0.0)
+        ratios[(cache,)] = c.get("hit", 0.0) / total if total else 0.0
+    # Prompt caching de Anthropic: proporción de tokens de input servidos desde cache
+    tokens: dict[str, float] = {}
+    for (_, token_type), child in list(LLM_TOKENS._children.items()):  # sumado sobre todos los agentes
+        tokens[token_type] = tokens.get(token_type, 0.0) + child.value()
+    cached = tokens.get("cache_read", 0.0)
+    prompt_total = cached + tokens.get("input", 0.0) + tokens.get("cache_write", 0.0)
+    if prompt_total:
+        ratios[("anthropic_prompt",)] = cached / prompt_total
+    return ratios
+
+
+CACHE_HIT_RATIO.set_function(_cache_hit_ratios)
+
+
+@contextmanager
+def track_provider(provider: str, operation: str = "request"):
+    """Mide la latencia de una llamada a un proveedor externo (con su span) y cuenta los errores; la excepción se propaga."""
+    started = time.perf_counter()
+    try:
+        with span(f"{provider} {operation}", kind="client", provider=provider):
+            yield
+    except BaseException:
+        PROVIDER_ERRORS.labels(provider=provider, operation=operation).inc()
+        raise
+    finally:
+        PROVIDER_REQUEST_SECONDS.labels(provider=provider, operation=operation).observe(time.perf_counter() - started)
+
+
+def render_metrics() -> str:
+    return REGISTRY.render()
+
+
+def export_samples() -> dict[str, list]:
+    """Totales de este proceso por métrica y labels, serializables (para import_samples en otro proceso)."""
+    exported = {}
+    for metric in list(REGISTRY._metrics.values()):
+        if getattr(metric, "_function", None) is not None:
+            continue  # calculadas en el scrape a partir de otras series
+        exported[metric.name] = [(key, child.totals()) for key, child in list(metric._children.items())]
+    return exported
+
+
+def import_samples(source: str, samples: dict[str, list]) -> None:
+    """Guarda los totales de otro proceso (`source`, p.ej. "worker-1234") como un shard de cada serie."""
+    for name, series in samples.items():
+        metric = REGISTRY._metrics.get(name)
+        if metric is None or getattr(metric, "_function", None) is not None:
+            continue
+        for key, totals in series:
+            metric.labels(*key).merge(source, totals)
@@ -0,0 +1,72 @@
+"""
+Routing de modelos por turno del agentic loop.
+
+Cada agente tiene un modelo de generación (agents.<name>.model en config.yaml,
+o el atributo `model` de la clase) y, con routing activo, un modelo rápido
+(agents.<name>.fast_model o models.fast). Los turnos de plomería (leer outputs y
+guidelines, consultas, tools de publicación) corren en el modelo rápido; cuando
+el modelo rápido intenta producir el entregable (llamar a una tool de
+generación como save_agent_output / submit_shard_result, o cerrar con texto sin
+haber generado nada) ese intento se descarta y el turno se repite con el modelo
+de generación. Si el turno escalado vuelve a generar, el siguiente arranca
+directo en el modelo de generación; al volver a la plomería, vuelve al rápido.
+
+Config (config.yaml):
+    models.fast / models.routing          → defaults
+    agents.<name>.model                   → modelo de generación del agente
+    agents.<name>.fast_model / .routing   → pisan los defaults
+    agents.<name>.generation_tools        → tools de generación extra
+"""
+
+from typing import Iterable
+
+
+class ModelRouter:
+    """Estado de routing de un agentic loop (uno por loop: los shards no comparten router)."""
+
+    def __init__(self, generation_model: str, fast_model: str | None = None, generation_tools: Iterable[str] = ()):
+        self.generation_model = generation_model
+        self.fast_model = fast_model or generation_model
+        self.generation_tools = frozenset(generation_tools)
+        self._generating = False
+        self._generated = False
+
+    @property
+    def enabled(self) -> bool:
+        return self.fast_model != self.generation_model
+
+    def route(self, model: str) -> str:
+        """Etiqueta del turno para métricas: fast o generation."""
+        return "fast" if self.enabled and model == self.fast_model else "generation"
+
+    def next_model(self) -> str:
+        """Modelo del próximo turno: el de generación si el anterior generó, si no el rápido."""
+        return self.generation_model if self._generating or not self.enabled else self.fast_model
+
+    def stop_tools(self, model: str) -> frozenset[str]:
+        """Tools que cortan el stream de un turno del modelo rápido (ese turno se va a escalar)."""
+        return self.generation_tools if self.route(model) == "fast" else frozenset()
+
+    def should_escalate(self, model: str, tool_names: list[str]) -> bool:
+        """¿Hay que repetir este turno del modelo rápido con el de generación?"""
+        if self.route(model) != "fast":
+            return False
+        if tool_names:
+            return any(name in self.generation_tools for name in tool_names)
+        return not self._generated
+
+    def record(self, tool_names: list[str]) -> None:
+        """Registra el turno aceptado: si generó, el siguiente arranca en el modelo de generación."""
+        self._generating = any(name in self.generation_tools for name in tool_names)
+        self._generated = self._generated or self._generating
+
+
+def build_router(config: dict, agent_name: str, default_model: str, generation_tools: Iterable[str] = ()) -> ModelRouter:
+    """Router de un agente según config.yaml (models.* y agents.<name>.*)."""
+    models = config.get("models") or {}
+    agent_cfg = (config.get("agents") or {}).get(agent_name) or {}
+    generation_model = agent_cfg.get("model") or default_model
+    routing = agent_cfg.get("routing", models.get("routing", False))
+    fast_model = (agent_cfg.get("fast_model") or models.get("fast")) if routing else None
+    tools = (*generation_tools, *(agent_cfg.get("generation_tools") or ()))
+    return ModelRouter(generation_model, fast_model, tools)
@@ -0,0 +1,309 @@
+"""
+Repositorio de outputs de agentes en SQLite (data/outputs/outputs.db).
+
+Los JSON en data/outputs/ siguen siendo el formato de intercambio entre agentes
+y quedan como export; con config.yaml → output_store.enabled, cada output que se
+guarda (save_agent_output / BaseAgent.save_output) se registra además acá:
+
+- outputs: una fila por archivo (agente, run, path, suffix, fecha, JSON
+  completo). `seq` marca cuál es el último de cada agente; sube al guardar y
+  al reutilizar un output memoizado (mark_latest), igual que el mtime de los
+  archivos. latest_output() / latest_output_file() lo leen sin listar ni
+  parsear el directorio; BaseAgent.load_latest_output y la tool
+  read_agent_output pasan por acá (el glob por mtime queda de fallback).
+- records: una fila por pieza de contenido (cada dict con slot_id dentro del
+  output), con plataforma, idioma, tipo de contenido y fecha (los que la pieza
+  no trae se heredan del mismo slot en outputs anteriores, p.ej. del plan),
+  indexada por run, agente, slot_id, plataforma y fecha. query_records()
+  responde cosas como "todos los guiones de TikTok en español del mes pasado"
+  con un SELECT.
+
+La primera vez que se abre la base se importan los outputs JSON que ya había
+en data/outputs/ (sin run id). Si el store falla, el agente sigue: los JSON
+son la fuente de verdad.
+"""
+
+import json
+import re
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Iterator
+
+from utils.helpers import get_config, get_data_dir, get_slot_id, load_json
+
+DEFAULTS = {"enabled": True}
+
+# <agente>_<YYYYmmdd_HHMMSS>_<suffix>.json (utils.helpers.timestamp_filename)
+OUTPUT_NAME = re.compile(r"^(?P<agent>.+?)_(?P<stamp>\d{8}_\d{6})_(?P<suffix>.+)\.json$")
+DATE_KEYS = ("date", "scheduled_date", "publish_date", "scheduled_time", "publish_time")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS outputs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    agent TEXT NOT NULL,
+    run_id TEXT,
+    path TEXT NOT NULL UNIQUE,
+    suffix TEXT NOT NULL DEFAULT '',
+    created TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_outputs_agent ON outputs (agent, seq);
+CREATE INDEX IF NOT EXISTS idx_outputs_run ON outputs (run_id);
+CREATE TABLE IF NOT EXISTS records (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    output_id INTEGER NOT NULL REFERENCES outputs (id) ON DELETE CASCADE,
+    agent TEXT NOT NULL,
+    run_id TEXT,
+    slot_id TEXT NOT NULL,
+    platform TEXT,
+    language TEXT,
+    content_type TEXT,
+    date TEXT,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_records_output ON records (output_id);
+CREATE INDEX IF NOT EXISTS idx_records_run ON records (run_id);
+CREATE INDEX IF NOT EXISTS idx_records_agent ON records (agent, date);
+CREATE INDEX IF NOT EXISTS idx_records_slot ON records (slot_id);
+CREATE INDEX IF NOT EXISTS idx_records_platform ON records (platform, date);
+CREATE INDEX IF NOT EXISTS idx_records_date ON records (date);
+"""
+
+_local = threading.local()  # una conexión por thread y por base
+_init_lock = threading.Lock()
+
+
+@lru_cache(maxsize=1)
+def _file_settings() -> dict:
+    try:
+        return get_config().get("output_store") or {}
+    except Exception:
+        return {}
+
+
+def store_settings(config: dict | None = None) -> dict:
+    """Sección output_store de config.yaml con sus defaults (config: la ya cargada, si la hay)."""
+    settings = _file_settings() if config is None else (config.get("output_store") or {})
+    return {key: settings.get(key, default) for key, default in DEFAULTS.items()}
+
+
+def store_enabled(config: dict | None = None) -> bool:
+    return bool(store_settings(config)["enabled"])
+
+
+def db_path() -> Path:
+    return get_data_dir() / "outputs" / "outputs.db"
+
+
+def _connect() -> sqlite3.Connection:
+    path = db_path()
+    connections = getattr(_local, "connections", None)
+    if connections is None:
+        connections = _local.connections = {}
+    conn = connections.get(path)
+    if conn is None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(path, timeout=10)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA foreign_keys=ON")
+        with _init_lock:
+            conn.executescript(_SCHEMA)
+            if conn.execute("PRAGMA user_version").fetchone()[0] == 0:
+                _import_existing(conn, path.parent)
+                conn.execute("PRAGMA user_version = 1")
+        connections[path] = conn
+    return conn
+
+
+def _import_existing(conn: sqlite3.Connection, outputs_dir: Path) -> None:
+    """Importa los outputs JSON que ya estaban en disco, del más viejo al más nuevo."""
+    files = [f for f in outputs_dir.glob("*.json") if OUTPUT_NAME.match(f.name)]
+    with _writing(conn):
+        for f in sorted(files, key=lambda f: f.stat().st_mtime):
+            try:
+                data = load_json(f)
+            except (OSError, json.JSONDecodeError):
+                continue
+            match = OUTPUT_NAME.match(f.name)
+            created = datetime.fromtimestamp(f.stat().st_mtime, timezone.utc).isoformat()
+            _insert(conn, match["agent"], f, data, None, created)
+
+
+# ── Piezas ─────────────────────────────────────────────
+
+def _date(value: Any) -> str | None:
+    """YYYY-MM-DD si el valor empieza con una fecha ISO."""
+    if isinstance(value, str) and re.match(r"\d{4}-\d{2}-\d{2}", value):
+        return value[:10]
+    return None
+
+
+def extract_records(data: Any, inherited_date: str | None = None) -> list[tuple[dict, str | None]]:
+    """
+    Piezas por slot de un output: cada dict con slot id (slot_id / content_slot_id)
+    en cualquier nivel, con la fecha propia o la del dict que lo contiene
+    (p.ej. daily_plans[].date para sus content_slots).
+    """
+    found: list[tuple[dict, str | None]] = []
+    if isinstance(data, dict):
+        own_date = next((d for d in (_date(data.get(k)) for k in DATE_KEYS) if d), None) or inherited_date
+        if data.get("slot_id") or data.get("content_slot_id"):
+            return [(data, own_date)]
+        for value in data.values():
+            found.extend(extract_records(value, own_date))
+    elif isinstance(data, list):
+        for value in data:
+            found.extend(extract_records(value, inherited_date))
+    return found
+
+
+def _text(value: Any) -> str | None:
+    if isinstance(value, list):
+        value = value[0] if len(value) == 1 else None
+    return str(value).lower() if value else None
+
+
+def _insert(conn: sqlite3.Connection, agent: str, path: Path, data: Any, run_id: str | None, created: str) -> int:
+    match = OUTPUT_NAME.match(path.name)
+    seq = conn.execute("SELECT COALESCE(MAX(seq), 0) + 1 FROM outputs").fetchone()[0]
+    conn.execute("DELETE FROM outputs WHERE path = ?", (str(path),))
+    output_id = conn.execute(
+        "INSERT INTO outputs (agent, run_id, path, suffix, created, seq, data) VALUES (?, ?, ?, ?, ?, ?, ?)",
+        (agent, run_id, str(path), match["suffix"] if match else "", created, seq,
+         json.dumps(data, ensure_ascii=False, default=str)),
+    ).lastrowid
+    rows = []
+    for item, date in extract_records(data):
+        slot_id = get_slot_id(item)
+        fields = [_text(item.get("platform")), _text(item.get("language")),
+                  _text(item.get("content_type") or item.get("format")), date]
+        if None in fields:
+            # Las piezas downstream (guiones, reviews) no repiten plataforma ni fecha: se heredan del slot
+            known = conn.execute(
+                "SELECT platform, language, content_type, date FROM records WHERE slot_id = ? "
+                "ORDER BY run_id IS ? DESC, id DESC LIMIT 1", (slot_id, run_id),
+            ).fetchone()
+            if known is not None:
+                fields = [value if value is not None else known[i] for i, value in enumerate(fields)]
+        rows.append((output_id, agent, run_id, slot_id, *fields[:3], fields[3] or created[:10],
+                     json.dumps(item, ensure_ascii=False, default=str)))
+    conn.executemany(
+        "INSERT INTO records (output_id, agent, run_id, slot_id, platform, language, content_type, date, data) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        rows,
+    )
+    return output_id
+
+
+# ── Escritura ──────────────────────────────────────────
+
+@contextmanager
+def _writing(conn: sqlite3.Connection) -> Iterator[sqlite3.Connection]:
+    """
+    Transacción con el lock de escritura tomado de entrada (BEGIN IMMEDIATE). El
+    API y los workers del pool escriben a la vez: así MAX(seq) se lee ya con el
+    lock y dos outputs no pueden quedar con el mismo seq.
+    """
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        yield conn
+    except BaseException:
+        conn.rollback()
+        raise
+    conn.commit()
+
+
+def store_output(agent: str, path: str | Path, data: Any, run_id: str | None = None) -> int:
+    """Registra un output guardado (y sus piezas); retorna su id. Es el último del agente."""
+    conn = _connect()
+    with _writing(conn):
+        return _insert(conn, agent, Path(path), data, run_id, datetime.now(timezone.utc).isoformat())
+
+
+def mark_latest(paths: list[str | Path]) -> None:
+    """Vuelve a marcar outputs ya registrados como los más recientes, en este orden (memoización)."""
+    conn = _connect()
+    with _writing(conn):
+        for p in paths:
+            conn.execute(
+                "UPDATE outputs SET seq = (SELECT COALESCE(MAX(seq), 0) + 1 FROM outputs) WHERE path = ?", (str(p),),
+            )
+
+
+def delete_output(path: str | Path) -> None:
+    """Olvida un output (y sus piezas), p.ej. el parcial de una regeneración."""
+    conn = _connect()
+    with _writing(conn):
+        conn.execute("DELETE FROM outputs WHERE path = ?", (str(path),))
+
+
+# ── Consultas ──────────────────────────────────────────
+
+def _latest_row(agent: str) -> sqlite3.Row | None:
+    rows = _connect().execute("SELECT path, data FROM outputs WHERE agent = ? ORDER BY seq DESC", (agent,))
+    return next((row for row in rows if Path(row["path"]).exists()), None)
+
+
+def latest_output(agent: str) -> dict | None:
+    """Contenido del último output del agente cuyo archivo sigue en disco (None si no hay registrado)."""
+    row = _latest_row(agent)
+    return json.loads(row["data"]) if row else None
+
+
+def latest_output_file(agent: str) -> Path | None:
+    """Archivo del último output del agente (el mismo que latest_output)."""
+    row = _latest_row(agent)
+    return Path(row["path"]) if row else None
+
+
+def list_outputs(agent: str | None = None, run_id: str | None = None, limit: int = 50) -> list[dict]:
+    """Outputs registrados (sin el contenido), del más reciente al más viejo."""
+    clauses, params = [], []
+    for column, value in (("agent", agent), ("run_id", run_id)):
+        if value:
+            clauses.append(f"{column} = ?")
+            params.append(value)
+    where = (" WHERE " + " AND ".join(clauses)) if clauses else ""
+    query = f"SELECT id, agent, run_id, path, suffix, created FROM outputs{where} ORDER BY seq DESC LIMIT ?"
+    return [dict(row) for row in _connect().execute(query, [*params, int(limit)])]
+
+
+def query_records(agent: str | None = None, run_id: str | None = None, slot_id: str | None = None,
+                  platform: str | None = None, language: str | None = None, content_type: str | None = None,
+                  date_from: str | None = None, date_to: str | None = None,
+                  limit: int = 100, offset: int = 0) -> tuple[list[dict], int]:
+    """
+    Piezas que cumplen los filtros (fechas YYYY-MM-DD inclusive), de la más
+    nueva a la más vieja, y el total sin paginar.
+    """
+    clauses, params = [], []
+    for column, value in (("agent", agent), ("run_id", run_id), ("slot_id", slot_id)):
+        if value:
+            clauses.append(f"{column} = ?")
+            params.append(value)
+    for column, value in (("platform", platform), ("language", language), ("content_type", content_type)):
+        if value:
+            clauses.append(f"{column} = ?")
+            params.append(value.lower())
+    if date_from:
+        clauses.append("date >= ?")
+        params.append(date_from[:10])
+    if date_to:
+        clauses.append("date <= ?")
+        params.append(date_to[:10])
+    where = (" WHERE " + " AND ".join(clauses)) if clauses else ""
+    conn = _connect()
+    total = conn.execute(f"SELECT COUNT(*) FROM records{where}", params).fetchone()[0]
+    rows = conn.execute(
+        f"SELECT * FROM records{where} ORDER BY date DESC, id DESC LIMIT ? OFFSET ?",
+        [*params, int(limit), int(offset)],
+    )
+    records = [{**dict(row), "data": json.loads(row["data"])} for row in rows]
+    return records, total
@@ -0,0 +1,176 @@
+"""
+Estado del pipeline (pipeline_state.json) en memoria, con snapshots a disco.
+
+El estado vive en memoria en el proceso que corre el pipeline (el API, o el
+CLI en `main.py campaign`): get_state() lo lee de ahí sin tocar el disco, y
+set_state() / update_state() lo cambian bajo un lock, así dos cambios
+concurrentes no se pisan (update_state fusiona sobre el estado actual, y con
+expect_status el cambio es un compare-and-set: aprobar un checkpoint solo si
+sigue esperando). wait_for_status() despierta apenas otro thread cambia el
+estado, sin polling al disco.
+
+Un único thread escritor baja cada versión nueva a disco (write-behind: si
+llegan varios cambios seguidos se escribe solo el último) con escritura
+atómica, archivo temporal + os.replace, así un lector de otro proceso nunca ve
+JSON a medio escribir. flush_state() espera el snapshot pendiente (se llama al
+apagar el API y al salir del proceso).
+
+El snapshot sigue siendo la vía entre procesos: `main.py status` lo lee, y si
+otro proceso lo reemplaza (una campaña por CLI mientras el dashboard mira el
+API) get_state() lo adopta cuando no hay cambios propios pendientes.
+"""
+
+import atexit
+import copy
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Iterable
+
+from utils.helpers import get_data_dir
+
+DEFAULT_STATE = {"status": "idle", "phase": 0}
+
+_cond = threading.Condition()
+_state: dict | None = None         # None = todavía no se cargó del snapshot
+_path: Path | None = None          # snapshot del que se cargó (cambia si cambia el data dir)
+_snapshot_id: tuple | None = None  # (mtime_ns, size) del snapshot que ya conocemos
+_version = 0                       # sube con cada cambio en memoria
+_written = 0                       # última versión bajada a disco
+_writer: threading.Thread | None = None
+_write_lock = threading.Lock()     # una sola escritura a disco a la vez
+
+
+def state_path() -> Path:
+    return get_data_dir() / "outputs" / "pipeline_state.json"
+
+
+def _stat_id(path: Path) -> tuple | None:
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+def _load_locked() -> dict:
+    """Estado actual; (re)carga el snapshot si es la primera vez o si otro proceso lo reemplazó."""
+    global _state, _path, _snapshot_id
+    path = state_path()
+    if _state is not None and path == _path and _written == _version:
+        current = _stat_id(path)
+        if current == _snapshot_id:
+            return _state
+        _state = None  # lo escribió otro proceso: adoptarlo
+    if _state is None or path != _path:
+        _path, _snapshot_id = path, _stat_id(path)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                _state = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            _state = dict(DEFAULT_STATE)
+    return _state
+
+
+# ── Lectura ────────────────────────────────────────────
+
+def get_state() -> dict:
+    """Copia del estado actual (desde memoria)."""
+    with _cond:
+        return copy.deepcopy(_load_locked())
+
+
+def wait_for_status(statuses: Iterable[str], timeout: float) -> dict:
+    """Espera hasta `timeout` segundos a que el status sea uno de `statuses`; retorna el estado en ese momento."""
+    wanted = set(statuses)
+    end = time.monotonic() + timeout
+    with _cond:
+        while _load_locked().get("status") not in wanted:
+            remaining = end - time.monotonic()
+            if remaining <= 0:
+                break
+            _cond.wait(remaining)
+        return copy.deepcopy(_state)
+
+
+# ── Escritura ──────────────────────────────────────────
+
+def _commit_locked(state: dict) -> dict:
+    global _state, _version
+    _state = state
+    _version += 1
+    _cond.notify_all()
+    _ensure_writer()
+    return copy.deepcopy(state)
+
+
+def set_state(state: dict) -> dict:
+    """Reemplaza el estado entero; retorna una copia."""
+    with _cond:
+        _load_locked()
+        return _commit_locked(copy.deepcopy(state))
+
+
+def update_state(updates: dict | None = None, *, expect_status: str | Iterable[str] | None = None,
+                 **fields: Any) -> dict | None:
+    """
+    Fusiona `updates` (y `fields`) sobre el estado actual y retorna una copia del
+    resultado. Con expect_status solo cambia si el status actual es ese (o uno de
+    esos); si no, no toca nada y retorna None.
+    """
+    with _cond:
+        current = _load_locked()
+        if expect_status is not None:
+            allowed = {expect_status} if isinstance(expect_status, str) else set(expect_status)
+            if current.get("status") not in allowed:
+                return None
+        return _commit_locked({**current, **copy.deepcopy(updates or {}), **copy.deepcopy(fields)})
+
+
+# ── Snapshots ──────────────────────────────────────────
+
+def _write_snapshot() -> None:
+    """Baja a disco la última versión, si hay una pendiente (temp + rename)."""
+    global _written, _snapshot_id
+    with _write_lock:
+        with _cond:
+            if _written >= _version or _path is None:
+                return
+            version, path = _version, _path
+            payload = json.dumps(_state, indent=2, ensure_ascii=False, default=str)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(f".{os.getpid()}.tmp")
+        tmp.write_text(payload, encoding="utf-8")
+        os.replace(tmp, path)
+        with _cond:
+            _written = version
+            _snapshot_id = _stat_id(path)
+            _cond.notify_all()
+
+
+def _writer_loop() -> None:
+    while True:
+        with _cond:
+            while _written >= _version:
+                _cond.wait()
+        try:
+            _write_snapshot()
+        except Exception:
+            time.sleep(0.5)  # disco lleno / permisos: reintentar con la próxima vuelta
+
+
+def _ensure_writer() -> None:
+    global _writer
+    if _writer is None or not _writer.is_alive():
+        _writer = threading.Thread(target=_writer_loop, name="pipeline-state-writer", daemon=True)
+        _writer.start()
+
+
+def flush_state() -> None:
+    """Baja a disco el snapshot pendiente antes de retornar."""
+    _write_snapshot()
+
+
+atexit.register(flush_state)
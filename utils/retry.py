@@ -0,0 +1,208 @@
+"""
+Reintentos con backoff para las llamadas a proveedores (Anthropic, Perplexity,
+Replicate, Meta, HeyGen).
+
+`call_with_retry(provider, operation, fn)` ejecuta fn() dentro de
+track_provider (un span y una latencia por intento) y reintenta los errores
+transitorios: 408/425/429/5xx/529 y errores de conexión o timeout. La espera es
+backoff exponencial con full jitter, o el `retry-after` / `retry-after-ms` que
+mande el proveedor (si pide más de max_retry_after_seconds no se reintenta).
+
+Cada proveedor tiene un presupuesto de reintentos en una ventana móvil: como
+mucho budget_ratio reintentos por request (con un mínimo de budget_min), así
+una caída del proveedor no multiplica la carga. Las llamadas no idempotentes
+(publicar un post, crear un video) solo se reintentan si el request seguro no
+se procesó: 429/503/529 o un error al conectar.
+
+Los 429/529 además bajan la concurrencia del proveedor (utils.limiter.note_throttle).
+
+Config (config.yaml → retries): defaults y retries.providers.<provider>.
+Métricas: content_engine_provider_retries_total, _retry_giveups_total y
+_backoff_seconds_total por proveedor.
+"""
+
+import random
+import threading
+import time
+from collections import deque
+from email.utils import parsedate_to_datetime
+from typing import Callable, TypeVar
+
+from utils.cancellation import interruptible_sleep
+from utils.helpers import get_config
+from utils.limiter import note_throttle
+from utils.metrics import PROVIDER_BACKOFF_SECONDS, PROVIDER_RETRIES, PROVIDER_RETRY_GIVEUPS, track_provider
+
+T = TypeVar("T")
+
+RETRYABLE_STATUS = frozenset({408, 425, 429, 500, 502, 503, 504, 529})
+# Estados que garantizan que el request no se procesó (seguros sin idempotencia)
+UNPROCESSED_STATUS = frozenset({429, 503, 529})
+# Rate limit / sobrecarga: señal para el limiter adaptativo (utils.limiter)
+THROTTLE_STATUS = frozenset({429, 529})
+_CONNECT_ERRORS = frozenset({"ConnectError", "ConnectTimeout", "PoolTimeout"})
+_TRANSPORT_ERRORS = _CONNECT_ERRORS | {"TransportError", "TimeoutException", "APIConnectionError", "APITimeoutError"}
+
+DEFAULTS = {
+    "max_attempts": 4,
+    "base_delay_seconds": 1.0,
+    "max_delay_seconds": 30.0,
+    "max_retry_after_seconds": 60.0,
+    "budget_ratio": 0.2,
+    "budget_min": 10,
+    "budget_window_seconds": 60.0,
+}
+
+
+class RetryPolicy:
+    """Política de un proveedor: intentos, backoff y presupuesto de reintentos (thread-safe)."""
+
+    def __init__(self, provider: str, settings: dict):
+        self.provider = provider
+        self.max_attempts = max(int(settings["max_attempts"]), 1)
+        self.base_delay = float(settings["base_delay_seconds"])
+        self.max_delay = float(settings["max_delay_seconds"])
+        self.max_retry_after = float(settings["max_retry_after_seconds"])
+        self.budget_ratio = float(settings["budget_ratio"])
+        self.budget_min = int(settings["budget_min"])
+        self.window = float(settings["budget_window_seconds"])
+        self._requests: deque[float] = deque()
+        self._retries: deque[float] = deque()
+        self._lock = threading.Lock()
+
+    def _trim(self, now: float) -> None:
+        for events in (self._requests, self._retries):
+            while events and now - events[0] > self.window:
+                events.popleft()
+
+    def record_request(self) -> None:
+        now = time.monotonic()
+        with self._lock:
+            self._trim(now)
+            self._requests.append(now)
+
+    def acquire_retry(self) -> bool:
+        """Consume un reintento del presupuesto de la ventana; False si se agotó."""
+        now = time.monotonic()
+        with self._lock:
+            self._trim(now)
+            if len(self._retries) >= max(self.budget_min, self.budget_ratio * len(self._requests)):
+                return False
+            self._retries.append(now)
+            return True
+
+    def backoff(self, attempt: int) -> float:
+        """Full jitter: uniforme entre 0 y base * 2^attempt (tope max_delay)."""
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+
+_policies: dict[str, RetryPolicy] = {}
+_policies_lock = threading.Lock()
+
+
+def get_policy(provider: str) -> RetryPolicy:
+    """Política del proveedor según config.yaml (retries + retries.providers.<provider>), una por proceso."""
+    policy = _policies.get(provider)
+    if policy is None:
+        with _policies_lock:
+            policy = _policies.get(provider)
+            if policy is None:
+                settings = get_config().get("retries") or {}
+                overrides = (settings.get("providers") or {}).get(provider) or {}
+                merged = {key: overrides.get(key, settings.get(key, default)) for key, default in DEFAULTS.items()}
+                policy = _policies[provider] = RetryPolicy(provider, merged)
+    return policy
+
+
+# ── Clasificación de errores ───────────────────────────
+
+def _status(exc: BaseException) -> int | None:
+    """Status HTTP del error: anthropic (status_code), replicate (status) o httpx (response.status_code)."""
+    for value in (getattr(exc, "status_code", None), getattr(exc, "status", None),
+                  getattr(getattr(exc, "response", None), "status_code", None)):
+        if isinstance(value, int):
+            return value
+    return None
+
+
+def _error_names(exc: BaseException) -> set[str]:
+    """Nombres de clase del error y de su causa (el SDK de Anthropic envuelve los errores de httpx)."""
+    names: set[str] = set()
+    while exc is not None and len(names) < 32:
+        names.update(cls.__name__ for cls in type(exc).__mro__)
+        exc = exc.__cause__
+    return names
+
+
+def is_retryable(exc: BaseException, idempotent: bool = True) -> bool:
+    status = _status(exc)
+    if status is not None:
+        return status in (RETRYABLE_STATUS if idempotent else UNPROCESSED_STATUS)
+    names = _error_names(exc)
+    return bool(names & (_TRANSPORT_ERRORS if idempotent else _CONNECT_ERRORS))
+
+
+def retry_after(exc: BaseException) -> float | None:
+    """Segundos pedidos por el proveedor (retry-after-ms, retry-after en segundos o fecha HTTP)."""
+    headers = getattr(getattr(exc, "response", None), "headers", None)
+    if not headers:
+        return None
+    try:
+        if headers.get("retry-after-ms"):
+            return float(headers["retry-after-ms"]) / 1000
+        value = headers.get("retry-after")
+        if not value:
+            return None
+        try:
+            return max(float(value), 0.0)
+        except ValueError:
+            return max(parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+
+def _reason(exc: BaseException) -> str:
+    status = _status(exc)
+    return str(status) if status is not None else "connection"
+
+
+# ── Llamadas ───────────────────────────────────────────
+
+def call_with_retry(provider: str, operation: str, fn: Callable[[], T], idempotent: bool = True,
+                    logger=None) -> T:
+    """
+    fn() con reintentos según la política del proveedor. Cada intento se mide con
+    track_provider; si se agotan los intentos o el presupuesto, propaga el último error.
+    """
+    policy = get_policy(provider)
+    policy.record_request()
+    attempt = 0
+    while True:
+        try:
+            with track_provider(provider, operation):
+                return fn()
+        except Exception as e:
+            if _status(e) in THROTTLE_STATUS:
+                note_throttle(provider)  # el limiter baja la concurrencia aunque no se reintente
+            if not is_retryable(e, idempotent):
+                raise
+            attempt += 1
+            if attempt >= policy.max_attempts:
+                PROVIDER_RETRY_GIVEUPS.labels(provider=provider, cause="attempts").inc()
+                raise
+            requested = retry_after(e)
+            if requested is not None and requested > policy.max_retry_after:
+                PROVIDER_RETRY_GIVEUPS.labels(provider=provider, cause="retry_after").inc()
+                raise
+            if not policy.acquire_retry():
+                PROVIDER_RETRY_GIVEUPS.labels(provider=provider, cause="budget").inc()
+                raise
+            delay = requested if requested is not None else policy.backoff(attempt - 1)
+            PROVIDER_RETRIES.labels(provider=provider, reason=_reason(e)).inc()
+            PROVIDER_BACKOFF_SECONDS.labels(provider=provider).inc(delay)
+            if logger is not None:
+                logger.warning(
+                    f"{provider} {operation} failed ({_reason(e)}: {str(e)[:200]}), "
+                    f"retry {attempt}/{policy.max_attempts - 1} in {delay:.1f}s"
+                )
+            interruptible_sleep(delay)  # un stop o el deadline del run cortan la espera
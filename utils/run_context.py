@@ -0,0 +1,52 @@
+"""
+Contexto de ejecución compartido por el pipeline y los agentes.
+
+El run id identifica una ejecución completa (una campaña, un pipeline o un
+agente lanzado individualmente). Vive en un ContextVar para que cada thread
+del API tenga el suyo; los threads y pools que lanza un run deben copiar el
+contexto (`start_thread` / `submit`) para heredarlo.
+"""
+
+import contextvars
+import threading
+import uuid
+from concurrent.futures import Executor, Future
+from datetime import datetime
+
+_run_id: contextvars.ContextVar[str | None] = contextvars.ContextVar("run_id", default=None)
+
+
+def new_run_id() -> str:
+    """Genera un run id ordenable por fecha: run_20260216_103000_ab12cd."""
+    return f"run_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:6]}"
+
+
+def get_run_id() -> str | None:
+    return _run_id.get()
+
+
+def set_run_id(run_id: str) -> contextvars.Token:
+    return _run_id.set(run_id)
+
+
+def ensure_run_id() -> str:
+    """Retorna el run id activo, creando uno nuevo si no hay ninguno."""
+    run_id = _run_id.get()
+    if run_id is None:
+        run_id = new_run_id()
+        _run_id.set(run_id)
+    return run_id
+
+
+def submit(pool: Executor, fn, *args, **kwargs) -> Future:
+    """pool.submit que ejecuta fn dentro de una copia del contexto actual."""
+    ctx = contextvars.copy_context()
+    return pool.submit(ctx.run, fn, *args, **kwargs)
+
+
+def start_thread(target, args: tuple = (), name: str | None = None, daemon: bool = True) -> threading.Thread:
+    """Lanza un thread que hereda el contexto actual (run id, spans, etc.)."""
+    ctx = contextvars.copy_context()
+    thread = threading.Thread(target=ctx.run, args=(target, *args), name=name, daemon=daemon)
+    thread.start()
+    return thread
@@ -0,0 +1,106 @@
+"""
+Journal de cada run del pipeline, para retomarlo después de un crash.
+
+Cada run tiene un archivo append-only data/outputs/journal/<run_id>.jsonl con
+un evento por línea (escrito con fsync): run_started (brief, plataformas,
+idiomas), agent_completed (con los outputs que guardó el agente; lo escribe
+BaseAgent.run, también desde los workers del pool), checkpoint_waiting,
+checkpoint_approved y run_finished.
+
+`load_progress(run_id)` reconstruye hasta dónde llegó el run: un agente cuenta
+como hecho si completó y sus outputs siguen en disco, un checkpoint como
+aprobado si quedó registrado. El API (POST /api/pipeline/resume) y
+`main.py resume` recorren las fases salteando lo hecho y retoman desde el
+primer agente incompleto, o desde el checkpoint que quedó esperando.
+"""
+
+import json
+import os
+import threading
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any
+
+from utils.helpers import get_data_dir
+
+_write_lock = threading.Lock()
+
+
+def journal_dir() -> Path:
+    return get_data_dir() / "outputs" / "journal"
+
+
+def journal_path(run_id: str) -> Path:
+    return journal_dir() / f"{run_id}.jsonl"
+
+
+def record_event(run_id: str, event: str, **fields: Any) -> None:
+    """Agrega un evento al journal del run y lo baja a disco antes de retornar."""
+    entry = {"event": event, "ts": datetime.now(timezone.utc).isoformat(), **fields}
+    path = journal_path(run_id)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    line = json.dumps(entry, ensure_ascii=False, default=str)
+    with _write_lock, open(path, "a", encoding="utf-8") as f:
+        f.write(line + "\n")
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def load_events(run_id: str) -> list[dict]:
+    path = journal_path(run_id)
+    if not path.exists():
+        return []
+    events = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                events.append(json.loads(line))
+            except json.JSONDecodeError:
+                continue  # última línea cortada por el crash
+    return events
+
+
+def load_progress(run_id: str) -> dict | None:
+    """
+    Estado del run según su journal (None si no es un run del pipeline):
+    started (evento run_started), completed {agente: outputs}, approved (fases),
+    waiting (fase con checkpoint pendiente o None) y finished (status final o None).
+    """
+    events = load_events(run_id)
+    started = next((e for e in events if e["event"] == "run_started"), None)
+    if started is None:
+        return None
+    progress: dict[str, Any] = {
+        "run_id": run_id, "started": started, "completed": {}, "approved": set(), "waiting": None, "finished": None,
+    }
+    for e in events:
+        if e["event"] == "agent_completed":
+            progress["completed"][e["agent"]] = e.get("outputs") or []
+        elif e["event"] == "checkpoint_waiting":
+            progress["waiting"] = e["phase"]
+        elif e["event"] == "checkpoint_approved":
+            progress["approved"].add(e["phase"])
+            if progress["waiting"] == e["phase"]:
+                progress["waiting"] = None
+        elif e["event"] == "run_finished":
+            progress["finished"] = e.get("status")
+    return progress
+
+
+def agent_done(progress: dict | None, agent_name: str) -> bool:
+    """¿El agente ya completó en este run y sus outputs siguen existiendo?"""
+    if not progress or agent_name not in progress["completed"]:
+        return False
+    return all(Path(p).exists() for p in progress["completed"][agent_name])
+
+
+def latest_resumable() -> str | None:
+    """Run id del run del pipeline más reciente que no terminó (completed), o None."""
+    directory = journal_dir()
+    if not directory.exists():
+        return None
+    for path in sorted(directory.glob("*.jsonl"), key=lambda f: f.stat().st_mtime, reverse=True):
+        progress = load_progress(path.stem)
+        if progress is not None:
+            return path.stem if progress["finished"] != "completed" else None
+    return None
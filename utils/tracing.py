@@ -0,0 +1,222 @@
+"""
+Spans jerárquicos para ver en qué se va el tiempo de un run:
+pipeline → phase → agent → shard → turn → tool → llamada al proveedor.
+
+El trace id se deriva del run id (utils.run_context), así que todos los spans
+de una campaña comparten trace aunque corran en threads distintos: el span
+activo vive en un ContextVar y se hereda con run_context.submit/start_thread.
+Cada span terminado se agrega como una línea JSON (formato de span OTLP/JSON)
+a data/outputs/traces/<run_id>.jsonl.
+"""
+
+import contextvars
+import hashlib
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any
+
+from utils.helpers import get_config, get_data_dir
+from utils.run_context import get_run_id
+
+_current_span: contextvars.ContextVar["Span | _RemoteParent | None"] = contextvars.ContextVar("current_span", default=None)
+_write_lock = threading.Lock()
+_enabled: bool | None = None
+
+
+def traces_dir() -> Path:
+    return get_data_dir() / "outputs" / "traces"
+
+
+def tracing_enabled() -> bool:
+    global _enabled
+    if _enabled is None:
+        _enabled = bool((get_config().get("tracing") or {}).get("enabled", True))
+    return _enabled
+
+
+def trace_id_for(run_id: str) -> str:
+    """Trace id OTLP (32 hex) derivado del run id."""
+    return hashlib.md5(run_id.encode("utf-8")).hexdigest()
+
+
+def _otlp_value(value: Any) -> dict:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def _plain_value(value: dict) -> Any:
+    if "intValue" in value:
+        return int(value["intValue"])
+    return next(iter(value.values()), None)
+
+
+class Span:
+    __slots__ = ("run_id", "trace_id", "span_id", "parent_span_id", "name", "kind",
+                 "attributes", "start_ns", "end_ns", "status", "status_message")
+
+    def __init__(self, name: str, run_id: str, parent: "Span | None", kind: str, attributes: dict):
+        self.run_id = run_id
+        self.trace_id = trace_id_for(run_id)
+        self.span_id = os.urandom(8).hex()
+        self.parent_span_id = parent.span_id if parent and parent.run_id == run_id else ""
+        self.name = name
+        self.kind = kind
+        self.attributes = {k: v for k, v in attributes.items() if v is not None}
+        self.start_ns = time.time_ns()
+        self.end_ns = 0
+        self.status = "STATUS_CODE_UNSET"
+        self.status_message = ""
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        if value is not None:
+            self.attributes[key] = value
+
+    def set_attributes(self, attributes: dict) -> None:
+        for key, value in attributes.items():
+            self.set_attribute(key, value)
+
+    def set_error(self, message: str) -> None:
+        self.status = "STATUS_CODE_ERROR"
+        self.status_message = message[:500]
+
+    def to_otlp(self) -> dict:
+        return {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "parentSpanId": self.parent_span_id,
+            "name": self.name,
+            "kind": f"SPAN_KIND_{self.kind.upper()}",
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns),
+            "attributes": [
+                {"key": "run_id", "value": {"stringValue": self.run_id}},
+                *({"key": k, "value": _otlp_value(v)} for k, v in self.attributes.items()),
+            ],
+            "status": {"code": self.status, "message": self.status_message},
+        }
+
+
+class _NoopSpan:
+    def set_attribute(self, key: str, value: Any) -> None:
+        pass
+
+    def set_attributes(self, attributes: dict) -> None:
+        pass
+
+    def set_error(self, message: str) -> None:
+        pass
+
+
+_NOOP = _NoopSpan()
+
+
+class _RemoteParent(_NoopSpan):
+    """Span abierto en otro proceso (p.ej. el API): padre de los spans de un worker, no se exporta."""
+    __slots__ = ("run_id", "span_id")
+
+    def __init__(self, run_id: str, span_id: str):
+        self.run_id = run_id
+        self.span_id = span_id
+
+
+def _export(span: Span) -> None:
+    path = traces_dir() / f"{span.run_id}.jsonl"
+    line = json.dumps(span.to_otlp(), ensure_ascii=False, default=str)
+    with _write_lock:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(line + "\n")
+
+
+@contextmanager
+def span(name: str, kind: str = "internal", **attributes: Any):
+    """
+    Abre un span hijo del span activo. Sin run id activo (o con tracing
+    deshabilitado) no registra nada y entrega un span no-op.
+    """
+    run_id = get_run_id()
+    if run_id is None or not tracing_enabled():
+        yield _NOOP
+        return
+    current = Span(name, run_id, _current_span.get(), kind, attributes)
+    token = _current_span.set(current)
+    try:
+        yield current
+    except BaseException as e:
+        current.set_error(f"{type(e).__name__}: {e}")
+        raise
+    finally:
+        _current_span.reset(token)
+        current.end_ns = time.time_ns()
+        if current.status == "STATUS_CODE_UNSET":
+            current.status = "STATUS_CODE_OK"
+        _export(current)
+
+
+def current_span() -> "Span | _NoopSpan":
+    return _current_span.get() or _NOOP
+
+
+def span_context() -> tuple[str, str] | None:
+    """(run_id, span_id) del span activo, para continuar el trace en otro proceso."""
+    current = _current_span.get()
+    return (current.run_id, current.span_id) if current is not None else None
+
+
+def attach_parent(context: tuple[str, str] | None) -> None:
+    """Usa un span de otro proceso (ver span_context) como padre de los spans siguientes."""
+    if context:
+        _current_span.set(_RemoteParent(*context))
+
+
+# ── Lectura para /api/runs/{id}/trace ─────────────────
+
+def load_trace(run_id: str) -> list[dict]:
+    path = traces_dir() / f"{run_id}.jsonl"
+    if not path.exists():
+        return []
+    with open(path, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def build_span_tree(spans: list[dict]) -> list[dict]:
+    """
+    Arma el árbol de spans (hijos ordenados por inicio) con offsets relativos
+    al primer span, listo para un flame graph. Los spans cuyo padre no está
+    en el archivo (p.ej. un run que se cortó) quedan como raíces.
+    """
+    if not spans:
+        return []
+    origin = min(int(s["startTimeUnixNano"]) for s in spans)
+    nodes: dict[str, dict] = {}
+    for s in spans:
+        start, end = int(s["startTimeUnixNano"]), int(s["endTimeUnixNano"])
+        nodes[s["spanId"]] = {
+            "span_id": s["spanId"],
+            "parent_span_id": s.get("parentSpanId") or None,
+            "name": s["name"],
+            "kind": s.get("kind", "").removeprefix("SPAN_KIND_").lower(),
+            "start_ms": round((start - origin) / 1e6, 3),
+            "duration_ms": round((end - start) / 1e6, 3),
+            "status": s.get("status", {}).get("code", "").removeprefix("STATUS_CODE_").lower(),
+            "error": s.get("status", {}).get("message") or None,
+            "attributes": {a["key"]: _plain_value(a["value"]) for a in s.get("attributes", []) if a["key"] != "run_id"},
+            "children": [],
+        }
+    roots = []
+    for node in nodes.values():
+        parent = nodes.get(node["parent_span_id"] or "")
+        (parent["children"] if parent else roots).append(node)
+    for node in nodes.values():
+        node["children"].sort(key=lambda n: n["start_ms"])
+    roots.sort(key=lambda n: n["start_ms"])
+    return roots